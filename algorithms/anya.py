@@ -1,39 +1,51 @@
-from unit_tests.unit_tests import draw_neighbors_anya
-from util.containers import OpenAnya
+from util.containers import OpenAnya, ClosedAnya
 from algorithms.structures import AnyaMap, AnyaNode
+from util.functions import compute_cost
 
 
-def anya(grid_map: AnyaMap, start_i, start_j, goal_i, goal_j, heuristic_func=None, open_type=OpenAnya, show_all=False):
-    starts = grid_map.get_start_neighbors(start_i, start_j)
-
+def anya(grid_map: AnyaMap, start_i, start_j, goal_i, goal_j, heuristic_func=None, open_type=OpenAnya, closed_type=ClosedAnya, show_all=False, stats=None):
+    if stats is not None:
+        # Instrumented map and OPEN fill the stats, see util.stats
+        grid_map, open_type = stats.instrument(grid_map, open_type)
+    if show_all:
+        # Drawing needs matplotlib and PIL, so it's imported only when it is used
+        from draw.draw import draw_neighbors_anya
+    if not grid_map.connected(start_i, start_j, goal_i, goal_j):
+        # The goal is in other components of free cells (see Map.get_components), there is nothing to search
+        return False, None, 0, 0, open_type(), closed_type(grid_map)
     OPEN = open_type()
-    CLOSED = dict()
-    CLOSED[(start_i, start_j)] = 0
+    # Best g values of the roots
+    CLOSED = closed_type(grid_map)
+    CLOSED.set_g(start_i, start_j, 0)
     steps = 0
     nodes_created = 0
+    if (start_i != goal_i or start_j != goal_j) and grid_map.line_of_sight(start_i, start_j, goal_i, goal_j):
+        # The goal is visible from the start, the segment is the shortest path
+        nodes_created += 1
+        start_node = AnyaNode(start_i, start_j, None, None, None, None)
+        return True, AnyaNode(goal_i, goal_j, None, None, None, None, g=compute_cost(start_i, start_j, goal_i, goal_j),
+                              parent=start_node), steps, nodes_created, OPEN, CLOSED
 
-    for start in starts:
+    for start in grid_map.get_start_neighbors(start_i, start_j):
         nodes_created += 1
         start.update_h(goal_i, goal_j)
         OPEN.add_node(start)
 
     while not OPEN.is_empty():
         current = OPEN.get_best_node()
-        if (current.i, current.j) in CLOSED:
-            if current.g > CLOSED[(current.i, current.j)]:
-                continue
+        if current.g > CLOSED.get_g(current.i, current.j):
+            continue
         if show_all:
             draw_neighbors_anya(grid_map, current)
         steps += 1
-        if current.ai == goal_i and current.aj <= goal_j <= current.bj:
+        if current.ai == goal_i and current.an <= goal_j * current.den <= current.bn:
             return True, AnyaNode(goal_i, goal_j, None, None, None, None, g=current.F,
                                   parent=current), steps, nodes_created, OPEN, CLOSED
         for neighbour in grid_map.get_neighbors_by_node(current):
             nodes_created += 1
-            if (neighbour.i, neighbour.j) in CLOSED:
-                if neighbour.g > CLOSED[(neighbour.i, neighbour.j)]:
-                    continue
-            CLOSED[(neighbour.i, neighbour.j)] = neighbour.g
+            if neighbour.g > CLOSED.get_g(neighbour.i, neighbour.j):
+                continue
+            CLOSED.set_g(neighbour.i, neighbour.j, neighbour.g)
             if neighbour.i == current.i and neighbour.j == current.j:
                 neighbour.parent = current.parent
             else:
@@ -0,0 +1,226 @@
+from math import inf
+from time import perf_counter
+
+from util.containers import OpenHeap, Closed, OpenAnya, ClosedAnya
+from algorithms.structures import Map, Node, AnyaMap, AnyaNode
+from util import functions as uf
+
+# Weights of the heuristic in the iterations of the anytime searches, the last one gives the path of the optimal search
+ANYTIME_WEIGHTS = (3, 2, 1.5, 1.25, 1)
+
+
+def _budget(time_limit, max_expansions):
+    '''
+    Function of the number of expansions which tells if the budget of the search is over:
+    time_limit seconds of wall-clock time from now or max_expansions expansions, None for no limit.
+    '''
+    deadline = None if time_limit is None else perf_counter() + time_limit
+
+    def out_of_budget(steps):
+        return (max_expansions is not None and steps >= max_expansions) \
+            or (deadline is not None and perf_counter() >= deadline)
+
+    return out_of_budget
+
+
+def _anytime_search(grid_map: Map, start_i, start_j, goal_i, goal_j, heuristic_func, open_type, closed_type, k, weights,
+                    any_angle, time_limit, max_expansions, stats):
+    out_of_budget = _budget(time_limit, max_expansions)
+    if stats is not None:
+        # Instrumented map and OPEN fill the stats, see util.stats
+        grid_map, open_type = stats.instrument(grid_map, open_type)
+        stats.generated += 1  # start node
+    start_node = Node(i=start_i, j=start_j, h=weights[0] * heuristic_func(start_i, start_j, goal_i, goal_j))
+    OPEN = open_type()
+    CLOSED = closed_type(grid_map)
+    steps = 0
+    nodes_created = 0
+    if not grid_map.connected(start_i, start_j, goal_i, goal_j):
+        # The goal is in other components of free cells (see Map.get_components), there is nothing to search
+        return False, None, steps, nodes_created, OPEN, CLOSED, inf
+    # The best generated node of every state (i, j, is_left), g values are kept between the iterations
+    best = {(start_i, start_j, 0): start_node}
+    # Nodes improved after their expansion in the current iteration, they are expanded in the next one
+    inconsistent = dict()
+    incumbent = start_node if (start_i == goal_i and start_j == goal_j) else None
+    # Weight of the last finished iteration: the incumbent is at most this times longer than the optimal path
+    finished_weight = inf
+
+    def result():
+        if incumbent is None:
+            return False, None, steps, nodes_created, OPEN, CLOSED, inf
+        if any_angle:
+            # g values of Theta* aren't the shortest distances, so only the straight segment bounds the length
+            shortest = uf.euclidian_distance(start_i, start_j, goal_i, goal_j)
+            return True, incumbent, steps, nodes_created, OPEN, CLOSED, incumbent.g / shortest if shortest > 0 else 1.0
+        # Some node of OPEN or of the inconsistent ones is on an optimal path and has its optimal g
+        lower = min((node.g + heuristic_func(node.i, node.j, goal_i, goal_j) for node in list(OPEN) + list(inconsistent.values())),
+                    default=incumbent.g)
+        bound = max(incumbent.g / lower, 1.0) if lower > 0 else 1.0
+        return True, incumbent, steps, nodes_created, OPEN, CLOSED, min(bound, finished_weight)
+
+    OPEN.add_node(start_node)
+    for (iteration, weight) in enumerate(weights):
+        if iteration > 0:
+            # OPEN gets the nodes of OPEN and the inconsistent ones with priorities of the new weight, CLOSED is cleared
+            nodes = list(OPEN) + list(inconsistent.values())
+            OPEN = open_type()
+            CLOSED = closed_type(grid_map)
+            inconsistent = dict()
+            for node in nodes:
+                node.h = weight * heuristic_func(node.i, node.j, goal_i, goal_j)
+                node.F = node.g + node.h
+                OPEN.add_node(node)
+        while not OPEN.is_empty():
+            current = OPEN.get_best_node()
+            if (incumbent is not None and incumbent.g <= current.F) or out_of_budget(steps):
+                # No node left in OPEN gives a shorter path with this weight, or the search has to stop
+                OPEN.add_node(current)
+                break
+            steps += 1
+            for (neighbour_i, neighbour_j) in grid_map.get_neighbors(current, k):
+                is_left = grid_map.is_left_node(neighbour_i, neighbour_j, current)
+                parent = current
+                if any_angle and current.parent is not None \
+                        and grid_map.traversable_step_long(current.parent.i, current.parent.j, neighbour_i, neighbour_j):
+                    parent = current.parent
+                g = parent.g + uf.compute_cost(parent.i, parent.j, neighbour_i, neighbour_j)
+                key = (neighbour_i, neighbour_j, is_left)
+                known = best.get(key)
+                if known is not None and known.g <= g:
+                    continue
+                next_node = Node(i=neighbour_i, j=neighbour_j, g=g,
+                                 h=weight * heuristic_func(neighbour_i, neighbour_j, goal_i, goal_j), parent=parent,
+                                 k=nodes_created, is_left=is_left)
+                nodes_created += 1
+                best[key] = next_node
+                if neighbour_i == goal_i and neighbour_j == goal_j and (incumbent is None or g < incumbent.g):
+                    incumbent = next_node
+                if CLOSED.was_expanded(neighbour_i, neighbour_j, is_left):
+                    inconsistent[key] = next_node
+                else:
+                    OPEN.add_node(next_node)
+            CLOSED.add_node(current)
+        if out_of_budget(steps):
+            break
+        finished_weight = weight
+        if incumbent is None:
+            # OPEN is empty, there is no path
+            break
+    return result()
+
+
+def weighted_astar2k(grid_map: Map, start_i, start_j, goal_i, goal_j, heuristic_func=None, open_type=OpenHeap,
+                     closed_type=Closed, k=2, weight=1.5, time_limit=None, max_expansions=None, stats=None):
+    '''
+    2^k A* with the heuristic multiplied by weight: it expands fewer nodes, and the path is at most weight times longer
+    than the path of astar2k (heuristic_func must be consistent). The search stops after time_limit seconds
+    or max_expansions expansions if they are given.
+    Returns the result of astar2k with the bound of suboptimality as the last element, inf if no path is found.
+    '''
+    return _anytime_search(grid_map, start_i, start_j, goal_i, goal_j, heuristic_func, open_type, closed_type, k,
+                           (weight,), False, time_limit, max_expansions, stats)
+
+
+def weighted_thetastar(grid_map: Map, start_i, start_j, goal_i, goal_j, heuristic_func=None, open_type=OpenHeap,
+                       closed_type=Closed, k=2, weight=1.5, time_limit=None, max_expansions=None, stats=None):
+    '''
+    weighted_astar2k where a node gets the parent of the expanded node if there is line of sight to it, as in thetastar.
+    The bound is the ratio of the path length and the distance between the start and the goal.
+    '''
+    return _anytime_search(grid_map, start_i, start_j, goal_i, goal_j, heuristic_func, open_type, closed_type, k,
+                           (weight,), True, time_limit, max_expansions, stats)
+
+
+def anytime_astar2k(grid_map: Map, start_i, start_j, goal_i, goal_j, heuristic_func=None, open_type=OpenHeap,
+                    closed_type=Closed, k=2, weights=ANYTIME_WEIGHTS, time_limit=None, max_expansions=None, stats=None):
+    '''
+    Anytime repairing 2^k A* (ARA*): weighted searches with decreasing weights, every next one starts from the nodes
+    of the previous one and only expands nodes which can improve the path. When the budget is over,
+    the best path found so far is returned with the bound: the smaller of the last finished weight and the ratio
+    of the path length and the smallest g + h of the nodes left. The last weight 1 gives the path of astar2k.
+    '''
+    return _anytime_search(grid_map, start_i, start_j, goal_i, goal_j, heuristic_func, open_type, closed_type, k,
+                           weights, False, time_limit, max_expansions, stats)
+
+
+def anytime_thetastar(grid_map: Map, start_i, start_j, goal_i, goal_j, heuristic_func=None, open_type=OpenHeap,
+                      closed_type=Closed, k=2, weights=ANYTIME_WEIGHTS, time_limit=None, max_expansions=None, stats=None):
+    '''
+    anytime_astar2k with the parents of Theta*, the bound is the one of weighted_thetastar.
+    '''
+    return _anytime_search(grid_map, start_i, start_j, goal_i, goal_j, heuristic_func, open_type, closed_type, k,
+                           weights, True, time_limit, max_expansions, stats)
+
+
+def anytime_anya(grid_map: AnyaMap, start_i, start_j, goal_i, goal_j, heuristic_func=None, open_type=OpenAnya,
+                 closed_type=ClosedAnya, time_limit=None, max_expansions=None, stats=None):
+    '''
+    ANYA with an incumbent: when a root is expanded first time and the goal is visible from it, the path through
+    the root is kept if it is the shortest one so far. F of the expanded node is a lower bound of the path length,
+    so the incumbent is returned as soon as no node gives a shorter path, or when the budget is over with the bound
+    incumbent length / F. Returns the result of anya with the bound as the last element, inf if no path is found.
+    '''
+    out_of_budget = _budget(time_limit, max_expansions)
+    if stats is not None:
+        # Instrumented map and OPEN fill the stats, see util.stats
+        grid_map, open_type = stats.instrument(grid_map, open_type)
+    if not grid_map.connected(start_i, start_j, goal_i, goal_j):
+        # The goal is in other components of free cells (see Map.get_components), there is nothing to search
+        return False, None, 0, 0, open_type(), closed_type(grid_map), inf
+    OPEN = open_type()
+    # Best g values of the roots
+    CLOSED = closed_type(grid_map)
+    CLOSED.set_g(start_i, start_j, 0)
+    steps = 0
+    nodes_created = 0
+    start_node = AnyaNode(start_i, start_j, None, None, None, None)
+    if grid_map.line_of_sight(start_i, start_j, goal_i, goal_j):
+        # The goal is visible from the start, the segment is the shortest path
+        nodes_created += 1
+        return True, AnyaNode(goal_i, goal_j, None, None, None, None, g=uf.compute_cost(start_i, start_j, goal_i, goal_j),
+                              parent=start_node), steps, nodes_created, OPEN, CLOSED, 1.0
+
+    for start in grid_map.get_start_neighbors(start_i, start_j):
+        nodes_created += 1
+        start.update_h(goal_i, goal_j)
+        OPEN.add_node(start)
+    incumbent = None
+    # Roots checked for line of sight to the goal
+    checked = {(start_i, start_j)}
+
+    while not OPEN.is_empty():
+        current = OPEN.get_best_node()
+        if current.g > CLOSED.get_g(current.i, current.j):
+            continue
+        if incumbent is not None and incumbent.g <= current.F:
+            # Nodes left can't give a shorter path
+            return True, incumbent, steps, nodes_created, OPEN, CLOSED, 1.0
+        if out_of_budget(steps):
+            if incumbent is None:
+                return False, None, steps, nodes_created, OPEN, CLOSED, inf
+            return True, incumbent, steps, nodes_created, OPEN, CLOSED, incumbent.g / current.F
+        steps += 1
+        if current.ai == goal_i and current.an <= goal_j * current.den <= current.bn:
+            return True, AnyaNode(goal_i, goal_j, None, None, None, None, g=current.F,
+                                  parent=current), steps, nodes_created, OPEN, CLOSED, 1.0
+        root = (current.i, current.j)
+        if root not in checked:
+            checked.add(root)
+            g = current.g + uf.compute_cost(current.i, current.j, goal_i, goal_j)
+            if (incumbent is None or g < incumbent.g) and grid_map.line_of_sight(current.i, current.j, goal_i, goal_j):
+                incumbent = AnyaNode(goal_i, goal_j, None, None, None, None, g=g, parent=current)
+        for neighbour in grid_map.get_neighbors_by_node(current):
+            nodes_created += 1
+            if neighbour.g > CLOSED.get_g(neighbour.i, neighbour.j):
+                continue
+            CLOSED.set_g(neighbour.i, neighbour.j, neighbour.g)
+            if neighbour.i == current.i and neighbour.j == current.j:
+                neighbour.parent = current.parent
+            else:
+                neighbour.parent = current
+            neighbour.update_h(goal_i, goal_j)
+            OPEN.add_node(neighbour)
+    if incumbent is None:
+        return False, None, steps, nodes_created, OPEN, CLOSED, inf
+    return True, incumbent, steps, nodes_created, OPEN, CLOSED, 1.0
@@ -0,0 +1,134 @@
+from math import atan2, inf
+
+from util.containers import Open, Closed
+from algorithms.structures import Map, Node
+from util import functions as uf
+
+# Neighbouring grid points used for the angle bounds, they don't depend on k
+_BOUND_NEIGHBORS = [(0, 1), (1, 1), (1, 0), (1, -1), (0, -1), (-1, -1), (-1, 0), (-1, 1)]
+
+
+def _angle(node, parent, i, j):
+    '''
+    Signed angle at the parent from the direction to the node to the direction to the point (i, j), in (-pi, pi].
+    '''
+    ai = node.i - parent.i
+    aj = node.j - parent.j
+    bi = i - parent.i
+    bj = j - parent.j
+    return atan2(ai * bj - aj * bi, ai * bi + aj * bj)
+
+
+def _squared_distance(i1, j1, i2, j2):
+    return (i1 - i2) ** 2 + (j1 - j2) ** 2
+
+
+def _update_bounds(grid_map: Map, node: Node, expanded):
+    '''
+    Range of angles [lb, ub] at the parent of the node (relatively to the direction to the node) such that
+    the neighbouring points of the node in these directions are visible from the parent.
+    '''
+    parent = node.parent
+    if parent is None:
+        return -inf, inf
+    lb = -inf
+    ub = inf
+    distance = _squared_distance(parent.i, parent.j, node.i, node.j)
+    # Blocked cells around the node: the range must stay on the side of the node opposite to the cell
+    for (ci, cj) in ((node.i - 1, node.j - 1), (node.i - 1, node.j), (node.i, node.j - 1), (node.i, node.j)):
+        if not grid_map.is_obstacle(ci, cj):
+            continue
+        is_left = True
+        is_right = True
+        for (qi, qj) in ((ci, cj), (ci + 1, cj), (ci, cj + 1), (ci + 1, cj + 1)):
+            if qi == parent.i and qj == parent.j:
+                continue
+            theta = _angle(node, parent, qi, qj)
+            if theta == 0 and _squared_distance(parent.i, parent.j, qi, qj) <= distance:
+                continue
+            if theta >= 0:
+                is_left = False
+            if theta <= 0:
+                is_right = False
+        if is_left:
+            lb = 0
+        if is_right:
+            ub = 0
+    # Neighbouring points: ranges of expanded ones with the same parent are propagated,
+    # nearer to the parent ones which are not known to be visible bound the range
+    for (di, dj) in _BOUND_NEIGHBORS:
+        ni = node.i + di
+        nj = node.j + dj
+        if not grid_map.in_bounds(ni, nj) or not grid_map.traversable_step(node.i, node.j, ni, nj):
+            continue
+        theta = _angle(node, parent, ni, nj)
+        same_parent = False
+        for (other, other_lb, other_ub) in expanded.get((ni, nj), ()):
+            if other.parent is parent:
+                same_parent = True
+                if other_lb + theta <= 0:
+                    lb = max(lb, other_lb + theta)
+                if other_ub + theta >= 0:
+                    ub = min(ub, other_ub + theta)
+        if not same_parent and (ni != parent.i or nj != parent.j) \
+                and _squared_distance(parent.i, parent.j, ni, nj) < distance:
+            if theta < 0:
+                lb = max(lb, theta)
+            if theta > 0:
+                ub = min(ub, theta)
+    return lb, ub
+
+
+def apthetastar(grid_map: Map, start_i, start_j, goal_i, goal_j, heuristic_func=None, open_type=Open, closed_type=Closed, k=2, stats=None):
+    '''
+    Angle-Propagation Theta*: instead of line of sight checks every expanded node keeps the range of angles
+    in which its neighbouring points are visible from its parent, so a neighbour gets the parent of the node
+    if it lies in the range. Ranges are computed from the cells around the node and the ranges of expanded
+    neighbours in constant time. Moves are the 2^k ones with k = 2 or 3.
+    '''
+    if k > 3:
+        raise ValueError("AP Theta* supports only k = 2 and k = 3")
+    if stats is not None:
+        # Instrumented map and OPEN fill the stats, see util.stats
+        grid_map, open_type = stats.instrument(grid_map, open_type)
+        stats.generated += 1  # start node
+    start_node = Node(i=start_i, j=start_j)
+    OPEN = open_type()
+    CLOSED = closed_type(grid_map)
+    steps = 0
+    nodes_created = 0
+    if not grid_map.connected(start_i, start_j, goal_i, goal_j):
+        # The goal is in other components of free cells (see Map.get_components), there is nothing to search
+        return False, None, steps, nodes_created, OPEN, CLOSED
+    # (i, j) -> [(node, lb, ub)] for expanded nodes
+    expanded = dict()
+
+    OPEN.add_node(start_node)
+    while not OPEN.is_empty():
+        current = OPEN.get_best_node()
+        steps += 1
+        if current.i == goal_i and current.j == goal_j:
+            return True, current, steps, nodes_created, OPEN, CLOSED
+        lb, ub = _update_bounds(grid_map, current, expanded)
+        expanded.setdefault((current.i, current.j), []).append((current, lb, ub))
+        # Segments can't pass through a diagonal intersection of obstacles
+        through = current.parent is not None and not grid_map.is_diagonal_intersection(current.i, current.j)
+        for (neighbour_i, neighbour_j) in grid_map.get_neighbors(current, k):
+            is_left = grid_map.is_left_node(neighbour_i, neighbour_j, current)
+            if not CLOSED.was_expanded(neighbour_i, neighbour_j, is_left):
+                if through and lb <= _angle(current, current.parent, neighbour_i, neighbour_j) <= ub:
+                    next_node = Node(i=neighbour_i, j=neighbour_j,
+                                     g=current.parent.g + uf.compute_cost(current.parent.i, current.parent.j, neighbour_i,
+                                                                          neighbour_j),
+                                     h=heuristic_func(neighbour_i, neighbour_j, goal_i, goal_j), parent=current.parent,
+                                     k=nodes_created, is_left=is_left)
+                else:
+                    next_node = Node(i=neighbour_i, j=neighbour_j,
+                                     g=current.g + uf.compute_cost(current.i, current.j, neighbour_i, neighbour_j),
+                                     h=heuristic_func(neighbour_i, neighbour_j, goal_i, goal_j), parent=current,
+                                     k=nodes_created, is_left=is_left)
+                nodes_created += 1
+                OPEN.add_node(next_node)
+        CLOSED.add_node(current)
+
+    return False, None, steps, nodes_created, OPEN, CLOSED
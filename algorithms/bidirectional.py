@@ -0,0 +1,122 @@
+from math import inf
+
+from util.containers import Open, Closed
+from algorithms.structures import Map, Node
+from util import functions as uf
+
+
+def _splice(forward: Node, backward: Node):
+    '''
+    Joins the path from the start to the forward node with the path from the backward node (the same point)
+    to the goal, returns the goal node of the joined path, so make_path works with it.
+    '''
+    current = forward
+    backward = backward.parent
+    while backward is not None:
+        current = Node(i=backward.i, j=backward.j,
+                       g=current.g + uf.compute_cost(current.i, current.j, backward.i, backward.j),
+                       parent=current, is_left=backward.is_left)
+        backward = backward.parent
+    return current
+
+
+def _bidirectional_search(grid_map: Map, start_i, start_j, goal_i, goal_j, heuristic_func, open_type, closed_type, k,
+                          any_angle, stats):
+    if stats is not None:
+        # Instrumented map and OPEN fill the stats, see util.stats
+        grid_map, open_type = stats.instrument(grid_map, open_type)
+        stats.generated += 2  # start and goal nodes
+    # Heuristics of the sides are balanced: h(n) = (h(n, target) - h(n, root) + h(start, goal)) / 2 is consistent
+    # if heuristic_func is, and heuristics of the two sides sum to h(start, goal)
+    total_h = heuristic_func(start_i, start_j, goal_i, goal_j)
+    start_node = Node(i=start_i, j=start_j, h=total_h / 2)
+    goal_node = Node(i=goal_i, j=goal_j, h=total_h / 2)
+    # Forward search from the start to the goal and backward search from the goal to the start.
+    # Every side has OPEN, CLOSED, the best generated nodes by (i, j, is_left), its root and its target
+    sides = [(open_type(), closed_type(grid_map), {(start_i, start_j, 0): start_node}, start_node, goal_node),
+             (open_type(), closed_type(grid_map), {(goal_i, goal_j, 0): goal_node}, goal_node, start_node)]
+    sides[0][0].add_node(start_node)
+    sides[1][0].add_node(goal_node)
+    steps = 0
+    nodes_created = 0
+    # F of the last expanded node of every side, it doesn't decrease
+    last_F = [0, 0]
+    best_length = inf
+    meeting = None
+    if start_i == goal_i and start_j == goal_j:
+        best_length = 0
+        meeting = (start_node, goal_node)
+    elif not grid_map.connected(start_i, start_j, goal_i, goal_j):
+        # The goal is in other components of free cells (see Map.get_components), there is nothing to search
+        return False, None, steps, nodes_created, [start_node, goal_node], []
+    elif any_angle and grid_map.line_of_sight(start_i, start_j, goal_i, goal_j):
+        # The goal is visible from the start, the segment is the shortest path
+        return True, Node(i=goal_i, j=goal_j, g=uf.compute_cost(start_i, start_j, goal_i, goal_j), parent=start_node), \
+            steps, nodes_created, [start_node, goal_node], []
+
+    while not sides[0][0].is_empty() and not sides[1][0].is_empty():
+        # The side with the smaller OPEN is expanded
+        side = 0 if len(sides[0][0]) <= len(sides[1][0]) else 1
+        OPEN, CLOSED, best, root, target = sides[side]
+        other_best = sides[1 - side][2]
+        current = OPEN.get_best_node()
+        last_F[side] = current.F
+        # Paths through the nodes left in OPEN of this side or of both sides can't be shorter than the best one
+        if current.F >= best_length or last_F[0] + last_F[1] >= best_length + total_h:
+            break
+        steps += 1
+        for (neighbour_i, neighbour_j) in grid_map.get_neighbors(current, k):
+            is_left = grid_map.is_left_node(neighbour_i, neighbour_j, current)
+            if CLOSED.was_expanded(neighbour_i, neighbour_j, is_left):
+                continue
+            if any_angle and current.parent is not None \
+                    and grid_map.traversable_step_long(current.parent.i, current.parent.j, neighbour_i, neighbour_j):
+                parent = current.parent
+            else:
+                parent = current
+            next_node = Node(i=neighbour_i, j=neighbour_j,
+                             g=parent.g + uf.compute_cost(parent.i, parent.j, neighbour_i, neighbour_j),
+                             h=(heuristic_func(neighbour_i, neighbour_j, target.i, target.j)
+                                - heuristic_func(neighbour_i, neighbour_j, root.i, root.j) + total_h) / 2,
+                             parent=parent, k=nodes_created, is_left=is_left)
+            nodes_created += 1
+            OPEN.add_node(next_node)
+            key = (neighbour_i, neighbour_j, is_left)
+            in_best = best.get(key)
+            if in_best is None or in_best.g > next_node.g:
+                best[key] = next_node
+            # A point reached by both sides from the same side of it (is_left) joins two paths,
+            # the start and the goal have no side
+            other = other_best.get(key)
+            if other is None and neighbour_i == target.i and neighbour_j == target.j:
+                other = target
+            if other is not None and next_node.g + other.g < best_length:
+                best_length = next_node.g + other.g
+                meeting = (next_node, other) if side == 0 else (other, next_node)
+        CLOSED.add_node(current)
+
+    OPEN = list(sides[0][0]) + list(sides[1][0])
+    CLOSED = list(sides[0][1]) + list(sides[1][1])
+    if meeting is None:
+        return False, None, steps, nodes_created, OPEN, CLOSED
+    return True, _splice(*meeting), steps, nodes_created, OPEN, CLOSED
+
+
+def bidirectional_astar2k(grid_map: Map, start_i, start_j, goal_i, goal_j, heuristic_func=None, open_type=Open, closed_type=Closed, k=2, stats=None):
+    '''
+    Bidirectional 2^k A*: searches from the start and from the goal, the side with the smaller OPEN is expanded.
+    A node generated by both sides gives a path, the search stops when no node left in OPEN can give a shorter one,
+    so paths are as optimal as in astar2k (heuristic_func must be consistent).
+    OPEN and CLOSED in the result are lists of nodes of both sides.
+    '''
+    return _bidirectional_search(grid_map, start_i, start_j, goal_i, goal_j, heuristic_func, open_type, closed_type, k,
+                                 False, stats)
+
+
+def bidirectional_thetastar(grid_map: Map, start_i, start_j, goal_i, goal_j, heuristic_func=None, open_type=Open, closed_type=Closed, k=2, stats=None):
+    '''
+    Bidirectional Theta*: bidirectional_astar2k where a node gets the parent of the expanded node
+    if there is line of sight to it, as in thetastar. The path is joined in the meeting point.
+    '''
+    return _bidirectional_search(grid_map, start_i, start_j, goal_i, goal_j, heuristic_func, open_type, closed_type, k,
+                                 True, stats)
@@ -0,0 +1,212 @@
+from heapq import heappush, heappop
+from math import inf
+
+from algorithms.structures import Map, Node, get_moves
+from util import functions as uf
+
+_EPS = 1e-9
+
+
+def _key_less(a, b):
+    # Keys are compared lexicographically, sums of costs with the same value may differ in the last bits
+    return a[0] < b[0] - _EPS or (a[0] <= b[0] + _EPS and a[1] < b[1] - _EPS)
+
+
+class DStarLite:
+    '''
+    D* Lite for the 2^k graph: the search goes from the goal to the start and keeps its g values between calls
+    of plan, so after changes of cells (update_cells) or a move of the start (move_start) only the affected
+    part of the search tree is repaired. Paths have the same length as paths of astar2k.
+
+    States are (i, j, is_left) as nodes of astar2k: a diagonal intersection of obstacles has a state for every side.
+    With any_angle the path is smoothed with line of sight checks as in Theta*: every point of the path
+    is linked to the farthest visible one.
+    heuristic_func must be consistent, the euclidean distance by default.
+    '''
+
+    def __init__(self, grid_map: Map, start_i, start_j, goal_i, goal_j, heuristic_func=uf.euclidian_distance, k=2,
+                 any_angle=False):
+        self.grid_map = grid_map
+        self.start = (start_i, start_j, 0)
+        self.goal_i = goal_i
+        self.goal_j = goal_j
+        self.heuristic_func = heuristic_func
+        self.k = k
+        self.any_angle = any_angle
+        self.moves = get_moves(k)
+        # Points whose moves can cross a cell are at most radius points away from its corners
+        self.radius = max(max(abs(di), abs(dj)) for (di, dj) in self.moves)
+        self.km = 0
+        self.last_start = self.start
+        self.g = dict()
+        self.rhs = dict()
+        # Priority queue with lazy deletion: state -> its current key, the heap can have outdated entries
+        self.queue = []
+        self.queued = dict()
+        self.pushes = 0
+        for state in self._sides(goal_i, goal_j):
+            self.rhs[state] = 0
+            self._push(state)
+
+    def _heuristic(self, state):
+        return self.heuristic_func(state[0], state[1], self.start[0], self.start[1])
+
+    def _key(self, state):
+        distance = min(self.g.get(state, inf), self.rhs.get(state, inf))
+        return distance + self._heuristic(state) + self.km, distance
+
+    def _push(self, state):
+        key = self._key(state)
+        self.queued[state] = key
+        heappush(self.queue, (key, state))
+        self.pushes += 1
+
+    def _top(self):
+        while self.queue:
+            key, state = self.queue[0]
+            if self.queued.get(state) == key:
+                return key, state
+            heappop(self.queue)
+        return (inf, inf), None
+
+    def _sides(self, i, j):
+        '''
+        States of the point: (i, j, 0) and, for a diagonal intersection, a state for every side.
+        '''
+        states = [(i, j, 0)]
+        if self.grid_map.is_diagonal_intersection(i, j):
+            for side in {self.grid_map.is_left_node(i, j, Node(i - di, j - dj)) for (di, dj) in self.moves}:
+                if side != 0:
+                    states.append((i, j, side))
+        return states
+
+    def successors(self, state):
+        i, j, side = state
+        parent = Node(i, j)
+        for (neighbour_i, neighbour_j) in self.grid_map.get_neighbors(Node(i, j, is_left=side), self.k):
+            yield (neighbour_i, neighbour_j, self.grid_map.is_left_node(neighbour_i, neighbour_j, parent)), \
+                uf.compute_cost(i, j, neighbour_i, neighbour_j)
+
+    def predecessors(self, state):
+        i, j, side = state
+        grid_map = self.grid_map
+        for (di, dj) in self.moves:
+            neighbour_i = i - di
+            neighbour_j = j - dj
+            if not grid_map.in_bounds(neighbour_i, neighbour_j) \
+                    or grid_map.is_left_node(i, j, Node(neighbour_i, neighbour_j)) != side:
+                continue
+            if not grid_map.is_diagonal_intersection(neighbour_i, neighbour_j):
+                if grid_map.traversable_step(neighbour_i, neighbour_j, i, j):
+                    yield (neighbour_i, neighbour_j, 0)
+                continue
+            # The moves of a side of a diagonal intersection are limited, see Map.get_neighbors
+            for neighbour in self._sides(neighbour_i, neighbour_j):
+                if (i, j) in grid_map.get_neighbors(Node(neighbour_i, neighbour_j, is_left=neighbour[2]), self.k):
+                    yield neighbour
+
+    def _update_state(self, state):
+        if state[0] == self.goal_i and state[1] == self.goal_j:
+            # Every side of the goal is a goal state, sides can appear after changes of cells
+            self.rhs[state] = 0
+        else:
+            best = inf
+            for (successor, cost) in self.successors(state):
+                best = min(best, cost + self.g.get(successor, inf))
+            self.rhs[state] = best
+        self.queued.pop(state, None)
+        if self.g.get(state, inf) != self.rhs.get(state, inf):
+            self._push(state)
+
+    def _compute_shortest_path(self):
+        '''
+        Returns the numbers of expanded and of queued states.
+        '''
+        steps = 0
+        pushes = self.pushes
+        while True:
+            top_key, state = self._top()
+            start_rhs = self.rhs.get(self.start, inf)
+            if state is None or (not _key_less(top_key, self._key(self.start)) and start_rhs == self.g.get(self.start, inf)):
+                break
+            new_key = self._key(state)
+            if _key_less(top_key, new_key):
+                self._push(state)
+                continue
+            steps += 1
+            heappop(self.queue)
+            del self.queued[state]
+            if self.g.get(state, inf) > self.rhs.get(state, inf):
+                self.g[state] = self.rhs[state]
+                for predecessor in self.predecessors(state):
+                    self._update_state(predecessor)
+            else:
+                self.g[state] = inf
+                for predecessor in list(self.predecessors(state)) + [state]:
+                    self._update_state(predecessor)
+        return steps, self.pushes - pushes
+
+    def update_cells(self, cells):
+        '''
+        Sets cells of the map from (i, j, blocked) tuples and updates the states whose moves may have changed.
+        '''
+        height, width = self.grid_map.get_size()
+        points = set()
+        for (i, j, blocked) in cells:
+            if bool(self.grid_map.is_obstacle(i, j)) == bool(blocked):
+                continue
+            self.grid_map.set_obstacle(i, j, blocked)
+            for point_i in range(max(i - self.radius, 0), min(i + 1 + self.radius, height) + 1):
+                for point_j in range(max(j - self.radius, 0), min(j + 1 + self.radius, width) + 1):
+                    points.add((point_i, point_j))
+        for (i, j) in points:
+            states = set(self._sides(i, j))
+            # States of sides which don't exist any more are updated too, nothing leads to them now
+            states.update(state for state in ((i, j, -2), (i, j, -1), (i, j, 1), (i, j, 2)) if state in self.rhs)
+            for state in states:
+                self._update_state(state)
+
+    def move_start(self, start_i, start_j):
+        self.start = (start_i, start_j, 0)
+        self.km += self.heuristic_func(self.last_start[0], self.last_start[1], start_i, start_j)
+        self.last_start = self.start
+
+    def plan(self):
+        '''
+        Repairs the search after the changes and returns the result as astar2k does: steps are the states expanded
+        by this call, OPEN is the list of nodes of the queued states, CLOSED is empty.
+        '''
+        steps, nodes_created = self._compute_shortest_path()
+        OPEN = [Node(i, j, is_left=side) for (i, j, side) in self.queued]
+        if self.g.get(self.start, inf) == inf:
+            return False, None, steps, nodes_created, OPEN, []
+        # The path follows the successors with the smallest cost + g
+        state = self.start
+        path = [state]
+        while state[0] != self.goal_i or state[1] != self.goal_j:
+            state = min(self.successors(state), key=lambda successor: successor[1] + self.g.get(successor[0], inf))[0]
+            path.append(state)
+        if self.any_angle:
+            path = self._smooth(path)
+        goal = Node(path[0][0], path[0][1])
+        for (i, j, side) in path[1:]:
+            goal = Node(i, j, g=goal.g + uf.compute_cost(goal.i, goal.j, i, j), parent=goal, is_left=side)
+        return True, goal, steps, nodes_created, OPEN, []
+
+    def _smooth(self, path):
+        smoothed = [path[0]]
+        for index in range(1, len(path) - 1):
+            anchor = smoothed[-1]
+            following = path[index + 1]
+            if not self.grid_map.traversable_step_long(anchor[0], anchor[1], following[0], following[1]):
+                smoothed.append(path[index])
+        smoothed.append(path[-1])
+        return smoothed
+
+
+def dstarlite(grid_map: Map, start_i, start_j, goal_i, goal_j, heuristic_func=None, k=2, any_angle=False):
+    '''
+    One search of DStarLite, the same as astar2k (or Theta* with any_angle). Keep a DStarLite object to replan.
+    '''
+    planner = DStarLite(grid_map, start_i, start_j, goal_i, goal_j, heuristic_func or uf.euclidian_distance, k, any_angle)
+    return planner.plan()
@@ -0,0 +1,219 @@
+from math import inf
+from time import perf_counter
+
+from util.containers import Open, Closed
+from algorithms.structures import Map, Node
+from util import functions as uf
+
+_DIRECTIONS = [(0, 1), (1, 1), (1, 0), (1, -1), (0, -1), (-1, -1), (-1, 0), (-1, 1)]
+_SQRT2 = 2 ** 0.5
+_EPS = 1e-9
+
+# (di, dj) -> {window mask: (directions of successors, is jump point, can move further)}, see _local_successors
+_successors_cache = {direction: dict() for direction in _DIRECTIONS}
+
+
+def _move_cost(di, dj):
+    return _SQRT2 if di != 0 and dj != 0 else 1
+
+
+def _blocked(mask, oi, oj):
+    return (mask >> (4 * (oi + 2) + oj + 2)) & 1
+
+
+def _can_move(mask, pi, pj, di, dj):
+    '''
+    Same rules as Map.traversable_step: a diagonal move crosses one cell which must be free,
+    a straight move goes between two cells and one of them must be free.
+    '''
+    if di == 0:
+        cj = min(pj, pj + dj)
+        return not (_blocked(mask, pi - 1, cj) and _blocked(mask, pi, cj))
+    if dj == 0:
+        ci = min(pi, pi + di)
+        return not (_blocked(mask, ci, pj - 1) and _blocked(mask, ci, pj))
+    return not _blocked(mask, min(pi, pi + di), min(pj, pj + dj))
+
+
+def _is_diagonal_intersection(mask, pi, pj):
+    nw = _blocked(mask, pi - 1, pj - 1)
+    ne = _blocked(mask, pi - 1, pj)
+    sw = _blocked(mask, pi, pj - 1)
+    se = _blocked(mask, pi, pj)
+    return (nw and se and not ne and not sw) or (ne and sw and not nw and not se)
+
+
+def _local_distances(mask, pi, pj, first_moves):
+    '''
+    Lengths of the shortest paths from the point p = (pi, pj) of the window to the points around x = (0, 0)
+    which don't go through x and start with one of the first moves.
+    Intermediate points can't be diagonal intersections of obstacles.
+    '''
+    distances = dict()
+    for (ei, ej) in first_moves:
+        bi = pi + ei
+        bj = pj + ej
+        if (bi != 0 or bj != 0) and -1 <= bi <= 1 and -1 <= bj <= 1 and _can_move(mask, pi, pj, ei, ej):
+            distances[(bi, bj)] = _move_cost(ei, ej)
+    changed = True
+    while changed:
+        changed = False
+        for (ai, aj), distance in list(distances.items()):
+            if _is_diagonal_intersection(mask, ai, aj):
+                continue
+            for (ei, ej) in _DIRECTIONS:
+                bi = ai + ei
+                bj = aj + ej
+                if (bi == 0 and bj == 0) or not (-1 <= bi <= 1 and -1 <= bj <= 1) or not _can_move(mask, ai, aj, ei, ej):
+                    continue
+                new_distance = distance + _move_cost(ei, ej)
+                if new_distance < distances.get((bi, bj), inf) - _EPS:
+                    distances[(bi, bj)] = new_distance
+                    changed = True
+    return distances
+
+
+def _local_successors(mask, di, dj):
+    '''
+    Pruning of JPS for the point x = (0, 0) of the window (see Map.get_window_masks) reached from p = (-di, -dj). A neighbour n of x is pruned
+    if a path from p to n avoiding x is shorter than p-x-n, paths go through the points around x only. For a straight
+    move a path of the same length prunes the neighbour too if it starts with a diagonal move.
+    Returns directions of the not pruned neighbours and if x is a jump point, i.e. it has a forced neighbour
+    which isn't one of the natural ones.
+    Diagonal intersections of obstacles split a point by its sides (see Map.is_left_node), so paths don't go
+    through them and they are never pruned.
+    '''
+    moves = [(ei, ej) for (ei, ej) in _DIRECTIONS if _can_move(mask, 0, 0, ei, ej)]
+    pi, pj = -di, -dj
+    if _is_diagonal_intersection(mask, 0, 0) or _is_diagonal_intersection(mask, pi, pj):
+        return tuple(moves), True
+
+    distances = _local_distances(mask, pi, pj, _DIRECTIONS)
+    # Ties are broken in favour of paths starting with a diagonal move, as in JPS
+    diagonal_distances = _local_distances(mask, pi, pj, [(ei, ej) for (ei, ej) in _DIRECTIONS if ei != 0 and ej != 0])
+
+    natural = [(di, dj)]
+    if di != 0 and dj != 0:
+        natural += [(di, 0), (0, dj)]
+    successors = []
+    is_jump_point = False
+    for (ei, ej) in moves:
+        if (ei, ej) == (pi, pj):
+            continue
+        through_x = _move_cost(di, dj) + _move_cost(ei, ej)
+        if not _is_diagonal_intersection(mask, ei, ej):
+            if distances.get((ei, ej), inf) < through_x - _EPS:
+                continue
+            if (di == 0 or dj == 0) and diagonal_distances.get((ei, ej), inf) <= through_x + _EPS:
+                continue
+        successors.append((ei, ej))
+        if (ei, ej) not in natural:
+            is_jump_point = True
+    return tuple(successors), is_jump_point
+
+
+def _successors(mask, di, dj):
+    cache = _successors_cache[(di, dj)]
+    result = cache.get(mask)
+    if result is None:
+        result = _local_successors(mask, di, dj) + (_can_move(mask, 0, 0, di, dj),)
+        cache[mask] = result
+    return result
+
+
+def _jump(masks, i, j, di, dj, goal_i, goal_j):
+    '''
+    Moves from (i, j) in the direction (di, dj) until a jump point (or the goal), returns it or None if there is none.
+    '''
+    if not _can_move(masks[i][j], 0, 0, di, dj):
+        return None
+    cache = _successors_cache[(di, dj)]
+    while True:
+        i += di
+        j += dj
+        if i == goal_i and j == goal_j:
+            return i, j
+        mask = masks[i][j]
+        successors = cache.get(mask)
+        if successors is None:
+            successors = _successors(mask, di, dj)
+        if successors[1]:
+            return i, j
+        if di != 0 and dj != 0:
+            if _jump(masks, i, j, di, 0, goal_i, goal_j) is not None \
+                    or _jump(masks, i, j, 0, dj, goal_i, goal_j) is not None:
+                return i, j
+        if not successors[2]:
+            return None
+
+
+def get_jump_points(grid_map: Map, node: Node, goal_i, goal_j):
+    '''
+    Successors of the node in JPS as (i, j) tuples: jump points in the directions left after pruning.
+    '''
+    masks = grid_map.get_window_masks()
+    mask = masks[node.i][node.j]
+    if node.is_left != 0:
+        # The side of the diagonal intersection is fixed, all its moves are kept
+        directions = [(ni - node.i, nj - node.j) for (ni, nj) in grid_map.get_neighbors(node, 3)]
+    elif node.parent is None:
+        directions = [(di, dj) for (di, dj) in _DIRECTIONS if _can_move(mask, 0, 0, di, dj)]
+    else:
+        di = (node.i > node.parent.i) - (node.i < node.parent.i)
+        dj = (node.j > node.parent.j) - (node.j < node.parent.j)
+        directions = _successors(mask, di, dj)[0]
+    jump_points = []
+    for (di, dj) in directions:
+        jump_point = _jump(masks, node.i, node.j, di, dj, goal_i, goal_j)
+        if jump_point is not None:
+            jump_points.append(jump_point)
+    return jump_points
+
+
+def jps(grid_map: Map, start_i, start_j, goal_i, goal_j, heuristic_func=None, open_type=Open, closed_type=Closed, k=3, stats=None):
+    '''
+    Jump Point Search: 2^k A* with k = 3 (8-connected moves with the rules of Map.traversable_step) which expands
+    only jump points, symmetric paths between them are skipped. Path lengths are the same as of astar2k with k = 3,
+    the path consists of jump points only.
+    '''
+    if k != 3:
+        raise ValueError("JPS supports only k = 3")
+    if stats is not None:
+        # Instrumented map and OPEN fill the stats, see util.stats
+        grid_map, open_type = stats.instrument(grid_map, open_type)
+        stats.generated += 1  # start node
+    start_node = Node(i=start_i, j=start_j)
+    OPEN = open_type()
+    CLOSED = closed_type(grid_map)
+    steps = 0
+    nodes_created = 0
+    if not grid_map.connected(start_i, start_j, goal_i, goal_j):
+        # The goal is in other components of free cells (see Map.get_components), there is nothing to search
+        return False, None, steps, nodes_created, OPEN, CLOSED
+
+    OPEN.add_node(start_node)
+    while not OPEN.is_empty():
+        current = OPEN.get_best_node()
+        steps += 1
+        if current.i == goal_i and current.j == goal_j:
+            return True, current, steps, nodes_created, OPEN, CLOSED
+        start_time = perf_counter()
+        jump_points = get_jump_points(grid_map, current, goal_i, goal_j)
+        if stats is not None:
+            stats.add_expansion(current, len(jump_points), perf_counter() - start_time)
+        for (neighbour_i, neighbour_j) in jump_points:
+            di = (neighbour_i > current.i) - (neighbour_i < current.i)
+            dj = (neighbour_j > current.j) - (neighbour_j < current.j)
+            # Side of a diagonal intersection is defined by the last move
+            is_left = grid_map.is_left_node(neighbour_i, neighbour_j, Node(neighbour_i - di, neighbour_j - dj))
+            if not CLOSED.was_expanded(neighbour_i, neighbour_j, is_left):
+                next_node = Node(i=neighbour_i, j=neighbour_j,
+                                 g=current.g + uf.compute_cost(current.i, current.j, neighbour_i, neighbour_j),
+                                 h=heuristic_func(neighbour_i, neighbour_j, goal_i, goal_j), parent=current,
+                                 k=nodes_created,
+                                 is_left=is_left)
+                nodes_created += 1
+                OPEN.add_node(next_node)
+        CLOSED.add_node(current)
+
+    return False, None, steps, nodes_created, OPEN, CLOSED
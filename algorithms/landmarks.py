@@ -0,0 +1,206 @@
+import os
+import struct
+import zlib
+from array import array
+from heapq import heappush, heappop
+from math import inf
+
+from algorithms.structures import Map, Node, get_moves
+from util import functions as uf
+
+# Landmark file: header, landmarks as (i, j) int32 pairs, then a float64 distance table of every landmark
+# with (height + 1) x (width + 1) values, the distance to point (i, j) is table[i * (width + 1) + j].
+# The header stores the size and the CRC32 of the padded grid, so tables of another map are detected.
+LANDMARKS_MAGIC = b'AAPALT01'
+LANDMARKS_HEADER = struct.Struct('<8sIIIII')  # magic, height, width, grid crc32, k, landmarks
+LANDMARKS_SUFFIX = '.alt'
+
+
+def landmarks_path(map_path):
+    return map_path + LANDMARKS_SUFFIX
+
+
+def distance_table(grid_map: Map, source_i, source_j, k=3):
+    '''
+    Lengths of the shortest paths from the point to all grid points with 2^k moves (Dijkstra),
+    inf for unreachable points. Sides of diagonal intersections aren't distinguished, so the distances
+    are not longer than the ones of 2^k A*.
+    '''
+    height, width = grid_map.get_size()
+    row = width + 1
+    table = array('d', [inf]) * ((height + 1) * row)
+    table[source_i * row + source_j] = 0.0
+    # Moves with their costs, the same as Map.get_neighbors makes
+    moves = [(di, dj, uf.compute_cost(0, 0, di, dj)) for (di, dj) in get_moves(k)]
+    traversable_step = grid_map.traversable_step
+    queue = [(0.0, source_i, source_j)]
+    while queue:
+        distance, i, j = heappop(queue)
+        if distance > table[i * row + j]:
+            continue
+        for (di, dj, cost) in moves:
+            neighbour_i = i + di
+            neighbour_j = j + dj
+            if not (0 <= neighbour_i <= height and 0 <= neighbour_j <= width):
+                continue
+            new_distance = distance + cost
+            if new_distance < table[neighbour_i * row + neighbour_j] and traversable_step(i, j, neighbour_i, neighbour_j):
+                table[neighbour_i * row + neighbour_j] = new_distance
+                heappush(queue, (new_distance, neighbour_i, neighbour_j))
+    return table
+
+
+class Landmarks:
+    '''
+    Distance tables of landmark points for the ALT heuristic: by the triangle inequality
+    |d(L, goal) - d(L, n)| <= d(n, goal) for every landmark L.
+    Tables are built with 2^k moves, so the heuristic is admissible and consistent for astar2k with the same
+    or a smaller k. For Theta* and other any-angle searches it may overestimate a bit (paths with any angles
+    are shorter than 2^k ones), so it trades a little path length for fewer expansions.
+    '''
+
+    def __init__(self, height=0, width=0, crc=0, k=3, points=None, tables=None):
+        self.height = height
+        self.width = width
+        self.crc = crc
+        self.k = k
+        self.points = points if points is not None else []
+        self.tables = tables if tables is not None else []
+
+    def __len__(self):
+        return len(self.points)
+
+    @classmethod
+    def build(cls, grid_map: Map, count=8, k=3):
+        '''
+        Picks count landmarks far from each other: the first one is the farthest point from the first free point,
+        every next one is the reachable point with the largest distance to the nearest of the chosen ones.
+        '''
+        height, width = grid_map.get_size()
+        row = width + 1
+        points = []
+        tables = []
+        seed = next(((i, j) for i in range(height + 1) for j in range(width + 1)
+                     if grid_map.get_neighbors(Node(i, j), k)), None)
+        if seed is not None:
+            nearest = distance_table(grid_map, seed[0], seed[1], k)
+            while len(points) < count:
+                best = max(range(len(nearest)), key=lambda v: nearest[v] if nearest[v] != inf else -1)
+                if nearest[best] == inf or nearest[best] == 0:
+                    break
+                points.append(divmod(best, row))
+                tables.append(distance_table(grid_map, points[-1][0], points[-1][1], k))
+                if len(points) == 1:
+                    nearest = array('d', tables[0])
+                else:
+                    for v, distance in enumerate(tables[-1]):
+                        if distance < nearest[v]:
+                            nearest[v] = distance
+        return cls(height, width, zlib.crc32(grid_map.get_padded_grid()), k, points, tables)
+
+    def save(self, path):
+        # Write to a temporary file first, so concurrent readers never see a half-written file
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'wb') as landmarks_file:
+                landmarks_file.write(LANDMARKS_HEADER.pack(LANDMARKS_MAGIC, self.height, self.width, self.crc,
+                                                           self.k, len(self)))
+                landmarks_file.write(array('i', [c for point in self.points for c in point]).tobytes())
+                for table in self.tables:
+                    landmarks_file.write(table.tobytes())
+            os.replace(tmp_path, path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    @classmethod
+    def load(cls, path, grid_map: Map = None, k=None):
+        '''
+        Reads a landmark file. Returns None if the file is broken or was built for another map (when grid_map is given)
+        or with another k (when k is given).
+        '''
+        with open(path, 'rb') as landmarks_file:
+            data = landmarks_file.read()
+        if len(data) < LANDMARKS_HEADER.size:
+            return None
+        magic, height, width, crc, file_k, count = LANDMARKS_HEADER.unpack_from(data)
+        coordinates = array('i')
+        table_size = (height + 1) * (width + 1) * array('d').itemsize
+        points_size = 2 * count * coordinates.itemsize
+        if magic != LANDMARKS_MAGIC or len(data) != LANDMARKS_HEADER.size + points_size + count * table_size:
+            return None
+        if grid_map is not None and ((height, width) != grid_map.get_size() or crc != zlib.crc32(grid_map.get_padded_grid())):
+            return None
+        if k is not None and k != file_k:
+            return None
+        position = LANDMARKS_HEADER.size
+        coordinates.frombytes(data[position:position + points_size])
+        position += points_size
+        tables = []
+        for _ in range(count):
+            table = array('d')
+            table.frombytes(data[position:position + table_size])
+            tables.append(table)
+            position += table_size
+        points = [(coordinates[2 * v], coordinates[2 * v + 1]) for v in range(count)]
+        return cls(height, width, crc, file_k, points, tables)
+
+    @classmethod
+    def for_map(cls, grid_map: Map, path=None, count=8, k=3):
+        '''
+        Landmarks of the map read from the file, the file is (re)built when it is missing or belongs to another map.
+        '''
+        landmarks = None
+        if path is not None:
+            try:
+                landmarks = cls.load(path, grid_map, k)
+            except OSError:
+                pass
+        if landmarks is None:
+            landmarks = cls.build(grid_map, count, k)
+            if path is not None:
+                try:
+                    landmarks.save(path)
+                except OSError:
+                    # Read-only directory etc.: the file is optional
+                    pass
+        return landmarks
+
+    def as_array(self):
+        '''
+        NumPy float64 copy of the tables with shape (landmarks, height + 1, width + 1).
+        '''
+        import numpy as np
+        return np.array([np.frombuffer(table, dtype=np.float64) for table in self.tables]).reshape(
+            len(self), self.height + 1, self.width + 1)
+
+    def heuristic(self, base=uf.euclidian_distance):
+        '''
+        Heuristic function with the signature of euclidian_distance: the maximum of the base heuristic
+        and the landmark bounds. Distances to the last goal are cached, as a search asks for one goal only.
+        The bounds are admissible only for searches with k <= self.k: paths with more directions of moves are shorter.
+        '''
+        row = self.width + 1
+        tables = self.tables
+        goal = [None, ()]
+
+        def landmark_distance(i1, j1, i2, j2):
+            if goal[0] != (i2, j2):
+                goal[0] = (i2, j2)
+                goal[1] = tuple(table[i2 * row + j2] for table in tables)
+            h = base(i1, j1, i2, j2)
+            index = i1 * row + j1
+            for table, to_goal in zip(tables, goal[1]):
+                to_point = table[index]
+                if to_point == inf or to_goal == inf:
+                    if to_point != to_goal:
+                        # One of the points is reachable from the landmark, the other one is not
+                        return inf
+                    continue
+                bound = to_goal - to_point if to_goal > to_point else to_point - to_goal
+                if bound > h:
+                    h = bound
+            return h
+
+        return landmark_distance
@@ -0,0 +1,69 @@
+from util.containers import Open, Closed
+from algorithms.structures import Map, Node
+from util import functions as uf
+
+
+def lazythetastar(grid_map: Map, start_i, start_j, goal_i, goal_j, heuristic_func=None, open_type=Open, closed_type=Closed, k=2, stats=None):
+    '''
+    Lazy Theta*: a generated node optimistically gets the parent of the expanded node as its parent,
+    line of sight to it is checked only when the node is expanded. If there is no line of sight,
+    the node gets the best expanded node which generated it as the parent, as in 2^k A*.
+    '''
+    if stats is not None:
+        # Instrumented map and OPEN fill the stats, see util.stats
+        grid_map, open_type = stats.instrument(grid_map, open_type)
+        stats.generated += 1  # start node
+    start_node = Node(i=start_i, j=start_j)
+    OPEN = open_type()
+    CLOSED = closed_type(grid_map)
+    steps = 0
+    nodes_created = 0
+    if not grid_map.connected(start_i, start_j, goal_i, goal_j):
+        # The goal is in other components of free cells (see Map.get_components), there is nothing to search
+        return False, None, steps, nodes_created, OPEN, CLOSED
+    if (start_i != goal_i or start_j != goal_j) and grid_map.line_of_sight(start_i, start_j, goal_i, goal_j):
+        # The goal is visible from the start, the segment is the shortest path
+        nodes_created += 1
+        return True, Node(i=goal_i, j=goal_j, g=uf.compute_cost(start_i, start_j, goal_i, goal_j), parent=start_node), \
+            steps, nodes_created, OPEN, CLOSED
+    # (i, j, is_left) -> (g, node): the best expanded node which generated the state, the fallback parent
+    best_generator = dict()
+
+    OPEN.add_node(start_node)
+    while not OPEN.is_empty():
+        current = OPEN.get_best_node()
+        steps += 1
+        key = (current.i, current.j, current.is_left)
+        if current.parent is not None:
+            generator_g, generator = best_generator.pop(key)
+            if current.parent is not generator and not grid_map.traversable_step_long(current.parent.i, current.parent.j,
+                                                                                      current.i, current.j):
+                current.parent = generator
+                current.g = generator_g
+                current.F = generator_g + current.h
+        if current.i == goal_i and current.j == goal_j:
+            return True, current, steps, nodes_created, OPEN, CLOSED
+        for (neighbour_i, neighbour_j) in grid_map.get_neighbors(current, k):
+            is_left = grid_map.is_left_node(neighbour_i, neighbour_j, current)
+            if not CLOSED.was_expanded(neighbour_i, neighbour_j, is_left):
+                g = current.g + uf.compute_cost(current.i, current.j, neighbour_i, neighbour_j)
+                neighbour_key = (neighbour_i, neighbour_j, is_left)
+                in_generators = best_generator.get(neighbour_key)
+                if in_generators is None or in_generators[0] > g:
+                    best_generator[neighbour_key] = (g, current)
+                if current.parent is not None:
+                    # Line of sight is assumed, it's checked on expansion
+                    next_node = Node(i=neighbour_i, j=neighbour_j,
+                                     g=current.parent.g + uf.compute_cost(current.parent.i, current.parent.j, neighbour_i,
+                                                                          neighbour_j),
+                                     h=heuristic_func(neighbour_i, neighbour_j, goal_i, goal_j), parent=current.parent,
+                                     k=nodes_created, is_left=is_left)
+                else:
+                    next_node = Node(i=neighbour_i, j=neighbour_j, g=g,
+                                     h=heuristic_func(neighbour_i, neighbour_j, goal_i, goal_j), parent=current,
+                                     k=nodes_created, is_left=is_left)
+                nodes_created += 1
+                OPEN.add_node(next_node)
+        CLOSED.add_node(current)
+
+    return False, None, steps, nodes_created, OPEN, CLOSED
@@ -1,8 +1,30 @@
+import os
+import struct
+import zlib
+from array import array
+from bisect import bisect_left, bisect_right
 from fractions import Fraction
+from itertools import compress
+from math import gcd, lcm
+from operator import ne
 from util.functions import compute_cost
 
+# Corner successors file of ANYA (see AnyaMap.precompute_corner_successors): header, entries as
+# (i, j, di, dj, intervals) int32 tuples, then intervals as (aj, bj) int32 pairs.
+# The header stores the size and the CRC32 of the padded grid, so a file of another map is detected.
+CORNER_SUCCESSORS_MAGIC = b'AAPANYA1'
+CORNER_SUCCESSORS_HEADER = struct.Struct('<8sIIIII')  # magic, height, width, grid crc32, entries, intervals
+CORNER_SUCCESSORS_SUFFIX = '.anya'
+
+
+def corner_successors_path(map_path):
+    return map_path + CORNER_SUCCESSORS_SUFFIX
+
 
 class Node:
+    # No per-instance __dict__: searches create hundreds of thousands of nodes
+    __slots__ = ('i', 'j', 'g', 'h', 'k', 'F', 'parent', 'is_left')
+
     def __init__(self, i, j, g=0, h=0, F=None, parent=None, k=0, is_left=0):
         self.i = i
         self.j = j
@@ -28,37 +50,92 @@ class Node:
         return hash((self.i, self.j))
 
 
+# k -> moves of 2^k A*, see get_moves
+_moves_cache = dict()
+
+
+def get_moves(k):
+    '''
+    The 2^k moves as (di, dj) tuples: the 4 cardinal ones for k = 2, every next k adds the sums of adjacent moves.
+    '''
+    moves = _moves_cache.get(k)
+    if moves is None:
+        delta = [[[0, 1], [1, 0], [0, -1], [-1, 0]], []]
+        for ind in range(3, k + 1):
+            cur = ind % 2
+            delta[cur] = []
+            old = (ind + 1) % 2
+            for old_i in range(0, len(delta[old])):
+                old_i1 = (old_i + 1) % len(delta[old])
+                delta[cur].append(delta[old][old_i])
+                delta[cur].append([delta[old][old_i][0] + delta[old][old_i1][0], delta[old][old_i][1] + delta[old][old_i1][1]])
+        moves = tuple((di, dj) for (di, dj) in delta[k % 2])
+        _moves_cache[k] = moves
+    return moves
+
+
+# (k, mask) -> moves of get_moves(k) with set bits in the mask, see Map.get_move_masks
+_mask_moves_cache = dict()
+
+
+def get_mask_moves(k, mask):
+    moves = _mask_moves_cache.get((k, mask))
+    if moves is None:
+        moves = tuple(move for (index, move) in enumerate(get_moves(k)) if mask >> index & 1)
+        _mask_moves_cache[(k, mask)] = moves
+    return moves
+
+
 class Map:
 
     def __init__(self, k=None):
         self._width = 0
         self._height = 0
-        self._cells = []
+        # Cells are kept in one contiguous uint8 buffer of (height + 2) x (width + 2) bytes:
+        #   the grid is surrounded with a border of obstacles, so lookups just outside of the map need no checks.
+        #   _rows holds a memoryview of every padded row, so cell (i, j) is _rows[i + 1][j + 1]
+        self._grid = bytearray()
+        self._rows = []
         self.k = k
+        # Obstacles around every grid point, built on the first use (see get_window_masks)
+        self._window_masks = None
+        # Components of free cells, built on the first use (see get_components)
+        self._components = None
+        # k -> valid moves of every grid point, filled on the first use (see get_move_masks)
+        self._move_masks = dict()
+        # Incremented on every change of the grid, so caches of results (see util.path_cache) can detect it
+        self.version = 0
+
+    def _allocate(self, width, height, grid=None):
+        self._width = width
+        self._height = height
+        if grid is None:
+            grid = bytearray(b'\x01') * ((height + 2) * (width + 2))
+        if len(grid) != (height + 2) * (width + 2):
+            raise Exception("Size Error. Grid size = ", len(grid), ", but must be", (height + 2) * (width + 2))
+        self._grid = grid
+        view = memoryview(self._grid)
+        self._rows = [view[r * (width + 2):(r + 1) * (width + 2)] for r in range(height + 2)]
+        self._window_masks = None
+        self._components = None
+        self._move_masks = dict()
+        self.version += 1
 
     def read_from_string(self, cell_str, width, height):
         '''
         Converting a string (with '#' representing obstacles and '.' representing free cells) to a grid
         '''
-        self._width = width
-        self._height = height
-        self._cells = [[0 for _ in range(width)] for _ in range(height)]
+        self._allocate(width, height)
         cell_lines = cell_str.split("\n")
         i = 0
-        j = 0
         for l in cell_lines:
             if len(l) != 0:
-                j = 0
-                for c in l:
-                    if c == '.':
-                        self._cells[i][j] = 0
-                    elif c == '#':
-                        self._cells[i][j] = 1
-                    else:
-                        continue
-                    j += 1
-                if j != width:
-                    raise Exception("Size Error. Map width = ", j, ", but must be", width)
+                row = [c == '#' for c in l if c == '.' or c == '#']
+                if len(row) != width:
+                    raise Exception("Size Error. Map width = ", len(row), ", but must be", width)
+                if i >= height:
+                    raise Exception("Size Error. Map height = ", i + 1, ", but must be", height)
+                self._rows[i + 1][1:width + 1] = bytes(row)
                 i += 1
         if i != height:
             raise Exception("Size Error. Map height = ", i, ", but must be", height)
@@ -67,9 +144,181 @@ class Map:
         '''
         Initialization of map by list of cells.
         '''
-        self._width = width
-        self._height = height
-        self._cells = grid_cells
+        self._allocate(width, height)
+        for i in range(height):
+            self._rows[i + 1][1:width + 1] = bytes(1 if c else 0 for c in grid_cells[i])
+
+    def set_padded_grid(self, width, height, grid):
+        '''
+        Initialization of map by a buffer (bytearray, mmap, memoryview, ...) which is already
+        in the padded layout: (height + 2) x (width + 2) bytes, 1 for obstacles, border included.
+        The buffer is used as is, without copying.
+        '''
+        self._allocate(width, height, grid)
+
+    def get_padded_grid(self):
+        return self._grid
+
+    def set_obstacle(self, i, j, blocked=True):
+        '''
+        Changes one cell, the indexes built from the grid are updated.
+        '''
+        if not self.in_bounds_cells(i, j):
+            raise ValueError(f"cell ({i}, {j}) is out of the map")
+        blocked = 1 if blocked else 0
+        if self._rows[i + 1][j + 1] == blocked:
+            return
+        self._rows[i + 1][j + 1] = blocked
+        if self._window_masks is not None:
+            # The cell is in the windows of the points (i + 2 - oi, j + 2 - oj), see get_window_masks
+            for pi in range(max(i - 1, 0), min(i + 2, self._height) + 1):
+                row = self._window_masks[pi]
+                for pj in range(max(j - 1, 0), min(j + 2, self._width) + 1):
+                    row[pj] ^= 1 << (4 * (i - pi + 2) + (j - pj + 2))
+        for (k, masks) in self._move_masks.items():
+            # Moves crossing the cell start at most radius points away from its corners
+            radius = max(max(abs(di), abs(dj)) for (di, dj) in get_moves(k))
+            row = self._width + 1
+            for pi in range(max(i - radius, 0), min(i + 1 + radius, self._height) + 1):
+                for pj in range(max(j - radius, 0), min(j + 1 + radius, self._width) + 1):
+                    masks[pi * row + pj] = None
+        self._components = None
+        self.version += 1
+
+    def as_array(self):
+        '''
+        NumPy uint8 view of the padded grid with shape (height + 2, width + 2), the data is not copied.
+        '''
+        import numpy as np
+        return np.frombuffer(self._grid, dtype=np.uint8).reshape(self._height + 2, self._width + 2)
+
+    def get_window_masks(self):
+        '''
+        masks[i][j] for every grid point (0 <= i <= height, 0 <= j <= width) is a 16 bit mask of obstacles
+        of the 4x4 cells around it: bit 4 * (oi + 2) + (oj + 2) is cell (i + oi, j + oj), -2 <= oi, oj <= 1.
+        These cells define all the moves between the point and its neighbours and between the neighbours.
+        '''
+        if self._window_masks is None:
+            width = self._width
+            # Every row of cells from -2 to height + 1 as 4 bit windows of cells (j - 2 .. j + 1) for every j
+            border = bytes(b'\x01') * (width + 4)
+            windows = []
+            for row in [border] + [b'\x01' + bytes(row) + b'\x01' for row in self._rows] + [border]:
+                window = row[0] << 1 | row[1] << 2 | row[2] << 3
+                row_windows = []
+                for cell in row[3:]:
+                    window = window >> 1 | cell << 3
+                    row_windows.append(window)
+                windows.append(row_windows)
+            self._window_masks = [
+                [w0 | w1 << 4 | w2 << 8 | w3 << 12 for (w0, w1, w2, w3) in zip(*windows[i:i + 4])]
+                for i in range(self._height + 1)
+            ]
+        return self._window_masks
+
+    def get_move_masks(self, k):
+        '''
+        Valid moves of 2^k A* from every grid point: bit m of masks[i * (width + 1) + j] is set if the move m
+        of get_moves(k) from the point (i, j) stays in the map and is traversable (traversable_step).
+        A mask is None till the first get_neighbors of the point, precompute_move_masks computes all of them.
+        '''
+        masks = self._move_masks.get(k)
+        if masks is None:
+            masks = [None] * ((self._height + 1) * (self._width + 1))
+            self._move_masks[k] = masks
+        return masks
+
+    def _move_mask(self, i, j, k):
+        mask = 0
+        for (index, (di, dj)) in enumerate(get_moves(k)):
+            if self.in_bounds(i + di, j + dj) and self.traversable_step(i, j, i + di, j + dj):
+                mask |= 1 << index
+        return mask
+
+    def precompute_move_masks(self, k):
+        '''
+        Computes the masks of all grid points for 2^k moves. All the moves are valid from a point
+        which has no obstacles in the cells its moves can cross, these points are found with prefix sums of obstacles.
+        '''
+        masks = self.get_move_masks(k)
+        height, width = self._height, self._width
+        row = width + 1
+        moves = get_moves(k)
+        radius = max(max(abs(di), abs(dj)) for (di, dj) in moves)
+        full_mask = (1 << len(moves)) - 1
+        # obstacles[i][j] is the number of obstacles among cells (i', j') with i' < i, j' < j
+        obstacles = [[0] * (width + 1)]
+        for i in range(height):
+            sums = [0]
+            for cell in self._rows[i + 1][1:width + 1]:
+                sums.append(sums[-1] + cell)
+            obstacles.append([above + left for (above, left) in zip(obstacles[-1], sums)])
+        for i in range(height + 1):
+            for j in range(row):
+                if masks[i * row + j] is not None:
+                    continue
+                if radius <= i <= height - radius and radius <= j <= width - radius:
+                    top, bottom, left, right = i - radius, i + radius, j - radius, j + radius
+                    if obstacles[bottom][right] - obstacles[top][right] - obstacles[bottom][left] + obstacles[top][left] == 0:
+                        masks[i * row + j] = full_mask
+                        continue
+                masks[i * row + j] = self._move_mask(i, j, k)
+
+    def get_components(self):
+        '''
+        Labels of the connected components of free cells in the padded grid layout: the label of cell (i, j)
+        is components[(i + 1) * (width + 2) + j + 1], 0 for obstacles. Cells are connected through their sides:
+        every move (see traversable_step) goes along a side of a free cell or through it, and a path can't go
+        through a diagonal intersection of obstacles from one free cell to the other.
+        '''
+        if self._components is None:
+            row = self._width + 2
+            grid = self._grid
+            components = array('i', [0]) * len(grid)
+            label = 0
+            for first in range(row, len(grid) - row):
+                if grid[first] or components[first]:
+                    continue
+                label += 1
+                components[first] = label
+                stack = [first]
+                while stack:
+                    cell = stack.pop()
+                    # The border of obstacles stops the search at the edges of the map
+                    for neighbour in (cell - 1, cell + 1, cell - row, cell + row):
+                        if not grid[neighbour] and not components[neighbour]:
+                            components[neighbour] = label
+                            stack.append(neighbour)
+            self._components = components
+        return self._components
+
+    def point_components(self, i, j):
+        '''
+        Labels of the components of the free cells around the grid point (two for a diagonal intersection).
+        '''
+        components = self.get_components()
+        row = self._width + 2
+        cell = i * row + j
+        return {components[cell], components[cell + 1], components[cell + row], components[cell + row + 1]} - {0}
+
+    def connected(self, i1, j1, i2, j2):
+        '''
+        Check if there is a path between two grid points, it takes O(1) after the components are built.
+        '''
+        return (i1 == i2 and j1 == j2) or not self.point_components(i1, j1).isdisjoint(self.point_components(i2, j2))
+
+    def line_of_sight(self, i1, j1, i2, j2):
+        '''
+        traversable_step_long which also forbids horizontal and vertical segments going through diagonal intersections
+        of obstacles, as ANYA and 2^k A* (is_left_node) do.
+        '''
+        if not self.traversable_step_long(i1, j1, i2, j2):
+            return False
+        if i1 == i2:
+            return not any(self.is_diagonal_intersection(i1, j) for j in range(min(j1, j2) + 1, max(j1, j2)))
+        if j1 == j2:
+            return not any(self.is_diagonal_intersection(i, j1) for i in range(min(i1, i2) + 1, max(i1, i2)))
+        return True
 
     def is_diagonal_intersection(self, i, j):
         return (self.is_obstacle(i, j) and self.is_obstacle(i-1, j-1) and not self.is_obstacle(i-1, j) and not self.is_obstacle(i, j-1)) \
@@ -97,101 +346,105 @@ class Map:
         return (0 <= j < self._width) and (0 <= i < self._height)
 
     def traversable_step_long(self, i1, j1, i2, j2):
+        '''
+        Line of sight check between two grid points. Only integer arithmetic is used: the segment is split
+        into gcd(|i2 - i1|, |j2 - j1|) equal steps between the grid points lying on it, each step is checked
+        with traversable_step and squeezing between two diagonally adjacent obstacles is forbidden in the
+        intermediate points.
+        '''
+        is_obstacle = self.is_obstacle
         if i2 == i1:
             if j1 > j2:
                 j1, j2 = j2, j1
+            # Same as traversable_step for every unit step (row -1 is the obstacle border)
             for j in range(j1, j2):
-                if not self.traversable_step(i1, j, i1, j+1):
+                if is_obstacle(i1 - 1, j) and is_obstacle(i1, j):
                     return False
             return True
 
         if i1 > i2:
             i1, i2 = i2, i1
             j1, j2 = j2, j1
-        d = Fraction(j2 - j1, i2 - i1)
-        iprev = i1
-        jprev = j1
+        steps = gcd(i2 - i1, j2 - j1)
+        si = (i2 - i1) // steps
+        sj = (j2 - j1) // steps
         i = i1
-        j = Fraction(j1)
-        while i < i2:
-            i += 1
-            j += d
-            if j.denominator == 1:
-                if not self.traversable_step(iprev, jprev, i, j.numerator):
+        j = j1
+        for _ in range(steps):
+            if not self.traversable_step(i, j, i + si, j + sj):
+                return False
+            i += si
+            j += sj
+            if i != i2:
+                if is_obstacle(i-1, j) and is_obstacle(i, j-1):
+                    return False
+                if is_obstacle(i-1, j-1) and is_obstacle(i, j):
                     return False
-                iprev = i
-                jprev = j.numerator
-                if i != i2:
-                    if self.is_obstacle(i-1, j.numerator) and self.is_obstacle(i, j.numerator-1):
-                        return False
-                    if self.is_obstacle(i-1, j.numerator-1) and self.is_obstacle(i, j.numerator):
-                        return False
         return True
 
     def traversable_step(self, i1, j1, i2, j2):
+        '''
+        Check of the segment between two grid points which doesn't contain other grid points.
+        Columns of the crossed cells in row i are floor(j1 + dj * (i - i1) / di), computed with integer division.
+        '''
+        is_obstacle = self.is_obstacle
+        # Row -1 and column -1 are the obstacle border, so the first row and column need no special case
         if i1 == i2:
-            if i1 == 0:
-                return not self.is_obstacle(i1, min(j1, j2))
-            return (not self.is_obstacle(i1 - 1, min(j1, j2))) or (not self.is_obstacle(i1, min(j1, j2)))
+            return (not is_obstacle(i1 - 1, min(j1, j2))) or (not is_obstacle(i1, min(j1, j2)))
         if j1 == j2:
-            if j1 == 0:
-                return not self.is_obstacle(min(i1, i2), j1)
-            return (not self.is_obstacle(min(i1, i2), j1 - 1)) or (not self.is_obstacle(min(i1, i2), j1))
+            return (not is_obstacle(min(i1, i2), j1 - 1)) or (not is_obstacle(min(i1, i2), j1))
         if i1 > i2:
             i1, i2 = i2, i1
             j1, j2 = j2, j1
-        d = Fraction(j2 - j1, (i2 - i1))
-        i = i1
-        j = j1
-        while i < i2:
-            jl = j.__floor__()
-            jr = (j+d).__floor__()
-            if i == i2 - 1:
-                jr = j2
-            mij = min(jl, jr)
-            maj = max(jl, jr)
-            if (i == i1 and d < 0) or (i == i2 - 1 and d > 0):
+        di = i2 - i1
+        dj = j2 - j1
+        numerator = 0
+        jl = j1
+        for i in range(i1, i2):
+            numerator += dj
+            jr = j1 + numerator // di
+            if jl < jr:
+                mij = jl
+                maj = jr
+            else:
+                mij = jr
+                maj = jl
+            if (i == i1 and dj < 0) or (i == i2 - 1 and dj > 0):
                 maj -= 1
             for j_ in range(mij, maj + 1):
-                if self.is_obstacle(i, j_):
+                if is_obstacle(i, j_):
                     return False
-            i += 1
-            j += d
+            jl = jr
         return True
 
     def traversable(self, i, j):
         '''
         Check if the cell is not an obstacle.
         '''
-        return not self._cells[i][j]
+        return not self._rows[i + 1][j + 1]
 
     def get_neighbors(self, node: Node, k=None):
         '''
         Get a list of neighbouring cells as (i,j) tuples.
         It's assumed that grid is 4-connected (i.e. only moves into cardinal directions are allowed)
         '''
-        neighbors = []
         i = node.i
         j = node.j
         if k is None:
             k = self.k
         if k is None:
             k = 2
-        delta = [[[0, 1], [1, 0], [0, -1], [-1, 0]], []]
-        for ind in range(3, k + 1):
-            cur = ind % 2
-            delta[cur] = []
-            old = (ind + 1) % 2
-            for old_i in range(0, len(delta[old])):
-                old_i1 = (old_i + 1) % len(delta[old])
-                delta[cur].append(delta[old][old_i])
-                delta[cur].append([delta[old][old_i][0] + delta[old][old_i1][0], delta[old][old_i][1] + delta[old][old_i1][1]])
-
-        delta = delta[k % 2]
 
-        for d in delta:
-            if self.in_bounds(i + d[0], j + d[1]) and self.traversable_step(i, j, i + d[0], j + d[1]):  # self.traversable(i + d[0], j + d[1]):
-                neighbors.append((i + d[0], j + d[1]))
+        if 0 <= i <= self._height and 0 <= j <= self._width:
+            # The moves of the point are checked once, see get_move_masks
+            masks = self.get_move_masks(k)
+            point = i * (self._width + 1) + j
+            mask = masks[point]
+            if mask is None:
+                mask = masks[point] = self._move_mask(i, j, k)
+            neighbors = [(i + di, j + dj) for (di, dj) in get_mask_moves(k, mask)]
+        else:
+            neighbors = [(i + di, j + dj) for (di, dj) in get_mask_moves(k, self._move_mask(i, j, k))]
         if node.is_left == 0:
             return neighbors
         answer = []
@@ -214,26 +467,52 @@ class Map:
         return (0 <= j <= self._width) and (0 <= i <= self._height)
 
     def is_obstacle(self, i, j):
-        if i < 0 or j < 0 or i >= self._height or j >= self._width:
+        # The border covers indexes -1 and height/width, indexes further to the right or to the bottom raise IndexError
+        if i < -1 or j < -1:
+            return True
+        try:
+            return self._rows[i + 1][j + 1]
+        except IndexError:
             return True
-        if type(i) is Fraction:
-            i = i.__floor__()
-        if type(j) is Fraction:
-            j = j.__floor__()
-        return self._cells[i][j]
+        except TypeError:
+            # Fraction coordinates
+            return self.is_obstacle(i.__floor__(), j.__floor__())
 
 
 class AnyaNode:
+    '''
+    ANYA search node: root (i, j) and interval [aj; bj] on row ai (ai == bi).
+    Interval endpoints are rational, they are kept exactly as integer numerators over a shared
+    positive denominator: aj = an / den and bj = bn / den, reduced so that gcd(an, bn, den) == 1.
+    The constructor takes endpoints as integers or Fractions, or as numerators if den is given.
+    '''
+    __slots__ = ('i', 'j', 'ai', 'an', 'bi', 'bn', 'den', 'g', 'h', 'k', 'F', 'parent')
 
-    def __init__(self, i: int, j: int, ai: int, aj: Fraction, bi: int, bj: Fraction, g=0, h=0, F=None, parent=None, k=0):
+    def __init__(self, i: int, j: int, ai: int, aj, bi: int, bj, g=0, h=0, F=None, parent=None, k=0, den=None):
+        if aj is None or bj is None:
+            den = 1
+        elif den is None:
+            if type(aj) is int and type(bj) is int:
+                den = 1
+            else:
+                den = lcm(aj.denominator, bj.denominator)
+                aj = aj.numerator * (den // aj.denominator)
+                bj = bj.numerator * (den // bj.denominator)
+        elif den != 1:
+            common = gcd(aj, bj, den)
+            if common != 1:
+                aj //= common
+                bj //= common
+                den //= common
         if aj is not None and bj is not None:
             assert aj <= bj
         self.i: int = i
         self.j: int = j
         self.ai: int = ai
-        self.aj: Fraction = aj
+        self.an: int = aj
         self.bi: int = bi
-        self.bj: Fraction = bj
+        self.bn: int = bj
+        self.den: int = den
         self.g = g
         self.h = h
         self.k = k
@@ -243,33 +522,55 @@ class AnyaNode:
             self.F = F
         self.parent = parent
 
+    @property
+    def aj(self):
+        return None if self.an is None else Fraction(self.an, self.den)
+
+    @property
+    def bj(self):
+        return None if self.bn is None else Fraction(self.bn, self.den)
+
     def __eq__(self, other):
-        return (self.i == other.i) and (self.j == other.j) and (self.ai == other.ai) and (self.aj == other.aj)\
-            and (self.bi == other.bi) and (self.bj == other.bj)
+        return (self.i == other.i) and (self.j == other.j) and (self.ai == other.ai) and (self.an == other.an)\
+            and (self.bi == other.bi) and (self.bn == other.bn) and (self.den == other.den)
 
     def __lt__(self, other):
         return self.F < other.F or ((self.F == other.F) and (self.h < other.h)) \
                or ((self.F == other.F) and (self.h == other.h) and (self.k > other.k))
 
     def __hash__(self):
-        return hash((self.i, self.j, self.ai, self.aj, self.bi, self.bj))
+        return hash((self.i, self.j, self.ai, self.an, self.bi, self.bn, self.den))
 
     def update_h(self, goal_i, goal_j):
         if self.i <= self.ai <= goal_i or self.i >= self.ai >= goal_i:
             pass
         else:
             goal_i = self.ai + (self.ai - goal_i)
+        # Everything is scaled by den, so endpoints are integers: an, bn
+        den = self.den
+        j = self.j * den
         if goal_i == self.i:
-            self.h = min(abs(self.j - self.aj) + abs(self.aj - goal_j), abs(self.j - self.bj) + abs(self.bj - goal_j))
+            gj = goal_j * den
+            self.h = min(abs(j - self.an) + abs(self.an - gj), abs(j - self.bn) + abs(self.bn - gj)) / den
             self.F = self.g + self.h
             return
-        cj = self.j + Fraction((goal_j - self.j) * (self.ai - self.i), goal_i - self.i)
-        if self.aj <= cj <= self.bj:
+        # Projection of the segment from root to goal on the interval's row: cj = (j * q + p) / q
+        p = (goal_j - self.j) * (self.ai - self.i)
+        q = goal_i - self.i
+        if q < 0:
+            p = -p
+            q = -q
+        cj = (self.j * q + p) * den
+        if self.an * q <= cj <= self.bn * q:
             self.h = ((self.i - goal_i) ** 2 + (self.j - goal_j) ** 2) ** 0.5
         else:
+            # Distances to the endpoints are computed exactly as integer ratios and rounded once
+            den2 = den * den
             self.h = min(
-                ((self.i - self.ai) ** 2 + (self.j - self.aj) ** 2) ** 0.5 + ((goal_i - self.ai) ** 2 + (goal_j - self.aj) ** 2) ** 0.5,
-                ((self.i - self.bi) ** 2 + (self.j - self.bj) ** 2) ** 0.5 + ((goal_i - self.bi) ** 2 + (goal_j - self.bj) ** 2) ** 0.5
+                (((self.i - self.ai) ** 2 * den2 + (j - self.an) ** 2) / den2) ** 0.5
+                + (((goal_i - self.ai) ** 2 * den2 + (goal_j * den - self.an) ** 2) / den2) ** 0.5,
+                (((self.i - self.bi) ** 2 * den2 + (j - self.bn) ** 2) / den2) ** 0.5
+                + (((goal_i - self.bi) ** 2 * den2 + (goal_j * den - self.bn) ** 2) / den2) ** 0.5
             )
         self.F = self.g + self.h
         return
@@ -277,94 +578,292 @@ class AnyaNode:
 
 class AnyaMap(Map):
 
+    def __init__(self, k=None):
+        super().__init__(k)
+        # Index of obstacle changes along the rows, it's built on the first search (see _build_changes_index)
+        self._changes = None
+        self._pair_changes = None
+        # Successor intervals of corner points by (i, j, di, dj), filled on the first use (see _corner_intervals),
+        #   at most corner_cache_size of them are kept unless they are precomputed
+        self._corner_successors = dict()
+        self.corner_cache_size = 1 << 16
+
+    def _allocate(self, width, height, grid=None):
+        super()._allocate(width, height, grid)
+        self._changes = None
+        self._pair_changes = None
+        self._corner_successors = dict()
+
+    def set_obstacle(self, i, j, blocked=True):
+        super().set_obstacle(i, j, blocked)
+        if self._changes is not None:
+            row = bytes(self._rows[i + 1])
+            self._changes[i + 1] = [c for c in range(self._width + 1) if row[c] != row[c + 1]]
+            for r in (i, i + 1):
+                self._pair_changes[r + 1] = sorted(set(self._changes[r]).union(self._changes[r + 1]))
+        # Intervals of a corner on row pi depend on rows of cells from pi - 2 to pi + 1
+        for key in [key for key in self._corner_successors if i - 1 <= key[0] <= i + 2]:
+            del self._corner_successors[key]
+
+    def _build_changes_index(self):
+        '''
+        _changes[i + 1] is a sorted list of columns c (0 <= c <= width) where is_obstacle(i, c - 1) != is_obstacle(i, c),
+        for every row of cells i from -1 to height. _pair_changes[i + 1] is the union of these lists for rows i - 1 and i,
+        i.e. corner points on the row i of grid points. All scans along the rows in ANYA use them to jump
+        to the next change with binary search instead of walking cell by cell.
+        '''
+        columns = range(self._width + 1)
+        self._changes = []
+        for row in self._rows:
+            row = bytes(row)
+            self._changes.append(list(compress(columns, map(ne, row[:-1], row[1:]))))
+        self._pair_changes = [self._changes[0]] + [
+            sorted(set(self._changes[r]).union(self._changes[r + 1])) for r in range(self._height + 1)
+        ]
+
+    def _next_obstacle(self, i, j):
+        # First column c >= j with an obstacle in row i, j <= width
+        if self.is_obstacle(i, j):
+            return j
+        changes = self._changes[i + 1]
+        return changes[bisect_right(changes, j)]
+
+    def _prev_obstacle(self, i, j):
+        # Last column c <= j with an obstacle in row i, j >= -1
+        if self.is_obstacle(i, j):
+            return j
+        changes = self._changes[i + 1]
+        return changes[bisect_right(changes, j) - 1] - 1
+
+    def _flat_end_right(self, i, j):
+        # Walking from (i, j) to the right till the first corner point on row i (or the border)
+        if not (0 <= i <= self._height) or j >= self._width:
+            return j
+        changes = self._pair_changes[i + 1]
+        k = bisect_right(changes, j)
+        return changes[k] if k < len(changes) else self._width
+
+    def _flat_end_left(self, i, j):
+        if not (0 <= i <= self._height) or j <= 0:
+            return j
+        changes = self._pair_changes[i + 1]
+        k = bisect_left(changes, j) - 1
+        return changes[k] if k >= 0 else 0
+
+    def _corner_points_right(self, i, block_row, split_row, j):
+        '''
+        Walking on row i of grid points from j to the right: returns columns where obstacles of split_row change
+        and, the last one, the first column with an obstacle in block_row. Empty if row i is out of the map.
+        '''
+        if not (0 <= i <= self._height) or j >= self._width:
+            return []
+        stop = self._next_obstacle(block_row, j + 1)
+        changes = self._changes[split_row + 1] if -1 <= split_row <= self._height else []
+        points = changes[bisect_right(changes, j):bisect_left(changes, stop)]
+        points.append(stop)
+        return points
+
+    def _corner_points_left(self, i, block_row, split_row, j):
+        '''
+        Same to the left: columns in decreasing order, the walk stops at column c with an obstacle in (block_row, c - 1).
+        '''
+        if not (0 <= i <= self._height) or j <= 0:
+            return []
+        stop = self._prev_obstacle(block_row, j - 2) + 1
+        changes = self._changes[split_row + 1] if -1 <= split_row <= self._height else []
+        points = changes[bisect_right(changes, stop):bisect_left(changes, j)]
+        points.reverse()
+        points.append(stop)
+        return points
+
+    def _scan_corner_intervals(self, pi, pj, di, dj):
+        '''
+        Intervals (aj, bj) on row pi + di of successors rooted at the corner point (pi, pj) which go from pj
+        to the right (dj = 1) or to the left (dj = -1). The obstacle is behind the corner and the cell in front of it
+        is free, otherwise the corner can't be passed to this side and there are no intervals.
+        '''
+        ti = pi + di
+        cell_row = pi - 1 if di < 0 else pi
+        split_row = cell_row + di
+        intervals = []
+        prev_j = pj
+        if dj > 0:
+            if not self.is_obstacle(cell_row, pj - 1) or self.is_obstacle(cell_row, pj):
+                return ()
+            for tj in self._corner_points_right(ti, cell_row, split_row, pj):
+                intervals.append((prev_j, tj))
+                prev_j = tj
+        else:
+            if not self.is_obstacle(cell_row, pj) or self.is_obstacle(cell_row, pj - 1):
+                return ()
+            for tj in self._corner_points_left(ti, cell_row, split_row, pj):
+                intervals.append((tj, prev_j))
+                prev_j = tj
+        return tuple(intervals)
+
+    def _corner_intervals(self, pi, pj, di, dj):
+        '''
+        Cached _scan_corner_intervals: the intervals don't depend on the node which turns at the corner,
+        only g of the successors does. Corners without intervals aren't kept, when the cache is full
+        the oldest entry is dropped.
+        '''
+        key = (pi, pj, di, dj)
+        intervals = self._corner_successors.get(key)
+        if intervals is None:
+            intervals = self._scan_corner_intervals(pi, pj, di, dj)
+            if intervals:
+                if len(self._corner_successors) >= self.corner_cache_size:
+                    del self._corner_successors[next(iter(self._corner_successors))]
+                self._corner_successors[key] = intervals
+        return intervals
+
+    def precompute_corner_successors(self, path=None):
+        '''
+        Fills the cache of corner successors for all the corners of the map, without the size limit.
+        If path is given, the intervals are read from this file, and the file is (re)built when it is missing
+        or belongs to another map.
+        '''
+        if self._changes is None:
+            self._build_changes_index()
+        if path is not None:
+            try:
+                if self.load_corner_successors(path):
+                    return
+            except OSError:
+                pass
+        corners = self._corner_successors
+        for pi in range(self._height + 1):
+            for pj in range(self._width + 1):
+                for di in (-1, 1):
+                    for dj in (1, -1):
+                        intervals = self._scan_corner_intervals(pi, pj, di, dj)
+                        if intervals:
+                            corners[(pi, pj, di, dj)] = intervals
+        if path is not None:
+            try:
+                self.save_corner_successors(path)
+            except OSError:
+                # Read-only directory etc.: the file is optional
+                pass
+
+    def save_corner_successors(self, path):
+        entries = array('i')
+        intervals = array('i')
+        for (key, corner_intervals) in self._corner_successors.items():
+            entries.extend(key + (len(corner_intervals),))
+            for interval in corner_intervals:
+                intervals.extend(interval)
+        # Write to a temporary file first, so concurrent readers never see a half-written file
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'wb') as corners_file:
+                corners_file.write(CORNER_SUCCESSORS_HEADER.pack(CORNER_SUCCESSORS_MAGIC, self._height, self._width,
+                                                                 zlib.crc32(self._grid), len(entries) // 5,
+                                                                 len(intervals) // 2))
+                corners_file.write(entries.tobytes())
+                corners_file.write(intervals.tobytes())
+            os.replace(tmp_path, path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def load_corner_successors(self, path):
+        '''
+        Reads the corner successors saved with save_corner_successors into the cache.
+        Returns False if the file is broken or was built for another map.
+        '''
+        with open(path, 'rb') as corners_file:
+            data = corners_file.read()
+        if len(data) < CORNER_SUCCESSORS_HEADER.size:
+            return False
+        magic, height, width, crc, entries_count, intervals_count = CORNER_SUCCESSORS_HEADER.unpack_from(data)
+        entries = array('i')
+        intervals = array('i')
+        entries_size = 5 * entries_count * entries.itemsize
+        if magic != CORNER_SUCCESSORS_MAGIC \
+                or len(data) != CORNER_SUCCESSORS_HEADER.size + entries_size + 2 * intervals_count * intervals.itemsize:
+            return False
+        if (height, width) != (self._height, self._width) or crc != zlib.crc32(self._grid):
+            return False
+        entries.frombytes(data[CORNER_SUCCESSORS_HEADER.size:CORNER_SUCCESSORS_HEADER.size + entries_size])
+        intervals.frombytes(data[CORNER_SUCCESSORS_HEADER.size + entries_size:])
+        position = 0
+        for e in range(0, len(entries), 5):
+            count = entries[e + 4]
+            self._corner_successors[tuple(entries[e:e + 4])] = tuple(
+                (intervals[v], intervals[v + 1]) for v in range(position, position + 2 * count, 2))
+            position += 2 * count
+        return True
+
     # Function that generates successors of start node
     def get_start_neighbors(self, i, j):
+        if self._changes is None:
+            self._build_changes_index()
         start_node = None
         neighbors = []
         if not self.is_obstacle(i-1, j) or not self.is_obstacle(i, j):
-            tj = j
             prev_j = j
-            while self.in_bounds(i, tj+1):
-                tj += 1
-                if self.is_obstacle(i, tj-1) != self.is_obstacle(i, tj):
-                    break
-                if self.is_obstacle(i-1, tj-1) != self.is_obstacle(i-1, tj):
-                    break
+            tj = self._flat_end_right(i, j)
             if tj > prev_j:
                 neighbors.append(AnyaNode(i, j, i, prev_j, i, tj, parent=start_node))
         if not self.is_obstacle(i-1, j-1) or not self.is_obstacle(i, j-1):
-            tj = j
             prev_j = j
-            while self.in_bounds(i, tj-1):
-                tj -= 1
-                if self.is_obstacle(i, tj - 1) != self.is_obstacle(i, tj):
-                    break
-                if self.is_obstacle(i - 1, tj - 1) != self.is_obstacle(i - 1, tj):
-                    break
+            tj = self._flat_end_left(i, j)
             if tj < prev_j:
                 neighbors.append(AnyaNode(i, j, i, tj, i, prev_j, parent=start_node))
 
         if not self.is_obstacle(i-1, j-1) or not self.is_obstacle(i-1, j):
-            aj = j
-            while not self.is_obstacle(i-1, aj-1):
-                aj -= 1
-            bj = j
-            while not self.is_obstacle(i-1, bj):
-                bj += 1
+            aj = self._prev_obstacle(i-1, j-1) + 1
+            bj = self._next_obstacle(i-1, j)
             prev_j = aj
-            tj = aj + 1
-            while tj < bj:
-                if self.is_obstacle(i-2, tj-1) != self.is_obstacle(i-2, tj):
-                    if tj > prev_j:
-                        neighbors.append(AnyaNode(i, j, i-1, prev_j, i-1, tj, parent=start_node))
-                    prev_j = tj
-                tj += 1
-            if tj > prev_j:
-                neighbors.append(AnyaNode(i, j, i - 1, prev_j, i - 1, tj, parent=start_node))
+            changes = self._changes[i-1]
+            for tj in changes[bisect_right(changes, aj):bisect_left(changes, bj)]:
+                neighbors.append(AnyaNode(i, j, i-1, prev_j, i-1, tj, parent=start_node))
+                prev_j = tj
+            neighbors.append(AnyaNode(i, j, i - 1, prev_j, i - 1, bj, parent=start_node))
 
         if not self.is_obstacle(i, j-1) or not self.is_obstacle(i, j):
-            aj = j
-            while not self.is_obstacle(i, aj-1):
-                aj -= 1
-            bj = j
-            while not self.is_obstacle(i, bj):
-                bj += 1
+            aj = self._prev_obstacle(i, j-1) + 1
+            bj = self._next_obstacle(i, j)
             prev_j = aj
-            tj = aj + 1
-            while tj < bj:
-                if self.is_obstacle(i+1, tj-1) != self.is_obstacle(i+1, tj):
-                    if tj > prev_j:
-                        neighbors.append(AnyaNode(i, j, i+1, prev_j, i+1, tj, parent=start_node))
-                    prev_j = tj
-                tj += 1
-            if tj > prev_j:
+            changes = self._changes[i+2]
+            for tj in changes[bisect_right(changes, aj):bisect_left(changes, bj)]:
                 neighbors.append(AnyaNode(i, j, i+1, prev_j, i+1, tj, parent=start_node))
+                prev_j = tj
+            neighbors.append(AnyaNode(i, j, i+1, prev_j, i+1, bj, parent=start_node))
         return neighbors
 
     def assert_any_non_obstacle(self, no: AnyaNode):
+        aj = -(-no.an // no.den)
+        bj = no.bn // no.den
         assert not self.is_obstacle(no.i - 1, no.j - 1) or not self.is_obstacle(no.i - 1, no.j) \
                or not self.is_obstacle(no.i, no.j - 1) or not self.is_obstacle(no.i, no.j)
-        assert not self.is_obstacle(no.ai - 1, no.aj.__ceil__() - 1) or not self.is_obstacle(no.ai - 1, no.aj.__ceil__()) \
-               or not self.is_obstacle(no.ai, no.aj.__ceil__() - 1) or not self.is_obstacle(no.ai, no.aj.__ceil__())
-        assert not self.is_obstacle(no.bi - 1, no.bj.__floor__() - 1) or not self.is_obstacle(no.bi - 1, no.bj.__floor__()) \
-               or not self.is_obstacle(no.bi, no.bj.__floor__() - 1) or not self.is_obstacle(no.bi, no.bj.__floor__())
+        assert not self.is_obstacle(no.ai - 1, aj - 1) or not self.is_obstacle(no.ai - 1, aj) \
+               or not self.is_obstacle(no.ai, aj - 1) or not self.is_obstacle(no.ai, aj)
+        assert not self.is_obstacle(no.bi - 1, bj - 1) or not self.is_obstacle(no.bi - 1, bj) \
+               or not self.is_obstacle(no.bi, bj - 1) or not self.is_obstacle(no.bi, bj)
 
     # It's main function for ANYA. It generates successors of current node
     def get_neighbors_by_node(self, node: AnyaNode):
         assert(node.ai == node.bi)
+        if self._changes is None:
+            self._build_changes_index()
         neighbors = []
+        # Endpoints of the interval are node.an / den and node.bn / den
+        den = node.den
 
         # 1) is flat successor
         if node.i == node.ai:
-            # flat successors are only available for
-            assert node.bj.denominator == 1
-            assert node.bj.denominator == 1
+            # flat successors are only available for integer endpoints
+            assert node.an % den == 0
+            assert node.bn % den == 0
 
             # take more remoted endpoint from the root
-            pj = node.bj.numerator
+            pj = node.bn // den
             pi = node.bi
-            if abs(node.aj - node.j) > abs(node.bj - node.j):
-                pj = node.aj.numerator
+            if abs(node.an - node.j * den) > abs(node.bn - node.j * den):
+                pj = node.an // den
 
             if (self.is_obstacle(pi-1, pj-1) and self.is_obstacle(pi, pj)) \
                     or (self.is_obstacle(pi-1, pj) and self.is_obstacle(pi, pj-1)):
@@ -375,22 +874,13 @@ class AnyaMap(Map):
                 # We need to add only one flat successor
                 if pj > node.j:
                     if not self.is_obstacle(pi-1, pj) or not self.is_obstacle(pi, pj):
-                        tj = pj
-                        while self.in_bounds(pi, tj+1):
-                            tj += 1
-                            # Condition on the corner point
-                            if (self.is_obstacle(pi, tj-1) != self.is_obstacle(pi, tj)) \
-                                    or (self.is_obstacle(pi-1, tj-1) != self.is_obstacle(pi-1, tj)):
-                                break
+                        # Walk till the next corner point
+                        tj = self._flat_end_right(pi, pj)
                         neighbors.append(AnyaNode(node.i, node.j, pi, pj, pi, tj, g=node.g))
                         self.assert_any_non_obstacle(neighbors[-1])
                 else:
                     if not self.is_obstacle(pi-1, pj-1) or not self.is_obstacle(pi, pj-1):
-                        tj = pj
-                        while self.in_bounds(pi, tj - 1):
-                            tj -= 1
-                            if (self.is_obstacle(pi, tj - 1) != self.is_obstacle(pi, tj)) or (self.is_obstacle(pi - 1, tj - 1) != self.is_obstacle(pi - 1, tj)):
-                                break
+                        tj = self._flat_end_left(pi, pj)
                         neighbors.append(AnyaNode(node.i, node.j, pi, tj, pi, pj, g=node.g))
                         self.assert_any_non_obstacle(neighbors[-1])
                 # =====================================
@@ -398,447 +888,262 @@ class AnyaMap(Map):
                 # ===== GENERATE CORN SUCCESSORS ===========
                 # New root will be (pi, pj)
                 # We need to choose side, where will go during this generation
-                if pj > node.j:
-                    if self.is_obstacle(pi-1, pj-1) and not self.is_obstacle(pi-1, pj):
-                        # Then go to the up
-                        ti = pi-1
-                        tj = pj
-                        prev_j = pj
-                        while self.in_bounds(ti, tj+1):
-                            tj += 1
-                            # Stop walking if there is an obstacle between current and new rows
-                            if self.is_obstacle(ti, tj):
-                                neighbors.append(AnyaNode(pi, pj, ti, prev_j, ti, tj, g=node.g + compute_cost(node.i, node.j, pi, pj)))
-                                self.assert_any_non_obstacle(neighbors[-1])
-                                break
-                            # Split interval if there is an obstacle's condition on new row changed
-                            if self.is_obstacle(ti-1, tj-1) != self.is_obstacle(ti-1, tj):
-                                neighbors.append(AnyaNode(pi, pj, ti, prev_j, ti, tj, g=node.g + compute_cost(node.i, node.j, pi, pj)))
-                                self.assert_any_non_obstacle(neighbors[-1])
-                                prev_j = tj
-                    if self.is_obstacle(pi, pj-1) and not self.is_obstacle(pi, pj):
-                        # Same, but go to the down
-                        ti = pi+1
-                        tj = pj
-                        prev_j = pj
-                        while self.in_bounds(ti, tj+1):
-                            tj += 1
-                            if self.is_obstacle(ti-1, tj):
-                                neighbors.append(AnyaNode(pi, pj, ti, prev_j, ti, tj, g=node.g + compute_cost(node.i, node.j, pi, pj)))
-                                self.assert_any_non_obstacle(neighbors[-1])
-                                break
-                            if self.is_obstacle(ti, tj-1) != self.is_obstacle(ti, tj):
-                                neighbors.append(AnyaNode(pi, pj, ti, prev_j, ti, tj, g=node.g + compute_cost(node.i, node.j, pi, pj)))
-                                self.assert_any_non_obstacle(neighbors[-1])
-                                prev_j = tj
-                # Same, but go to the left
-                else:
-                    if self.is_obstacle(pi-1, pj) and not self.is_obstacle(pi-1, pj-1):
-                        ti = pi-1
-                        tj = pj
-                        prev_j = pj
-                        while self.in_bounds(ti, tj-1):
-                            tj -= 1
-                            if self.is_obstacle(ti, tj-1):
-                                neighbors.append(AnyaNode(pi, pj, ti, tj, ti, prev_j, g=node.g + compute_cost(node.i, node.j, pi, pj)))
-                                self.assert_any_non_obstacle(neighbors[-1])
-                                break
-                            if self.is_obstacle(ti-1, tj-1) != self.is_obstacle(ti-1, tj):
-                                neighbors.append(AnyaNode(pi, pj, ti, tj, ti, prev_j, g=node.g + compute_cost(node.i, node.j, pi, pj)))
-                                self.assert_any_non_obstacle(neighbors[-1])
-                                prev_j = tj
-                    if self.is_obstacle(pi, pj) and not self.is_obstacle(pi, pj-1):
-                        ti = pi+1
-                        tj = pj
-                        prev_j = pj
-                        while self.in_bounds(ti, tj-1):
-                            tj -= 1
-                            if self.is_obstacle(ti-1, tj - 1):
-                                neighbors.append(AnyaNode(pi, pj, ti, tj, ti, prev_j, g=node.g + compute_cost(node.i, node.j, pi, pj)))
-                                self.assert_any_non_obstacle(neighbors[-1])
-                                break
-                            if self.is_obstacle(ti, tj - 1) != self.is_obstacle(ti, tj):
-                                neighbors.append(AnyaNode(pi, pj, ti, tj, ti, prev_j, g=node.g + compute_cost(node.i, node.j, pi, pj)))
-                                self.assert_any_non_obstacle(neighbors[-1])
-                                prev_j = tj
+                # Intervals are split where obstacle's condition on new row changes, and the walk stops
+                #   at an obstacle between current and new rows (see _scan_corner_intervals).
+                #   They depend only on the corner and the side, so they are cached
+                dj = 1 if pj > node.j else -1
+                g = node.g + compute_cost(node.i, node.j, pi, pj)
+                # Go to the up, then to the down
+                for di in (-1, 1):
+                    for (aj, bj) in self._corner_intervals(pi, pj, di, dj):
+                        neighbors.append(AnyaNode(pi, pj, pi + di, aj, pi + di, bj, g=g))
+                        self.assert_any_non_obstacle(neighbors[-1])
                 # ==================================
 
         # 2) Else we have corn node, so we need to know, in which side (up or down) we need to expand
         elif node.ai < node.i:
             # Go to the top
-            # Generate projection to the next row
+            # Generate projection to the next row. Projection endpoints are ta / q and tb / q,
+            #   all positions on the next row are kept as numerators over q too
             ti = node.ai - 1
-            taj = node.j + Fraction((node.aj - node.j) * (node.i - (node.ai - 1)), (node.i - node.ai))
-            tbj = node.j + Fraction((node.bj - node.j) * (node.i - (node.bi - 1)), (node.i - node.bi))
+            n = node.i - node.ai
+            q = den * n
+            ta = node.j * q + (node.an - node.j * den) * (n + 1)
+            tb = node.j * q + (node.bn - node.j * den) * (n + 1)
+            a = node.an * n
+            b = node.bn * n
             can_make_left_turn = True
             can_make_right_turn = True
 
             # Our current interval can be one of two types:
             # First: when there aren't any obstacles at each cell from [a_i; b_i] between current and next rows
             # and second (we will see it later): when all of these cells are obstacles
-            if not self.is_obstacle(node.ai-1, node.aj.__floor__()):
+            if not self.is_obstacle(node.ai-1, node.an // den):
                 # Firstly, we need to check that there are no obstacles on our (potential) path,
                 #   if projection and current intervals don't intersect
                 flag = ti >= 0
-                if taj > node.bj:
-                    tj = node.bj.__floor__()
-                    while tj < taj:
-                        if self.is_obstacle(ti, tj):
-                            flag = False
-                            break
-                        tj += 1
-                if flag and tbj < node.aj:
-                    tj = node.aj.__ceil__()
-                    while tj > tbj:
-                        if self.is_obstacle(ti, tj-1):
-                            flag = False
-                            break
-                        tj -= 1
+                if ta > b and self._next_obstacle(ti, node.bn // den) * q < ta:
+                    flag = False
+                if flag and tb < a and self._prev_obstacle(ti, -(-node.an // den) - 1) >= tb // q:
+                    flag = False
 
                 # If all is OK, we can make projection (or maybe only some part of it)
                 if flag:
-                    prev_j = taj
-                    tj = taj.__floor__()
-
-                    # Now we need to choose right start j (that named tj)
-                    while (tj < node.aj):# or (self.is_obstacle(ti, tj) and self.in_bounds(ti, tj))):
-                        if self.is_obstacle(ti, tj):
-                            can_make_left_turn = False
-                            prev_j = tj + 1
-                        tj += 1
-                    if type(prev_j) is Fraction:
-                        if prev_j.denominator == 1:
-                            tj = prev_j.__floor__() - 1
-                        else:
-                            tj = prev_j.__floor__()
+                    prev_j = ta
+
+                    # Now we need to choose right start: after the last obstacle under the left part of projection
+                    tj = self._prev_obstacle(ti, -(-node.an // den) - 1)
+                    if tj >= ta // q:
+                        can_make_left_turn = False
+                        prev_j = (tj + 1) * q
+                    # First integer column after prev_j
+                    tj = -(-prev_j // q)
+                    # Projection ends at tb (first column end), or at the first obstacle (column stop)
+                    end = -(-tb // q)
+                    stop = self._next_obstacle(ti, tj)
+
+                    # If we only see how obstacle's type above us changed, we split our new interval
+                    changes = self._changes[ti]
+                    for tj in changes[bisect_left(changes, tj):bisect_left(changes, min(end, stop))]:
+                        if tj * q > prev_j:
+                            neighbors.append(AnyaNode(node.i, node.j, ti, prev_j, ti, tj * q, g=node.g, den=q))
+                            self.assert_any_non_obstacle(neighbors[-1])
+                        prev_j = tj * q
+                    # If we received endpoint of projection, then we need to stop
+                    if end <= stop:
+                        if tb > prev_j:
+                            neighbors.append(AnyaNode(node.i, node.j, ti, prev_j, ti, tb, g=node.g, den=q))
+                            self.assert_any_non_obstacle(neighbors[-1])
+                    # If there is an obstacle, then we all need to finish our projection, but also we can't
+                    #   make a turn on right side (because it is not the end of projection, and we will intersect
+                    #   obstacle), so we assign False to can_make_right_turn
                     else:
-                        tj = prev_j - 1
-
-                    # And while tj >= tbj we can project our current interval to the next row
-                    while True:
-                        tj += 1
-                        # If we received endpoint of projection, then we need to stop circle
-                        if tj >= tbj:
-                            if tbj > prev_j:
-                                neighbors.append(AnyaNode(node.i, node.j, ti, prev_j, ti, tbj, g=node.g))
-                                self.assert_any_non_obstacle(neighbors[-1])
-                            break
-                        # If there is an obstacle, then we all need to finish our projection, but also we can't
-                        #   make a turn on right side (because it is not the end of projection, and we will intersect
-                        #   obstacle), so we assign False to can_make_right_turn
-                        if self.is_obstacle(ti, tj):
-                            can_make_right_turn = False
-                            if tj > prev_j:
-                                neighbors.append(AnyaNode(node.i, node.j, ti, prev_j, ti, tj, g=node.g))
-                                self.assert_any_non_obstacle(neighbors[-1])
-                            break
-                        # But if we only see how obstacle's type above us changed, we split our new interval
-                        if self.is_obstacle(ti-1, tj-1) != self.is_obstacle(ti-1, tj):
-                            if tj > prev_j:
-                                neighbors.append(AnyaNode(node.i, node.j, ti, prev_j, ti, Fraction(tj), g=node.g))
-                                self.assert_any_non_obstacle(neighbors[-1])
-                            prev_j = tj
+                        can_make_right_turn = False
+                        if stop * q > prev_j:
+                            neighbors.append(AnyaNode(node.i, node.j, ti, prev_j, ti, stop * q, g=node.g, den=q))
+                            self.assert_any_non_obstacle(neighbors[-1])
                     # There is the end of projection
                 else:
                     can_make_left_turn = False
                     can_make_right_turn = False
 
                 # Only if left endpoint of our current interval is integer, we can turn here
-                if node.aj.denominator == 1:
-                    naj = node.aj.numerator
+                if node.an % den == 0:
+                    naj = node.an // den
                     # Also, we need an obstacle in the left below us to turn on its corner
                     if self.is_obstacle(node.ai, naj-1):
                         # Here we try to generate flat successor in the same route as in 1)
                         if not self.is_obstacle(node.ai-1, naj-1) and not self.is_obstacle(node.ai-1, naj):
-                            tj = naj
-                            while self.in_bounds(node.ai, tj-1):
-                                tj -= 1
-                                if (self.is_obstacle(node.ai, tj - 1) != self.is_obstacle(node.ai, tj)) or (
-                                        self.is_obstacle(node.ai-1, tj-1) != self.is_obstacle(node.ai-1, tj)):
-                                    break
-                            neighbors.append(AnyaNode(node.ai, naj, node.ai, Fraction(tj), node.ai, Fraction(naj), g=node.g+compute_cost(node.i, node.j, node.ai, naj)))
+                            tj = self._flat_end_left(node.ai, naj)
+                            neighbors.append(AnyaNode(node.ai, naj, node.ai, tj, node.ai, naj, g=node.g+compute_cost(node.i, node.j, node.ai, naj)))
                             self.assert_any_non_obstacle(neighbors[-1])
                         # ====================================
 
                         # If we can move from left endpoint to the left endpoint of projection, then we
                         #   can try to turn and make a continuation of our projection to the left
                         if can_make_left_turn:
-                            prev_j = taj
+                            prev_j = ta
                             ti = node.ai - 1
-                            tj = taj.__floor__() + 1
+                            tj = ta // q + 1
                             if self.is_obstacle(ti, tj-1):
-                                prev_j = tj-1
-                            while self.in_bounds(ti, tj-1):
-                                tj -= 1
-                                # If there is an obstacle between our and next rows, we can't continue
-                                if self.is_obstacle(ti, tj - 1):
-                                    break
-                                # But if there is only changing in obstacles above next row, we just need to split interval
-                                if self.is_obstacle(ti-1, tj-1) != self.is_obstacle(ti-1, tj):
-                                    if tj < prev_j:
-                                        neighbors.append(AnyaNode(node.ai, naj, node.ai-1, Fraction(tj), node.ai-1, Fraction(prev_j), g=node.g+compute_cost(node.i, node.j, node.ai, naj)))
-                                        self.assert_any_non_obstacle(neighbors[-1])
-                                    prev_j = tj
-                            if tj < prev_j:
-                                neighbors.append(AnyaNode(node.ai, naj, node.ai-1, Fraction(tj), node.ai-1, Fraction(prev_j), g=node.g+compute_cost(node.i, node.j, node.ai, naj)))
-                                self.assert_any_non_obstacle(neighbors[-1])
+                                prev_j = (tj - 1) * q
+                            # If there is an obstacle between our and next rows, we can't continue,
+                            #   but if there is only changing in obstacles above next row, we just need to split interval
+                            for tj in self._corner_points_left(ti, ti, ti-1, tj):
+                                if tj * q < prev_j:
+                                    neighbors.append(AnyaNode(node.ai, naj, node.ai-1, tj * q, node.ai-1, prev_j, g=node.g+compute_cost(node.i, node.j, node.ai, naj), den=q))
+                                    self.assert_any_non_obstacle(neighbors[-1])
+                                prev_j = tj * q
                         # ================================================
 
                 # Same for right endpoint
-                if node.bj.denominator == 1:
-                    naj = node.bj.numerator
+                if node.bn % den == 0:
+                    naj = node.bn // den
                     if self.is_obstacle(node.ai, naj):
                         if not self.is_obstacle(node.ai-1, naj-1) and not self.is_obstacle(node.ai-1, naj):
-                            tj = naj
-                            while self.in_bounds(node.ai, tj+1):
-                                tj += 1
-                                if (self.is_obstacle(node.ai, tj-1) != self.is_obstacle(node.ai, tj)) or (
-                                        self.is_obstacle(node.ai-1, tj-1) != self.is_obstacle(node.ai-1, tj)):
-                                    break
-                            neighbors.append(AnyaNode(node.ai, naj, node.ai, Fraction(naj), node.ai, Fraction(tj), g=node.g+compute_cost(node.i, node.j, node.ai, naj)))
+                            tj = self._flat_end_right(node.ai, naj)
+                            neighbors.append(AnyaNode(node.ai, naj, node.ai, naj, node.ai, tj, g=node.g+compute_cost(node.i, node.j, node.ai, naj)))
                             self.assert_any_non_obstacle(neighbors[-1])
 
                         if can_make_right_turn:
-                            prev_j = tbj
+                            prev_j = tb
                             ti = node.bi - 1
-                            tj = tbj.__ceil__() - 1
+                            tj = -(-tb // q) - 1
                             if self.is_obstacle(ti, tj):
-                                prev_j = tj + 1
-                            while self.in_bounds(ti, tj+1):
-                                tj += 1
-                                if self.is_obstacle(ti, tj):
-                                    break
-                                if self.is_obstacle(ti-1, tj-1) != self.is_obstacle(ti-1, tj):
-                                    if tj > prev_j:
-                                        neighbors.append(
-                                            AnyaNode(node.ai, naj, node.ai-1, Fraction(prev_j), node.ai-1,
-                                                     Fraction(tj), g=node.g+compute_cost(node.i, node.j, node.ai, naj)))
-                                        self.assert_any_non_obstacle(neighbors[-1])
-                                    prev_j = tj
-                            if tj > prev_j:
-                                neighbors.append(AnyaNode(node.ai, naj, node.ai-1, Fraction(prev_j), node.ai-1,
-                                                          Fraction(tj), g=node.g+compute_cost(node.i, node.j, node.ai, naj)))
-                                self.assert_any_non_obstacle(neighbors[-1])
+                                prev_j = (tj + 1) * q
+                            for tj in self._corner_points_right(ti, ti, ti-1, tj):
+                                if tj * q > prev_j:
+                                    neighbors.append(
+                                        AnyaNode(node.ai, naj, node.ai-1, prev_j, node.ai-1,
+                                                 tj * q, g=node.g+compute_cost(node.i, node.j, node.ai, naj), den=q))
+                                    self.assert_any_non_obstacle(neighbors[-1])
+                                prev_j = tj * q
 
             # We also need to allow cornering from left endpoint to the right and from right endpoint to the left,
             #   if there are an obstacle above our current interval
-            elif (node.aj.denominator == 1 and self.is_obstacle(node.ai-1, node.aj.numerator)) or (node.bj.denominator == 1 and self.is_obstacle(node.bi-1, node.bj.numerator-1)):
+            elif (node.an % den == 0 and self.is_obstacle(node.ai-1, node.an // den)) or (node.bn % den == 0 and self.is_obstacle(node.bi-1, node.bn // den - 1)):
                 # We need to check, that we really can make these move
                 # Next procedure is same with left turning etc.
-                if node.aj.denominator == 1 and not self.is_obstacle(node.ai, node.aj.numerator-1):
-                    naj = node.aj.numerator
-                    prev_j = naj
-                    ti = node.ai - 1
-                    tj = prev_j + 1
-                    while self.in_bounds(ti, tj-1):
-                        tj -= 1
-                        if self.is_obstacle(ti, tj-1):
-                            break
-                        if self.is_obstacle(ti-1, tj-1) != self.is_obstacle(ti-1, tj):
-                            if tj < prev_j:
-                                neighbors.append(
-                                    AnyaNode(node.ai, naj, node.ai - 1, Fraction(tj), node.ai - 1, Fraction(prev_j),
-                                             g=node.g + compute_cost(node.i, node.j, node.ai, naj)))
-                                self.assert_any_non_obstacle(neighbors[-1])
-                            prev_j = tj
-                    if tj < prev_j:
+                if node.an % den == 0 and not self.is_obstacle(node.ai, node.an // den - 1):
+                    naj = node.an // den
+                    for (aj, bj) in self._corner_intervals(node.ai, naj, -1, -1):
                         neighbors.append(
-                            AnyaNode(node.ai, naj, node.ai - 1, Fraction(tj), node.ai - 1, Fraction(prev_j),
+                            AnyaNode(node.ai, naj, node.ai - 1, aj, node.ai - 1, bj,
                                      g=node.g + compute_cost(node.i, node.j, node.ai, naj)))
                         self.assert_any_non_obstacle(neighbors[-1])
                 # Same for turn from right endpoint to the left
-                if node.bj.denominator == 1 and not self.is_obstacle(node.ai, node.bj.numerator):
-                    naj = node.bj.numerator
-                    prev_j = naj
-                    ti = node.bi - 1
-                    tj = naj - 1
-                    while self.in_bounds(ti, tj+1):
-                        tj += 1
-                        if self.is_obstacle(ti, tj):
-                            break
-                        if self.is_obstacle(ti-1, tj-1) != self.is_obstacle(ti-1, tj):
-                            if tj > prev_j:
-                                neighbors.append(
-                                    AnyaNode(node.ai, naj, node.ai-1, Fraction(prev_j), node.ai-1,
-                                             Fraction(tj), g=node.g + compute_cost(node.i, node.j, node.ai, naj)))
-                                self.assert_any_non_obstacle(neighbors[-1])
-                            prev_j = tj
-                    if tj > prev_j:
-                        neighbors.append(AnyaNode(node.ai, naj, node.ai-1, Fraction(prev_j), node.ai-1,
-                                                  Fraction(tj), g=node.g + compute_cost(node.i, node.j, node.ai, naj)))
+                if node.bn % den == 0 and not self.is_obstacle(node.ai, node.bn // den):
+                    naj = node.bn // den
+                    for (aj, bj) in self._corner_intervals(node.ai, naj, -1, 1):
+                        neighbors.append(
+                            AnyaNode(node.ai, naj, node.ai-1, aj, node.ai-1,
+                                     bj, g=node.g + compute_cost(node.i, node.j, node.ai, naj)))
                         self.assert_any_non_obstacle(neighbors[-1])
 
         # And now we can see last variant: corn node, but we will move to the down
         # All procedure is same with previous section
         else:
             ti = node.ai + 1
-            taj = node.j + Fraction((node.aj - node.j) * (node.i - (node.ai + 1)), (node.i - node.ai))
-            tbj = node.j + Fraction((node.bj - node.j) * (node.i - (node.bi + 1)), (node.i - node.bi))
+            n = node.ai - node.i
+            q = den * n
+            ta = node.j * q + (node.an - node.j * den) * (n + 1)
+            tb = node.j * q + (node.bn - node.j * den) * (n + 1)
+            a = node.an * n
+            b = node.bn * n
             can_make_left_turn = True
             can_make_right_turn = True
-            if not self.is_obstacle(node.ai, node.aj.__floor__()):
+            if not self.is_obstacle(node.ai, node.an // den):
                 flag = ti <= self._height
-                if taj > node.bj:
-                    tj = node.bj.__floor__()
-                    while tj < taj:
-                        if self.is_obstacle(ti-1, tj):
-                            flag = False
-                            break
-                        tj += 1
-                if flag and tbj < node.aj:
-                    tj = node.aj.__ceil__()
-                    while tj > tbj:
-                        if self.is_obstacle(ti-1, tj-1):
-                            flag = False
-                            break
-                        tj -= 1
+                if ta > b and self._next_obstacle(ti-1, node.bn // den) * q < ta:
+                    flag = False
+                if flag and tb < a and self._prev_obstacle(ti-1, -(-node.an // den) - 1) >= tb // q:
+                    flag = False
 
                 if flag:
-                    prev_j = taj
-                    tj = taj.__floor__()
-                    while (tj < node.aj):#: or (self.is_obstacle(ti-1, tj) and self.in_bounds(ti, tj))):
-                        if self.is_obstacle(ti-1, tj):
-                            can_make_left_turn = False
-                            prev_j = tj + 1
-                        tj += 1
-                    if type(prev_j) is Fraction:
-                        if prev_j.denominator == 1:
-                            tj = prev_j.__floor__() - 1
-                        else:
-                            tj = prev_j.__floor__()
+                    prev_j = ta
+                    tj = self._prev_obstacle(ti-1, -(-node.an // den) - 1)
+                    if tj >= ta // q:
+                        can_make_left_turn = False
+                        prev_j = (tj + 1) * q
+                    tj = -(-prev_j // q)
+                    end = -(-tb // q)
+                    stop = self._next_obstacle(ti-1, tj)
+                    changes = self._changes[ti+1]
+                    for tj in changes[bisect_left(changes, tj):bisect_left(changes, min(end, stop))]:
+                        if tj * q > prev_j:
+                            neighbors.append(AnyaNode(node.i, node.j, ti, prev_j, ti, tj * q, g=node.g, den=q))
+                            self.assert_any_non_obstacle(neighbors[-1])
+                        prev_j = tj * q
+                    if end <= stop:
+                        if tb > prev_j:
+                            neighbors.append(AnyaNode(node.i, node.j, ti, prev_j, ti, tb, g=node.g, den=q))
+                            self.assert_any_non_obstacle(neighbors[-1])
                     else:
-                        tj = prev_j - 1
-                    while (True):
-                        tj += 1
-                        if tj >= tbj:
-                            if tbj > prev_j:
-                                neighbors.append(AnyaNode(node.i, node.j, ti, prev_j, ti, tbj, g=node.g))
-                                self.assert_any_non_obstacle(neighbors[-1])
-                            break
-                        if self.is_obstacle(ti-1, tj):
-                            can_make_right_turn = False
-                            if tj > prev_j:
-                                neighbors.append(AnyaNode(node.i, node.j, ti, prev_j, ti, tj, g=node.g))
-                                self.assert_any_non_obstacle(neighbors[-1])
-                            break
-                        if self.is_obstacle(ti, tj-1) != self.is_obstacle(ti, tj):
-                            if tj > prev_j:
-                                neighbors.append(AnyaNode(node.i, node.j, ti, prev_j, ti, Fraction(tj), g=node.g))
-                                self.assert_any_non_obstacle(neighbors[-1])
-                            prev_j = tj
+                        can_make_right_turn = False
+                        if stop * q > prev_j:
+                            neighbors.append(AnyaNode(node.i, node.j, ti, prev_j, ti, stop * q, g=node.g, den=q))
+                            self.assert_any_non_obstacle(neighbors[-1])
                 else:
                     can_make_left_turn = False
                     can_make_right_turn = False
 
-                if node.aj.denominator == 1:
-                    naj = node.aj.numerator
+                if node.an % den == 0:
+                    naj = node.an // den
                     if self.is_obstacle(node.ai-1, naj-1):
                         if not self.is_obstacle(node.ai, naj-1) and not self.is_obstacle(node.ai, naj):
-                            tj = naj
-                            while self.in_bounds(node.ai, tj-1):
-                                tj -= 1
-                                if (self.is_obstacle(node.ai, tj-1) != self.is_obstacle(node.ai, tj)) or (
-                                        self.is_obstacle(node.ai-1, tj-1) != self.is_obstacle(node.ai - 1, tj)):
-                                    break
-                            neighbors.append(AnyaNode(node.ai, naj, node.ai, Fraction(tj), node.ai, Fraction(naj), g=node.g+compute_cost(node.i, node.j, node.ai, naj)))
+                            tj = self._flat_end_left(node.ai, naj)
+                            neighbors.append(AnyaNode(node.ai, naj, node.ai, tj, node.ai, naj, g=node.g+compute_cost(node.i, node.j, node.ai, naj)))
                             self.assert_any_non_obstacle(neighbors[-1])
                         if can_make_left_turn:
-                            prev_j = taj
+                            prev_j = ta
                             ti = node.ai + 1
-                            tj = taj.__floor__() + 1
+                            tj = ta // q + 1
                             if self.is_obstacle(ti-1, tj-1):
-                                prev_j = tj - 1
-                            while self.in_bounds(ti-1, tj-1):
-                                tj -= 1
-                                if self.is_obstacle(ti-1, tj-1):
-                                    break
-                                if self.is_obstacle(ti, tj-1) != self.is_obstacle(ti, tj):
-                                    if tj < prev_j:
-                                        neighbors.append(AnyaNode(node.ai, naj, node.ai+1, Fraction(tj), node.ai+1,
-                                                                  Fraction(prev_j),g=node.g+compute_cost(node.i, node.j, node.ai, naj)))
-                                        self.assert_any_non_obstacle(neighbors[-1])
-                                    prev_j = tj
-                            if tj < prev_j:
-                                neighbors.append(
-                                    AnyaNode(node.ai, naj, node.ai+1, Fraction(tj), node.ai+1, Fraction(prev_j), g=node.g+compute_cost(node.i, node.j, node.ai, naj)))
-                                self.assert_any_non_obstacle(neighbors[-1])
-
-                if node.bj.denominator == 1:
-                    naj = node.bj.numerator
+                                prev_j = (tj - 1) * q
+                            for tj in self._corner_points_left(ti-1, ti-1, ti, tj):
+                                if tj * q < prev_j:
+                                    neighbors.append(AnyaNode(node.ai, naj, node.ai+1, tj * q, node.ai+1,
+                                                              prev_j, g=node.g+compute_cost(node.i, node.j, node.ai, naj), den=q))
+                                    self.assert_any_non_obstacle(neighbors[-1])
+                                prev_j = tj * q
+
+                if node.bn % den == 0:
+                    naj = node.bn // den
                     if self.is_obstacle(node.ai-1, naj):
                         if not self.is_obstacle(node.ai, naj-1) and not self.is_obstacle(node.ai, naj):
-                            tj = naj
-                            while self.in_bounds(node.ai+1, tj+1):
-                                tj += 1
-                                if (self.is_obstacle(node.ai, tj-1) != self.is_obstacle(node.ai, tj)) or (
-                                        self.is_obstacle(node.ai-1, tj-1) != self.is_obstacle(node.ai-1, tj)):
-                                    break
-                            neighbors.append(AnyaNode(node.ai, naj, node.ai, Fraction(naj), node.ai, Fraction(tj), g=node.g+compute_cost(node.i, node.j, node.ai, naj)))
+                            # node.ai < height here, as row node.ai has a free cell
+                            tj = self._flat_end_right(node.ai, naj)
+                            neighbors.append(AnyaNode(node.ai, naj, node.ai, naj, node.ai, tj, g=node.g+compute_cost(node.i, node.j, node.ai, naj)))
                             self.assert_any_non_obstacle(neighbors[-1])
 
                         if can_make_right_turn:
-                            prev_j = tbj
+                            prev_j = tb
                             ti = node.bi + 1
-                            tj = tbj.__ceil__() - 1
+                            tj = -(-tb // q) - 1
                             if self.is_obstacle(ti-1, tj):
-                                prev_j = tj + 1
-                            while self.in_bounds(ti, tj+1):
-                                tj += 1
-                                if self.is_obstacle(ti-1, tj):
-                                    break
-                                if self.is_obstacle(ti, tj-1) != self.is_obstacle(ti, tj):
-                                    if tj > prev_j:
-                                        neighbors.append(
-                                            AnyaNode(node.ai, naj, node.ai+1, Fraction(prev_j), node.ai+1,
-                                                     Fraction(tj), g=node.g+compute_cost(node.i, node.j, node.ai, naj)))
-                                        self.assert_any_non_obstacle(neighbors[-1])
-                                    prev_j = tj
-                            if tj > prev_j:
-                                neighbors.append(AnyaNode(node.ai, naj, node.ai+1, Fraction(prev_j), node.ai+1,
-                                                          Fraction(tj), g=node.g+compute_cost(node.i, node.j, node.ai, naj)))
-                                self.assert_any_non_obstacle(neighbors[-1])
-
-            elif (node.aj.denominator == 1 and self.is_obstacle(node.ai, node.aj.numerator)) or (node.bj.denominator == 1 and self.is_obstacle(node.bi, node.bj.numerator-1)):
-                if node.aj.denominator == 1 and not self.is_obstacle(node.ai-1, node.aj.numerator-1):
-                    naj = node.aj.numerator
-                    prev_j = naj
-                    ti = node.ai + 1
-                    tj = naj + 1
-                    while self.in_bounds(ti-1, tj-1):
-                        tj -= 1
-                        if self.is_obstacle(ti-1, tj-1):
-                            break
-                        if self.is_obstacle(ti, tj-1) != self.is_obstacle(ti, tj):
-                            if tj < prev_j:
-                                neighbors.append(AnyaNode(node.ai, naj, node.ai+1, Fraction(tj), node.ai+1,
-                                                          Fraction(prev_j),
-                                                          g=node.g + compute_cost(node.i, node.j, node.ai, naj)))
-                                self.assert_any_non_obstacle(neighbors[-1])
-                            prev_j = tj
-                    if tj < prev_j:
-                        neighbors.append(
-                            AnyaNode(node.ai, naj, node.ai+1, Fraction(tj), node.ai+1, Fraction(prev_j),
-                                     g=node.g + compute_cost(node.i, node.j, node.ai, naj)))
+                                prev_j = (tj + 1) * q
+                            for tj in self._corner_points_right(ti, ti-1, ti, tj):
+                                if tj * q > prev_j:
+                                    neighbors.append(
+                                        AnyaNode(node.ai, naj, node.ai+1, prev_j, node.ai+1,
+                                                 tj * q, g=node.g+compute_cost(node.i, node.j, node.ai, naj), den=q))
+                                    self.assert_any_non_obstacle(neighbors[-1])
+                                prev_j = tj * q
+
+            elif (node.an % den == 0 and self.is_obstacle(node.ai, node.an // den)) or (node.bn % den == 0 and self.is_obstacle(node.bi, node.bn // den - 1)):
+                if node.an % den == 0 and not self.is_obstacle(node.ai-1, node.an // den - 1):
+                    naj = node.an // den
+                    for (aj, bj) in self._corner_intervals(node.ai, naj, 1, -1):
+                        neighbors.append(AnyaNode(node.ai, naj, node.ai+1, aj, node.ai+1,
+                                                  bj,
+                                                  g=node.g + compute_cost(node.i, node.j, node.ai, naj)))
                         self.assert_any_non_obstacle(neighbors[-1])
-                if node.bj.denominator == 1 and not self.is_obstacle(node.ai-1, node.bj.numerator):
-                    naj = node.bj.numerator
-                    prev_j = naj
-                    ti = node.bi + 1
-                    tj = naj - 1
-                    while self.in_bounds(ti, tj+1):
-                        tj += 1
-                        if self.is_obstacle(ti-1, tj):
-                            break
-                        if self.is_obstacle(ti, tj-1) != self.is_obstacle(ti, tj):
-                            if tj > prev_j:
-                                neighbors.append(
-                                    AnyaNode(node.ai, naj, node.ai+1, Fraction(prev_j), node.ai+1,
-                                             Fraction(tj), g=node.g + compute_cost(node.i, node.j, node.ai, naj)))
-                                self.assert_any_non_obstacle(neighbors[-1])
-                            prev_j = tj
-                    if tj > prev_j:
-                        neighbors.append(AnyaNode(node.ai, naj, node.ai+1, Fraction(prev_j), node.ai+1,
-                                                  Fraction(tj), g=node.g + compute_cost(node.i, node.j, node.ai, naj)))
+                if node.bn % den == 0 and not self.is_obstacle(node.ai-1, node.bn // den):
+                    naj = node.bn // den
+                    for (aj, bj) in self._corner_intervals(node.ai, naj, 1, 1):
+                        neighbors.append(
+                            AnyaNode(node.ai, naj, node.ai+1, aj, node.ai+1,
+                                     bj, g=node.g + compute_cost(node.i, node.j, node.ai, naj)))
                         self.assert_any_non_obstacle(neighbors[-1])
 
         return neighbors
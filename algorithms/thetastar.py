@@ -3,12 +3,24 @@ from algorithms.structures import Map, Node
 from util import functions as uf
 
 
-def thetastar(grid_map:Map, start_i, start_j, goal_i, goal_j, heuristic_func=None, open_type=Open, closed_type=Closed, k=2):
+def thetastar(grid_map:Map, start_i, start_j, goal_i, goal_j, heuristic_func=None, open_type=Open, closed_type=Closed, k=2, stats=None):
+    if stats is not None:
+        # Instrumented map and OPEN fill the stats, see util.stats
+        grid_map, open_type = stats.instrument(grid_map, open_type)
+        stats.generated += 1  # start node
     start_node = Node(i=start_i, j=start_j)
     OPEN = open_type()
-    CLOSED = closed_type()
+    CLOSED = closed_type(grid_map)
     steps = 0
     nodes_created = 0
+    if not grid_map.connected(start_i, start_j, goal_i, goal_j):
+        # The goal is in other components of free cells (see Map.get_components), there is nothing to search
+        return False, None, steps, nodes_created, OPEN, CLOSED
+    if (start_i != goal_i or start_j != goal_j) and grid_map.line_of_sight(start_i, start_j, goal_i, goal_j):
+        # The goal is visible from the start, the segment is the shortest path
+        nodes_created += 1
+        return True, Node(i=goal_i, j=goal_j, g=uf.compute_cost(start_i, start_j, goal_i, goal_j), parent=start_node), \
+            steps, nodes_created, OPEN, CLOSED
 
     OPEN.add_node(start_node)
     while not OPEN.is_empty():
@@ -0,0 +1,273 @@
+import os
+import struct
+import zlib
+from array import array
+from weakref import WeakKeyDictionary
+
+from util.containers import OpenHeap, Closed
+from algorithms.structures import Map, Node
+from util import functions as uf
+
+# Visibility graph file: header, vertices as (i, j, side) int32 triples, CSR offsets and targets as uint32.
+# The header stores the size and the CRC32 of the padded grid, so a graph of another map is detected.
+VISIBILITY_GRAPH_MAGIC = b'AAPVISG1'
+VISIBILITY_GRAPH_HEADER = struct.Struct('<8sIIIII')  # magic, height, width, grid crc32, vertices, edges
+VISIBILITY_GRAPH_SUFFIX = '.vg'
+
+# Graphs of the maps used in this process as (Map.version, graph), see VisibilityGraph.for_map
+_graphs = WeakKeyDictionary()
+
+
+def visibility_graph_path(map_path):
+    return map_path + VISIBILITY_GRAPH_SUFFIX
+
+
+def _corner_side(grid_map: Map, i, j, di, dj):
+    '''
+    Side (as Node.is_left) of the diagonal intersection (i, j) used by the segment going from it in the direction (di, dj):
+    1 if it goes through the free cell of the left column (j - 1), -1 if through the free cell of the right one.
+    '''
+    if dj != 0:
+        return 1 if dj < 0 else -1
+    row = i - 1 if di < 0 else i
+    return -1 if grid_map.is_obstacle(row, j - 1) else 1
+
+
+class VisibilityGraph:
+    '''
+    Graph of convex corners of obstacles (grid points with one obstacle among the four cells around, or two diagonal ones)
+    where two corners are linked if there is line of sight between them (see Map.line_of_sight).
+    Shortest paths between any points go through convex corners only, so A* over the graph gives optimal any-angle paths.
+
+    Only tangent segments are kept: the obstacle cells of both corners are on one side of the line, other segments
+    can't be parts of shortest paths. A diagonal intersection is split into two vertices, one for every free side.
+    Vertices are kept as (i, j, side) triples in vertices, the neighbours of vertex v are targets[offsets[v]:offsets[v + 1]].
+    '''
+
+    def __init__(self, height=0, width=0, crc=0, vertices=None, offsets=None, targets=None):
+        self.height = height
+        self.width = width
+        self.crc = crc
+        self.vertices = vertices if vertices is not None else array('i')
+        self.offsets = offsets if offsets is not None else array('I', [0])
+        self.targets = targets if targets is not None else array('I')
+        # (i, j, side) -> vertex
+        self.index = {(self.vertices[3 * v], self.vertices[3 * v + 1], self.vertices[3 * v + 2]): v
+                      for v in range(len(self.vertices) // 3)}
+
+    def __len__(self):
+        return len(self.vertices) // 3
+
+    def vertex(self, v):
+        return self.vertices[3 * v], self.vertices[3 * v + 1], self.vertices[3 * v + 2]
+
+    def neighbors(self, v):
+        return self.targets[self.offsets[v]:self.offsets[v + 1]]
+
+    def edges_count(self):
+        return len(self.targets) // 2
+
+    @staticmethod
+    def find_corners(grid_map: Map):
+        '''
+        Convex corners as (i, j, side, quadrant) where side is 0 or the side of a diagonal intersection,
+        quadrant is the sign of di * dj for the directions (di, dj) from the corner to its obstacle cells.
+        '''
+        height, width = grid_map.get_size()
+        is_obstacle = grid_map.is_obstacle
+        corners = []
+        for i in range(height + 1):
+            for j in range(width + 1):
+                nw = is_obstacle(i - 1, j - 1)
+                ne = is_obstacle(i - 1, j)
+                sw = is_obstacle(i, j - 1)
+                se = is_obstacle(i, j)
+                blocked = nw + ne + sw + se
+                if blocked == 1:
+                    corners.append((i, j, 0, 1 if (nw or se) else -1))
+                elif blocked == 2 and nw == se:
+                    corners.append((i, j, 1, 1 if nw else -1))
+                    corners.append((i, j, -1, 1 if nw else -1))
+        return corners
+
+    @staticmethod
+    def is_tangent(quadrant, di, dj):
+        # Obstacle cells of the corner are on one side of the line with the direction (di, dj)
+        return di * dj * quadrant <= 0
+
+    @classmethod
+    def build(cls, grid_map: Map):
+        '''
+        Builds the graph of the map, it takes a line of sight check for every pair of corners with a tangent segment.
+        '''
+        height, width = grid_map.get_size()
+        corners = cls.find_corners(grid_map)
+        adjacency = [[] for _ in corners]
+        for u, (ui, uj, u_side, u_quadrant) in enumerate(corners):
+            for v in range(u + 1, len(corners)):
+                vi, vj, v_side, v_quadrant = corners[v]
+                di = vi - ui
+                dj = vj - uj
+                if (di == 0 and dj == 0) or not cls.is_tangent(u_quadrant, di, dj) or not cls.is_tangent(v_quadrant, di, dj):
+                    continue
+                if u_side != 0 and _corner_side(grid_map, ui, uj, di, dj) != u_side:
+                    continue
+                if v_side != 0 and _corner_side(grid_map, vi, vj, -di, -dj) != v_side:
+                    continue
+                if grid_map.line_of_sight(ui, uj, vi, vj):
+                    adjacency[u].append(v)
+                    adjacency[v].append(u)
+        vertices = array('i')
+        offsets = array('I', [0])
+        targets = array('I')
+        for (i, j, side, _), neighbours in zip(corners, adjacency):
+            vertices.extend((i, j, side))
+            targets.extend(neighbours)
+            offsets.append(len(targets))
+        return cls(height, width, zlib.crc32(grid_map.get_padded_grid()), vertices, offsets, targets)
+
+    def save(self, path):
+        # Write to a temporary file first, so concurrent readers never see a half-written file
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'wb') as graph_file:
+                graph_file.write(VISIBILITY_GRAPH_HEADER.pack(VISIBILITY_GRAPH_MAGIC, self.height, self.width, self.crc,
+                                                              len(self), len(self.targets)))
+                graph_file.write(self.vertices.tobytes())
+                graph_file.write(self.offsets.tobytes())
+                graph_file.write(self.targets.tobytes())
+            os.replace(tmp_path, path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    @classmethod
+    def load(cls, path, grid_map: Map = None):
+        '''
+        Reads a graph file. Returns None if the file is broken or was built for another map (when grid_map is given).
+        '''
+        with open(path, 'rb') as graph_file:
+            data = graph_file.read()
+        if len(data) < VISIBILITY_GRAPH_HEADER.size:
+            return None
+        magic, height, width, crc, vertices_count, targets_count = VISIBILITY_GRAPH_HEADER.unpack_from(data)
+        vertices = array('i')
+        offsets = array('I')
+        targets = array('I')
+        sizes = (3 * vertices_count * vertices.itemsize, (vertices_count + 1) * offsets.itemsize, targets_count * targets.itemsize)
+        if magic != VISIBILITY_GRAPH_MAGIC or len(data) != VISIBILITY_GRAPH_HEADER.size + sum(sizes):
+            return None
+        if grid_map is not None and ((height, width) != grid_map.get_size() or crc != zlib.crc32(grid_map.get_padded_grid())):
+            return None
+        position = VISIBILITY_GRAPH_HEADER.size
+        for values, size in zip((vertices, offsets, targets), sizes):
+            values.frombytes(data[position:position + size])
+            position += size
+        return cls(height, width, crc, vertices, offsets, targets)
+
+    @classmethod
+    def for_map(cls, grid_map: Map, path=None):
+        '''
+        Graph of the map, it's built once per map object and version of its grid. If path is given, the graph is
+        read from this file, and the file is (re)built when it is missing or belongs to another map.
+        '''
+        known = _graphs.get(grid_map)
+        if known is not None and known[0] == grid_map.version:
+            return known[1]
+        graph = None
+        if path is not None:
+            try:
+                graph = cls.load(path, grid_map)
+            except OSError:
+                pass
+        if graph is None:
+            graph = cls.build(grid_map)
+            if path is not None:
+                try:
+                    graph.save(path)
+                except OSError:
+                    # Read-only directory etc.: the file is optional
+                    pass
+        _graphs[grid_map] = (grid_map.version, graph)
+        return graph
+
+    def visible_vertices(self, grid_map: Map, i, j):
+        '''
+        Vertices visible from the point (i, j) with a tangent segment.
+        '''
+        visible = []
+        for v in range(len(self)):
+            vi, vj, side = self.vertex(v)
+            di = i - vi
+            dj = j - vj
+            if di == 0 and dj == 0:
+                continue
+            if side != 0 and _corner_side(grid_map, vi, vj, di, dj) != side:
+                continue
+            if self.is_tangent(self._quadrant(grid_map, vi, vj), di, dj) and grid_map.line_of_sight(vi, vj, i, j):
+                visible.append(v)
+        return visible
+
+    @staticmethod
+    def _quadrant(grid_map: Map, i, j):
+        return 1 if (grid_map.is_obstacle(i - 1, j - 1) or grid_map.is_obstacle(i, j)) else -1
+
+
+def visibility_graph_search(grid_map: Map, start_i, start_j, goal_i, goal_j, heuristic_func=None, open_type=OpenHeap, closed_type=Closed, graph=None, stats=None):
+    '''
+    A* over the visibility graph of the map (VisibilityGraph.for_map if graph is None) with the start and the goal
+    connected to it: optimal any-angle paths as anya finds. Successors of the start are found with line of sight checks
+    to all vertices, the goal is checked from every expanded vertex. OPEN must distinguish sides of diagonal
+    intersections (is_left), so OpenHeap is used by default.
+    '''
+    if graph is None:
+        graph = VisibilityGraph.for_map(grid_map)
+    if stats is not None:
+        # Instrumented map and OPEN fill the stats, see util.stats
+        grid_map, open_type = stats.instrument(grid_map, open_type)
+        stats.generated += 1  # start node
+    start_node = Node(i=start_i, j=start_j, h=heuristic_func(start_i, start_j, goal_i, goal_j))
+    OPEN = open_type()
+    CLOSED = closed_type(grid_map)
+    steps = 0
+    nodes_created = 0
+    # Node -> vertex of the graph, the start and the goal nodes are not in the graph
+    vertex_of = dict()
+    if not grid_map.connected(start_i, start_j, goal_i, goal_j):
+        # The goal is in other components of free cells (see Map.get_components), there is nothing to search
+        return False, None, steps, nodes_created, OPEN, CLOSED
+
+    OPEN.add_node(start_node)
+    while not OPEN.is_empty():
+        current = OPEN.get_best_node()
+        if CLOSED.was_expanded(current.i, current.j, current.is_left):
+            continue
+        steps += 1
+        if current.i == goal_i and current.j == goal_j:
+            return True, current, steps, nodes_created, OPEN, CLOSED
+        if current is start_node:
+            successors = [(v,) + graph.vertex(v) for v in graph.visible_vertices(grid_map, start_i, start_j)]
+        else:
+            successors = [(v,) + graph.vertex(v) for v in graph.neighbors(vertex_of[id(current)])]
+        # The goal: directly visible from the start or through a tangent segment from a corner
+        di = goal_i - current.i
+        dj = goal_j - current.j
+        if current is start_node or (graph.is_tangent(graph._quadrant(grid_map, current.i, current.j), di, dj)
+                                     and (current.is_left == 0 or _corner_side(grid_map, current.i, current.j, di, dj) == current.is_left)):
+            if grid_map.line_of_sight(current.i, current.j, goal_i, goal_j):
+                successors.append((None, goal_i, goal_j, 0))
+        if stats is not None:
+            stats.add_expansion(current, len(successors), 0.0)
+        for (v, neighbour_i, neighbour_j, side) in successors:
+            if not CLOSED.was_expanded(neighbour_i, neighbour_j, side):
+                next_node = Node(i=neighbour_i, j=neighbour_j,
+                                 g=current.g + uf.compute_cost(current.i, current.j, neighbour_i, neighbour_j),
+                                 h=heuristic_func(neighbour_i, neighbour_j, goal_i, goal_j), parent=current,
+                                 k=nodes_created, is_left=side)
+                nodes_created += 1
+                vertex_of[id(next_node)] = v
+                OPEN.add_node(next_node)
+        CLOSED.add_node(current)
+
+    return False, None, steps, nodes_created, OPEN, CLOSED
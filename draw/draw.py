@@ -1,9 +1,11 @@
+import random
+
 import matplotlib.pyplot as plt
 import matplotlib.patches as mpatches
 import numpy as np
 
 from PIL import Image, ImageDraw
-from algorithms.structures import Map, Node
+from algorithms.structures import Map, Node, AnyaMap, AnyaNode
 
 
 def draw(grid_map: Map, start:Node=None, goal:Node=None, path=None, nodes_opened=None, nodes_expanded=None, nodes_reexpanded=None, show_in_notebook=True, path2=None, path3=None, paths=None, labels=None):
@@ -93,3 +95,39 @@ def draw(grid_map: Map, start:Node=None, goal:Node=None, path=None, nodes_opened
         plt.show()
     else:
         im.show()
+
+
+def draw_neighbors_anya(grid_map: AnyaMap, node: AnyaNode):
+    assert node is not None
+    height, width = grid_map.get_size()
+    k = 2048 // max(height, width)
+    h_im = height * k
+    w_im = width * k
+    im = Image.new('RGB', (w_im, h_im), color='white')
+    draw = ImageDraw.Draw(im)
+
+    for i in range(height):
+        for j in range(width):
+            if (not grid_map.traversable(i, j)):
+                draw.rectangle((j * k, i * k, (j + 1) * k - 1, (i + 1) * k - 1), fill=(70, 80, 80))
+
+    if node.aj is None:
+        neighbors = grid_map.get_start_neighbors(node.i, node.j)
+    else:
+        neighbors = grid_map.get_neighbors_by_node(node)
+        draw.line((node.aj * k, node.ai * k, node.bj * k, node.bi * k), fill=(0, 255, 0), width=5)
+
+    draw.ellipse((node.j * k - k / 4, node.i * k - k / 4, node.j * k + k / 4, node.i * k + k / 4), fill=(0, 255, 0), width=0)
+
+
+    for neighbor in neighbors:
+        color = (random.randint(0, 255), 0, random.randint(0, 255))
+        print(neighbor.i, neighbor.j, neighbor.ai, neighbor.aj, neighbor.bi, neighbor.bj)
+        draw.line((neighbor.aj * k, neighbor.ai * k, neighbor.bj * k, neighbor.bi * k), fill=color, width=5)
+        draw.ellipse((neighbor.j * k - 10, neighbor.i * k - 10, neighbor.j * k + 10, neighbor.i * k + 10), fill=color, width=0)
+
+    _, ax = plt.subplots(dpi=150)
+    ax.axes.xaxis.set_visible(False)
+    ax.axes.yaxis.set_visible(False)
+    plt.imshow(np.asarray(im))
+    plt.show()
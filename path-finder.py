@@ -1,10 +1,16 @@
 import argparse
 
 from algorithms.anya import anya
+from algorithms.apthetastar import apthetastar
+from algorithms.anytime import weighted_astar2k, weighted_thetastar, anytime_astar2k, anytime_thetastar, anytime_anya
 from algorithms.astar2k import astar2k
+from algorithms.bidirectional import bidirectional_astar2k, bidirectional_thetastar
+from algorithms.jps import jps
+from algorithms.landmarks import Landmarks, landmarks_path
+from algorithms.lazythetastar import lazythetastar
 from algorithms.structures import AnyaMap, Node
 from algorithms.thetastar import thetastar
-from draw.draw import draw
+from algorithms.visibility_graph import VisibilityGraph, visibility_graph_search, visibility_graph_path
 from test.movingai_util import read_map_from_movingai_file
 from util.functions import euclidian_distance, make_path, compare_step
 
@@ -15,12 +21,25 @@ def main():
     parser.add_argument("-s", "--astar2k", action="store_const", dest="algorithm", const=0, default=0, help="sets 2^k A* as the search algorithm, used by default")
     parser.add_argument("-t", "--theta", action="store_const", dest="algorithm", const=1, help="sets Theta* as the search algorithm")
     parser.add_argument("-a", "--anya", action="store_const", dest="algorithm", const=2, help="sets Anya as the search algorithm")
-    parser.add_argument("-k", action="store", dest="k", default=2, type=int, metavar="k", help="sets 2^k as the limit of possible directions of moves, using in 2^k A* and Theta*, ANYA ignores it, by default 2")
+    parser.add_argument("-l", "--lazy-theta", action="store_const", dest="algorithm", const=3, help="sets Lazy Theta* as the search algorithm")
+    parser.add_argument("-p", "--ap-theta", action="store_const", dest="algorithm", const=4, help="sets AP Theta* as the search algorithm")
+    parser.add_argument("-j", "--jps", action="store_const", dest="algorithm", const=5, help="sets Jump Point Search (2^k A* with k=3) as the search algorithm")
+    parser.add_argument("-g", "--visibility-graph", action="store_const", dest="algorithm", const=6, help="sets A* over the visibility graph of convex corners as the search algorithm, the graph is saved next to the map")
+    parser.add_argument("-b", "--bidirectional", action="store_true", dest="bidirectional", default=False, help="searches from the start and from the goal simultaneously, used with 2^k A* and Theta*")
+    parser.add_argument("-L", "--landmarks", action="store_true", dest="landmarks", default=False, help="uses the landmark (ALT) heuristic instead of the euclidean distance in 2^k A*, Theta* and their variants, its tables are saved next to the map")
+    parser.add_argument("-w", "--weight", action="store", dest="weight", default=None, type=float, metavar="w", help="multiplies the heuristic of 2^k A* and Theta* by w, the path of 2^k A* is at most w times longer than with w=1")
+    parser.add_argument("-T", "--time-limit", action="store", dest="time_limit", default=None, type=float, metavar="seconds", help="runs the anytime variants of 2^k A*, Theta* and ANYA, they return the best path found in the time limit and the bound of its suboptimality")
+    parser.add_argument("-k", action="store", dest="k", default=2, type=int, metavar="k", help="sets 2^k as the limit of possible directions of moves, using in 2^k A*, Theta* and their variants (AP Theta* takes only k <= 3), ANYA, JPS and the visibility graph ignore it, by default 2")
     parser.add_argument("-v", "--text-output-only", action="store_true", dest="v", default=False, help="disables graphics")
     parser.add_argument("-f", "--map_file", action="store", dest="input_file", metavar="map_file", default="test/data/Moscow_0_256.map", help="filename of the map, by default one of the maps of Moscow is used")
     parser.add_argument("-i", "--task", action="store", dest="input", nargs=4, metavar=("start.i", "start.j", "goal.i", "goal.j"), type=int, help="4 integers describing the task, if None then only map will be displayed")
 
     args = parser.parse_args()
+    if args.k < 2:
+        parser.error("k must be at least 2")
+    if not args.v:
+        # Graphics pull in matplotlib and PIL, so they are imported only when they are enabled
+        from draw.draw import draw
     if args.input_file is None:
         print("Sorry, but you need to define filename of map with -f parameter")
         return
@@ -34,12 +53,39 @@ def main():
         return
 
     si, sj, gi, gj = args.input
-    if args.algorithm == 0:
-        result = astar2k(task_map, si, sj, gi, gj, euclidian_distance, k=2)
+    heuristic = euclidian_distance
+    if args.landmarks:
+        # Tables of 2^k moves are admissible for searches with at most 2^k moves
+        heuristic = Landmarks.for_map(task_map, landmarks_path(args.input_file), k=max(args.k, 3)).heuristic()
+    if args.algorithm == 0 and args.weight is not None:
+        result = weighted_astar2k(task_map, si, sj, gi, gj, heuristic, k=args.k, weight=args.weight, time_limit=args.time_limit)
+    elif args.algorithm == 0 and args.time_limit is not None:
+        result = anytime_astar2k(task_map, si, sj, gi, gj, heuristic, k=args.k, time_limit=args.time_limit)
+    elif args.algorithm == 0 and args.bidirectional:
+        result = bidirectional_astar2k(task_map, si, sj, gi, gj, heuristic, k=args.k)
+    elif args.algorithm == 0:
+        result = astar2k(task_map, si, sj, gi, gj, heuristic, k=args.k)
+    elif args.algorithm == 1 and args.weight is not None:
+        result = weighted_thetastar(task_map, si, sj, gi, gj, heuristic, k=args.k, weight=args.weight, time_limit=args.time_limit)
+    elif args.algorithm == 1 and args.time_limit is not None:
+        result = anytime_thetastar(task_map, si, sj, gi, gj, heuristic, k=args.k, time_limit=args.time_limit)
+    elif args.algorithm == 1 and args.bidirectional:
+        result = bidirectional_thetastar(task_map, si, sj, gi, gj, heuristic, k=args.k)
     elif args.algorithm == 1:
-        result = thetastar(task_map, si, sj, gi, gj, euclidian_distance, k=2)
+        result = thetastar(task_map, si, sj, gi, gj, heuristic, k=args.k)
+    elif args.algorithm == 2 and args.time_limit is not None:
+        result = anytime_anya(task_map, si, sj, gi, gj, euclidian_distance, time_limit=args.time_limit)
     elif args.algorithm == 2:
         result = anya(task_map, si, sj, gi, gj, euclidian_distance)
+    elif args.algorithm == 3:
+        result = lazythetastar(task_map, si, sj, gi, gj, heuristic, k=args.k)
+    elif args.algorithm == 4:
+        result = apthetastar(task_map, si, sj, gi, gj, heuristic, k=args.k)
+    elif args.algorithm == 5:
+        result = jps(task_map, si, sj, gi, gj, heuristic)
+    elif args.algorithm == 6:
+        graph = VisibilityGraph.for_map(task_map, visibility_graph_path(args.input_file))
+        result = visibility_graph_search(task_map, si, sj, gi, gj, euclidian_distance, graph=graph)
     else:
         assert False
 
@@ -47,6 +93,9 @@ def main():
         path = make_path(result[1])
         print("Path found!")
         print("Length: ", path[1])
+        if len(result) > 6:
+            # Weighted and anytime searches: the path is at most this times longer than the shortest one
+            print("Bound: ", result[6])
         prev2i = -1
         prev2j = -1
         previ = -1
@@ -0,0 +1,264 @@
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from collections import deque
+
+from algorithms.structures import AnyaMap, Node
+from test.movingai_util import read_map_from_movingai_file, read_tasks_from_movingai_file
+from test.scenario_runner import run_task
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MAP_SETS = {
+    "city": ["Berlin_0_512", "Boston_0_512", "Denver_0_512", "London_0_512", "Milan_0_512", "Moscow_0_512",
+             "NewYork_0_512", "Paris_0_512", "Shanghai_0_512", "Sydney_0_512"],
+    "room": ["16room_000", "32room_000", "64room_000"],
+    "random": ["random512-10-0", "random512-10-1"],
+    "game": ["tranquilpaths", "thecrucible", "plunderisle", "petrifiedforest", "moonglade"],
+}
+
+# Modules of the search core, they must be importable without the plotting dependencies
+CORE_MODULES = ["algorithms.astar2k", "algorithms.thetastar", "algorithms.anya", "test.movingai_util"]
+PLOTTING_MODULES = ["matplotlib", "PIL", "numpy"]
+
+SEARCH_RUNS = [("astar2k", 2), ("astar2k", 3), ("astar2k", 4), ("thetastar", 2), ("lazythetastar", 2), ("apthetastar", 2), ("jps", 3),
+               ("bidirectional_astar2k", 2), ("bidirectional_thetastar", 2), ("anya", None)]
+
+
+def run_name(algorithm, k):
+    return algorithm if k is None else f"{algorithm}-k{k}"
+
+
+def sample_tasks(map_name, tasks_per_map):
+    '''
+    Fixed sample of tasks: evenly spaced over the .scen file, so it covers short and long tasks.
+    '''
+    tasks = read_tasks_from_movingai_file(os.path.join(DATA_DIR, map_name + ".map.scen"))
+    return [tasks[len(tasks) * (t + 1) // (tasks_per_map + 1)] for t in range(tasks_per_map)]
+
+
+def best_time(function, repeat):
+    # As in timeit, garbage collection is disabled during measurements
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        best = None
+        for _ in range(repeat):
+            start_time = time.perf_counter()
+            function()
+            elapsed = time.perf_counter() - start_time
+            if best is None or elapsed < best:
+                best = elapsed
+    finally:
+        if gc_enabled:
+            gc.enable()
+    return best
+
+
+def benchmark_search(map_sets, tasks_per_map, repeat):
+    '''
+    Total time (the best of repeat runs for every task), expansions and path length of every algorithm per map set.
+    '''
+    results = {}
+    for set_name in map_sets:
+        for map_name in MAP_SETS[set_name]:
+            task_map = read_map_from_movingai_file(os.path.join(DATA_DIR, map_name + ".map"), AnyaMap)
+            for task in sample_tasks(map_name, tasks_per_map):
+                for algorithm, k in SEARCH_RUNS:
+                    name = f"search/{set_name}/{run_name(algorithm, k)}"
+                    entry = results.setdefault(name, {"time": 0.0, "expansions": 0, "length": 0.0, "tasks": 0})
+                    times = []
+                    for _ in range(repeat):
+                        found, length, expansions, _, elapsed = run_task(task_map, algorithm, k, task)
+                        times.append(elapsed)
+                    entry["time"] += min(times)
+                    entry["expansions"] += expansions
+                    entry["length"] += length if found else 0.0
+                    entry["tasks"] += 1
+    for entry in results.values():
+        entry["length"] = round(entry["length"], 6)
+    return results
+
+
+def _free_points(task_map, count, rnd):
+    height, width = task_map.get_size()
+    points = []
+    while len(points) < count:
+        i, j = rnd.randrange(height), rnd.randrange(width)
+        if not task_map.is_obstacle(i, j):
+            points.append((i, j))
+    return points
+
+
+def _anya_nodes(task_map, starts, count):
+    # Search nodes as ANYA meets them: breadth-first expansion from start points
+    nodes = []
+    per_start = count // len(starts) + 1
+    for (i, j) in starts:
+        queue = deque(task_map.get_start_neighbors(i, j))
+        limit = min(len(nodes) + per_start, count)
+        while queue and len(nodes) < limit:
+            node = queue.popleft()
+            nodes.append(node)
+            queue.extend(task_map.get_neighbors_by_node(node))
+    return nodes
+
+
+def benchmark_micro(map_sets, repeat, seed, calls=2000):
+    '''
+    Time per call of the map primitives on the first map of every set, for fixed random arguments.
+    '''
+    results = {}
+    for set_name in map_sets:
+        map_name = MAP_SETS[set_name][0]
+        task_map = read_map_from_movingai_file(os.path.join(DATA_DIR, map_name + ".map"), AnyaMap)
+        height, width = task_map.get_size()
+        rnd = random.Random(seed)
+
+        cells = [(rnd.randrange(-1, height + 1), rnd.randrange(-1, width + 1)) for _ in range(calls)]
+        points = _free_points(task_map, calls, rnd)
+        segments = [(i, j, min(max(i + rnd.randint(-64, 64), 0), height), min(max(j + rnd.randint(-64, 64), 0), width))
+                    for (i, j) in points]
+        grid_nodes = [Node(i, j) for (i, j) in points]
+        anya_nodes = _anya_nodes(task_map, points[:50], calls)
+        # The index of obstacle changes is built once per map, it's not a part of the measured calls
+        task_map.get_start_neighbors(*points[0])
+
+        def run_is_obstacle():
+            for (i, j) in cells:
+                task_map.is_obstacle(i, j)
+
+        def run_traversable_step_long():
+            for (i1, j1, i2, j2) in segments:
+                task_map.traversable_step_long(i1, j1, i2, j2)
+
+        def run_get_neighbors(k):
+            for node in grid_nodes:
+                task_map.get_neighbors(node, k)
+
+        def run_get_neighbors_by_node():
+            for node in anya_nodes:
+                task_map.get_neighbors_by_node(node)
+
+        cases = [("is_obstacle", run_is_obstacle, len(cells)),
+                 ("traversable_step_long", run_traversable_step_long, len(segments)),
+                 ("get_neighbors-k2", lambda: run_get_neighbors(2), len(grid_nodes)),
+                 ("get_neighbors-k4", lambda: run_get_neighbors(4), len(grid_nodes)),
+                 ("get_neighbors_by_node", run_get_neighbors_by_node, len(anya_nodes))]
+        for name, function, count in cases:
+            results[f"micro/{set_name}/{name}"] = {"time": best_time(function, repeat) / count, "calls": count}
+    return results
+
+
+def benchmark_startup(repeat):
+    '''
+    Time of importing the search core in a new interpreter (start of an empty interpreter is subtracted)
+    and plotting modules which were imported with it.
+    '''
+    script = f"import sys, {', '.join(CORE_MODULES)}; print(','.join(m for m in {PLOTTING_MODULES!r} if m in sys.modules))"
+
+    def run(code):
+        return subprocess.run([sys.executable, "-c", code], cwd=ROOT_DIR, check=True, capture_output=True, text=True).stdout
+
+    empty_time = best_time(lambda: run("pass"), repeat)
+    import_time = best_time(lambda: run(script), repeat)
+    plotting_modules = [m for m in run(script).strip().split(",") if m]
+    return {"startup/import-core": {"time": max(import_time - empty_time, 0.0), "plotting_modules": plotting_modules}}
+
+
+def run_benchmarks(map_sets=None, tasks_per_map=3, search_repeat=1, micro_repeat=5, seed=239):
+    map_sets = map_sets or list(MAP_SETS.keys())
+    benchmarks = {}
+    benchmarks.update(benchmark_startup(micro_repeat))
+    benchmarks.update(benchmark_micro(map_sets, micro_repeat, seed))
+    benchmarks.update(benchmark_search(map_sets, tasks_per_map, search_repeat))
+    return {
+        "meta": {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "map_sets": map_sets,
+            "tasks_per_map": tasks_per_map,
+            "search_repeat": search_repeat,
+            "micro_repeat": micro_repeat,
+            "seed": seed,
+        },
+        "benchmarks": benchmarks,
+    }
+
+
+def compare(baseline, current, threshold=0.1):
+    '''
+    Returns rows (name, baseline time, current time, ratio, status) for benchmarks present in both results.
+    Status is "slower" or "faster" if the time changed more than by threshold (a fraction of the baseline time),
+    and "changed" if a search made another number of expansions, so its times are not comparable.
+    '''
+    rows = []
+    for name, old in baseline["benchmarks"].items():
+        new = current["benchmarks"].get(name)
+        if new is None:
+            continue
+        ratio = new["time"] / old["time"] if old["time"] > 0 else float("inf")
+        status = ""
+        if "expansions" in old and (old["expansions"], old["tasks"]) != (new["expansions"], new["tasks"]):
+            status = "changed"
+        elif ratio > 1 + threshold:
+            status = "slower"
+        elif ratio < 1 - threshold:
+            status = "faster"
+        rows.append((name, old["time"], new["time"], ratio, status))
+    return rows
+
+
+def print_comparison(rows):
+    print(f"{'benchmark':<45} {'baseline':>12} {'current':>12} {'ratio':>7}")
+    for name, old_time, new_time, ratio, status in rows:
+        print(f"{name:<45} {old_time:>12.6g} {new_time:>12.6g} {ratio:>7.3f} {status}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks of the search algorithms and map primitives on the bundled maps")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    run_parser = subparsers.add_parser("run", help="runs the benchmarks and saves the results as JSON")
+    run_parser.add_argument("-o", "--output", action="store", dest="output", default="benchmark.json", help="output file, by default benchmark.json")
+    run_parser.add_argument("--sets", action="store", dest="sets", nargs="+", choices=MAP_SETS.keys(), default=None, help="map sets to use, by default all of them")
+    run_parser.add_argument("--tasks", action="store", dest="tasks", type=int, default=3, help="number of tasks per map, by default 3")
+    run_parser.add_argument("--repeat", action="store", dest="repeat", type=int, default=1, help="number of runs of every search (the best time is taken), by default 1")
+    run_parser.add_argument("--seed", action="store", dest="seed", type=int, default=239, help="seed of the micro-benchmark arguments")
+    compare_parser = subparsers.add_parser("compare", help="compares results with a baseline, exits with 1 if something is slower")
+    compare_parser.add_argument("baseline", help="JSON file with baseline results")
+    compare_parser.add_argument("current", nargs="?", default=None, help="JSON file with current results, by default the benchmarks are run with the baseline's settings")
+    compare_parser.add_argument("-t", "--threshold", action="store", dest="threshold", type=float, default=0.1, help="relative change of time reported as a slowdown, by default 0.1")
+
+    args = parser.parse_args()
+    if args.command == "run":
+        results = run_benchmarks(args.sets, args.tasks, args.repeat, seed=args.seed)
+        with open(args.output, "w") as output:
+            json.dump(results, output, indent=2)
+        for name, entry in results["benchmarks"].items():
+            print(f"{name:<45} {entry['time']:>12.6g}")
+        return
+
+    with open(args.baseline) as baseline_file:
+        baseline = json.load(baseline_file)
+    if args.current is None:
+        meta = baseline["meta"]
+        current = run_benchmarks(meta["map_sets"], meta["tasks_per_map"], meta["search_repeat"], meta["micro_repeat"], meta["seed"])
+    else:
+        with open(args.current) as current_file:
+            current = json.load(current_file)
+    rows = compare(baseline, current, args.threshold)
+    print_comparison(rows)
+    if any(status == "slower" for (_, _, _, _, status) in rows):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
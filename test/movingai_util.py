@@ -1,24 +1,105 @@
+import mmap
+import os
+import struct
+
 from algorithms.structures import Map
 
+# Binary map file: header + padded grid in the same layout as Map keeps it in memory
+#   ((height + 2) x (width + 2) bytes, 1 for obstacles, border included), so it can be memory-mapped as is.
+# Header stores size and mtime of the source .map file, so a stale binary file is detected and rebuilt.
+BINARY_MAP_MAGIC = b'AAPGRID1'
+BINARY_MAP_HEADER = struct.Struct('<8sIIqq')  # magic, height, width, source mtime (ns), source size
+BINARY_MAP_SUFFIX = '.bin'
 
-def read_map_from_movingai_file(path, map_type=Map):
-    with open(path, 'rt') as map_file:
-        lines = list(map(
-            lambda line: line.strip(),
-            map_file.readlines()
-        ))
-        height = int(lines[1].split()[1])
-        width = int(lines[2].split()[1])
-        map_str = '\n'.join([
-            ''.join(
-                '#' if c != '.' else '.'
-                for c in line
-            )
-            for line in lines[4:]
-        ])
-        task_map = map_type()
-        task_map.read_from_string(map_str, width, height)
-        return task_map
+# '.' is a free cell, anything else is an obstacle
+_CELLS_TABLE = bytes(0 if c == ord('.') else 1 for c in range(256))
+
+
+def binary_map_path(path):
+    return path + BINARY_MAP_SUFFIX
+
+
+def parse_movingai_file(path, map_type=Map):
+    with open(path, 'rb') as map_file:
+        lines = [line.strip() for line in map_file.read().split(b'\n')]
+    height = int(lines[1].split()[1])
+    width = int(lines[2].split()[1])
+    rows = [line for line in lines[4:] if len(line) != 0]
+    if len(rows) != height:
+        raise Exception("Size Error. Map height = ", len(rows), ", but must be", height)
+    border = b'\x01'
+    grid = bytearray(border * (width + 2))
+    for row in rows:
+        if len(row) != width:
+            raise Exception("Size Error. Map width = ", len(row), ", but must be", width)
+        grid += border + row.translate(_CELLS_TABLE) + border
+    grid += border * (width + 2)
+    task_map = map_type()
+    task_map.set_padded_grid(width, height, grid)
+    return task_map
+
+
+def write_binary_map(task_map: Map, path, source_mtime_ns=0, source_size=0):
+    height, width = task_map.get_size()
+    # Write to a temporary file first, so concurrent readers never see a half-written file
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, 'wb') as binary_file:
+            binary_file.write(BINARY_MAP_HEADER.pack(BINARY_MAP_MAGIC, height, width, source_mtime_ns, source_size))
+            binary_file.write(task_map.get_padded_grid())
+        os.replace(tmp_path, path)
+    except OSError:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def read_binary_map(path, map_type=Map, source_mtime_ns=None, source_size=None):
+    '''
+    Memory-maps a binary map file. Returns None if the file is broken or was built from
+    another version of the source file (when source_mtime_ns and source_size are given).
+    The mapping is copy-on-write, so changes of the map are never written back to the file.
+    '''
+    with open(path, 'rb') as binary_file:
+        try:
+            data = mmap.mmap(binary_file.fileno(), 0, access=mmap.ACCESS_COPY)
+        except ValueError:
+            # Empty file
+            return None
+    if len(data) < BINARY_MAP_HEADER.size:
+        return None
+    magic, height, width, mtime_ns, size = BINARY_MAP_HEADER.unpack_from(data)
+    if magic != BINARY_MAP_MAGIC or len(data) != BINARY_MAP_HEADER.size + (height + 2) * (width + 2):
+        return None
+    if source_mtime_ns is not None and (mtime_ns != source_mtime_ns or size != source_size):
+        return None
+    task_map = map_type()
+    task_map.set_padded_grid(width, height, memoryview(data)[BINARY_MAP_HEADER.size:])
+    return task_map
+
+
+def read_map_from_movingai_file(path, map_type=Map, use_binary_cache=True):
+    '''
+    Reads a map in movingai format. If use_binary_cache is True, the map is loaded from the binary file
+    next to it (see binary_map_path), and this file is (re)built when it is missing or out of date.
+    '''
+    if not use_binary_cache:
+        return parse_movingai_file(path, map_type)
+    source_stat = os.stat(path)
+    cache_path = binary_map_path(path)
+    try:
+        task_map = read_binary_map(cache_path, map_type, source_stat.st_mtime_ns, source_stat.st_size)
+        if task_map is not None:
+            return task_map
+    except OSError:
+        pass
+    task_map = parse_movingai_file(path, map_type)
+    try:
+        write_binary_map(task_map, cache_path, source_stat.st_mtime_ns, source_stat.st_size)
+    except OSError:
+        # Read-only directory etc.: the cache is optional
+        pass
+    return task_map
 
 
 def read_tasks_from_movingai_file(path):
@@ -0,0 +1,246 @@
+import argparse
+import json
+import os
+import signal
+import socketserver
+import sys
+import time
+from collections import deque
+from multiprocessing import Pool
+from threading import Lock
+
+from algorithms.structures import AnyaMap
+from test.movingai_util import read_map_from_movingai_file
+from test.scenario_runner import ALGORITHMS, run_search
+from util.functions import make_path
+from util.path_cache import PathCache
+
+# Maps preloaded by this process: map id -> AnyaMap
+_maps = {}
+# Results of this process, see --cache-size
+_cache = None
+# Optimal searches: the reversed path of a query is an answer to the reversed query
+REVERSIBLE_ALGORITHMS = {"astar2k", "jps", "bidirectional_astar2k", "anya", "visibility_graph"}
+# Supported k of queries: 2^k moves are built for every k, AP Theta* takes only k <= 3
+MIN_K = 2
+MAX_K = 8
+
+
+def parse_map_argument(argument):
+    '''
+    "id=path" or just "path", then id is the file name without ".map".
+    '''
+    if "=" in argument:
+        map_id, path = argument.split("=", 1)
+        return map_id, path
+    name = os.path.basename(argument)
+    return (name[:-len(".map")] if name.endswith(".map") else name), argument
+
+
+def load_maps(map_paths, cache_size=0):
+    global _cache
+    for map_id, path in map_paths.items():
+        _maps[map_id] = read_map_from_movingai_file(path, AnyaMap)
+    _cache = PathCache(cache_size) if cache_size > 0 else None
+
+
+def _init_worker(map_paths, cache_size=0):
+    # Stopping is handled by the server process
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    load_maps(map_paths, cache_size)
+
+
+def answer_query(query):
+    '''
+    Query: {"map": id, "algorithm": "anya" (default), "start": [i, j], "goal": [i, j], "k": 2 (default)}.
+    '''
+    task_map = _maps.get(query.get("map"))
+    if task_map is None:
+        raise ValueError(f"unknown map {query.get('map')!r}")
+    algorithm = query.get("algorithm", "anya")
+    if algorithm not in ALGORITHMS:
+        raise ValueError(f"unknown algorithm {algorithm!r}")
+    k = query.get("k", 2)
+    max_k = 3 if algorithm == "apthetastar" else MAX_K
+    if type(k) is not int or not MIN_K <= k <= max_k:
+        raise ValueError(f"k must be an integer from {MIN_K} to {max_k}, got {k!r}")
+    (si, sj), (gi, gj) = query["start"], query["goal"]
+    height, width = task_map.get_size()
+    for (i, j) in ((si, sj), (gi, gj)):
+        if type(i) is not int or type(j) is not int:
+            raise ValueError(f"point ({i!r}, {j!r}) must have integer coordinates")
+        if not (0 <= i <= height and 0 <= j <= width):
+            raise ValueError(f"point ({i}, {j}) is out of the map")
+
+    start_time = time.perf_counter()
+    if _cache is not None:
+        expansions = []
+
+        def search():
+            result = run_search(task_map, algorithm, k, si, sj, gi, gj)
+            expansions.append(result[2])
+            return result
+
+        found, path, length, cached = _cache.search(search, task_map, algorithm, k, si, sj, gi, gj,
+                                                    algorithm in REVERSIBLE_ALGORITHMS)
+        response = {"found": found, "length": length, "path": [[i, j] for (i, j) in path] if found else None,
+                    "expansions": expansions[0] if expansions else 0, "cached": cached}
+        response["time"] = time.perf_counter() - start_time
+        return response
+    result = run_search(task_map, algorithm, k, si, sj, gi, gj)
+    response = {"found": result[0], "length": None, "path": None, "expansions": result[2]}
+    if result[0]:
+        path, length = make_path(result[1])
+        response["length"] = length
+        response["path"] = [[node.i, node.j] for node in path]
+    response["time"] = time.perf_counter() - start_time
+    return response
+
+
+def handle_line(line):
+    '''
+    Answers one JSON line. Errors are returned as {"error": message}, so a bad query never stops the server.
+    '''
+    query = None
+    try:
+        query = json.loads(line)
+        if not isinstance(query, dict):
+            raise ValueError("query must be a JSON object")
+        response = answer_query(query)
+    except Exception as e:
+        # Any failure of one query (a bad query or an error of the search) is its response only
+        response = {"error": f"{type(e).__name__}: {e}"}
+    if isinstance(query, dict) and "id" in query:
+        response["id"] = query["id"]
+    return response
+
+
+class PathServer:
+    '''
+    Answers queries with the preloaded maps, in this process (jobs=1) or with a pool of worker processes,
+    which load the maps once at start. Every response gets "latency": seconds from receiving the query till the answer.
+    '''
+
+    def __init__(self, map_paths, jobs=None, cache_size=0):
+        # Maps are loaded here too: it checks them before the start and builds binary map files for workers
+        load_maps(map_paths, cache_size)
+        self.pool = None
+        if jobs != 1:
+            self.pool = Pool(jobs, initializer=_init_worker, initargs=(map_paths, cache_size))
+        self.count = 0
+        # Answers from the caches of the server process and the workers
+        self.cache_hits = 0
+        self.total_latency = 0.0
+        self.recent_latencies = deque(maxlen=10000)
+        self._lock = Lock()
+
+    def _record(self, response, received):
+        response["latency"] = time.perf_counter() - received
+        with self._lock:
+            self.count += 1
+            self.cache_hits += bool(response.get("cached"))
+            self.total_latency += response["latency"]
+            self.recent_latencies.append(response["latency"])
+        return response
+
+    def answer(self, line):
+        received = time.perf_counter()
+        if self.pool is None:
+            response = handle_line(line)
+        else:
+            response = self.pool.apply(handle_line, (line,))
+        return self._record(response, received)
+
+    def answer_stream(self, lines, chunk_size=1):
+        '''
+        Answers a stream of lines, queries are processed in parallel, responses are yielded in the order of queries.
+        '''
+        received = deque()
+
+        def timed_lines():
+            for line in lines:
+                if line.strip():
+                    received.append(time.perf_counter())
+                    yield line
+
+        if self.pool is None:
+            responses = map(handle_line, timed_lines())
+        else:
+            responses = self.pool.imap(handle_line, timed_lines(), chunk_size)
+        for response in responses:
+            yield self._record(response, received.popleft())
+
+    def summary(self):
+        latencies = sorted(self.recent_latencies)
+        if not latencies:
+            return "0 queries"
+        return (f"{self.count} queries, mean latency {self.total_latency / self.count * 1000:.3f} ms, "
+                f"p50 {latencies[len(latencies) // 2] * 1000:.3f} ms, p99 {latencies[len(latencies) * 99 // 100] * 1000:.3f} ms "
+                f"(percentiles of the last {len(latencies)} queries), {self.cache_hits} answered from the cache")
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool.join()
+
+
+def serve_stdin(server, chunk_size=1):
+    for response in server.answer_stream(sys.stdin, chunk_size):
+        sys.stdout.write(json.dumps(response) + "\n")
+        sys.stdout.flush()
+
+
+def serve_unix_socket(server, path):
+    '''
+    Every connection sends JSON lines and receives a response line for each of them.
+    Connections are served by separate threads, so queries of different clients are processed in parallel.
+    '''
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            for line in self.rfile:
+                if not line.strip():
+                    continue
+                response = server.answer(line.decode())
+                self.wfile.write((json.dumps(response) + "\n").encode())
+                self.wfile.flush()
+
+    if os.path.exists(path):
+        os.remove(path)
+    with socketserver.ThreadingUnixStreamServer(path, Handler) as unix_server:
+        unix_server.daemon_threads = True
+        try:
+            unix_server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            os.remove(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Answers path queries (JSON lines) with preloaded movingai maps")
+    parser.add_argument("maps", nargs="+", metavar="map", help="movingai map files as path or id=path, by default the id is the file name without .map")
+    parser.add_argument("-s", "--socket", action="store", dest="socket", default=None, help="path of a Unix socket to listen on, by default queries are read from stdin")
+    parser.add_argument("-j", "--jobs", action="store", dest="jobs", type=int, default=None, help="number of worker processes, by default the number of cores, 1 answers in the server process")
+    parser.add_argument("--chunk-size", action="store", dest="chunk_size", type=int, default=1, help="number of stdin queries sent to a worker at once")
+    parser.add_argument("--cache-size", action="store", dest="cache_size", type=int, default=0, help="number of results kept in the LRU cache of every process (the same and reversed queries are answered from it), by default there is no cache")
+
+    args = parser.parse_args()
+    # SIGTERM stops the server as Ctrl+C does
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    map_paths = dict(parse_map_argument(argument) for argument in args.maps)
+    server = PathServer(map_paths, args.jobs, args.cache_size)
+    try:
+        if args.socket is None:
+            serve_stdin(server, args.chunk_size)
+        else:
+            print(f"Listening on {args.socket}, maps: {', '.join(map_paths)}", file=sys.stderr)
+            serve_unix_socket(server, args.socket)
+    finally:
+        server.close()
+        print(server.summary(), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from multiprocessing import Pool
+
+from algorithms.anya import anya
+from algorithms.apthetastar import apthetastar
+from algorithms.astar2k import astar2k
+from algorithms.bidirectional import bidirectional_astar2k, bidirectional_thetastar
+from algorithms.jps import jps
+from algorithms.lazythetastar import lazythetastar
+from algorithms.structures import AnyaMap, corner_successors_path
+from algorithms.thetastar import thetastar
+from algorithms.visibility_graph import VisibilityGraph, visibility_graph_search, visibility_graph_path
+from test.movingai_util import read_map_from_movingai_file, read_tasks_from_movingai_file
+from util.functions import euclidian_distance, make_path
+from util.stats import SearchStats
+
+ALGORITHMS = {
+    "astar2k": astar2k,
+    "thetastar": thetastar,
+    "lazythetastar": lazythetastar,
+    "apthetastar": apthetastar,
+    "jps": jps,
+    "bidirectional_astar2k": bidirectional_astar2k,
+    "bidirectional_thetastar": bidirectional_thetastar,
+    "anya": anya,
+    "visibility_graph": visibility_graph_search,
+}
+
+RESULT_FIELDS = ["map", "task", "algorithm", "k", "start_i", "start_j", "goal_i", "goal_j",
+                 "found", "length", "optimal_length", "expansions", "nodes_created", "time"]
+# Added with --stats
+STATS_FIELDS = [field for field in SearchStats().as_dict().keys() if field not in RESULT_FIELDS]
+
+# Maps loaded by this process, so every worker reads a map only once
+_loaded_maps = {}
+
+
+def scenario_pair(path):
+    '''
+    Returns (map path, .scen path) for a path to any of these two files (X.map and X.map.scen).
+    '''
+    if path.endswith(".scen"):
+        return path[:-len(".scen")], path
+    return path, path + ".scen"
+
+
+def _get_map(map_path):
+    task_map = _loaded_maps.get(map_path)
+    if task_map is None:
+        task_map = read_map_from_movingai_file(map_path, AnyaMap)
+        _loaded_maps[map_path] = task_map
+    return task_map
+
+
+def run_search(task_map, algorithm, k, si, sj, gi, gj, stats=None):
+    # ANYA and the visibility graph ignore k, JPS works only with k = 3
+    if algorithm == "anya":
+        return anya(task_map, si, sj, gi, gj, euclidian_distance, stats=stats)
+    if algorithm == "visibility_graph":
+        return visibility_graph_search(task_map, si, sj, gi, gj, euclidian_distance, stats=stats)
+    if algorithm == "jps":
+        return jps(task_map, si, sj, gi, gj, euclidian_distance, stats=stats)
+    return ALGORITHMS[algorithm](task_map, si, sj, gi, gj, euclidian_distance, k=k, stats=stats)
+
+
+def run_task(task_map, algorithm, k, task, stats=None):
+    '''
+    Runs one algorithm on one task (start_i, start_j, goal_i, goal_j, optimal length) and returns
+    the found flag, path length (None if the path is not found), expansions, created nodes and wall time.
+    '''
+    si, sj, gi, gj, _ = task
+    start_time = time.perf_counter()
+    result = run_search(task_map, algorithm, k, si, sj, gi, gj, stats)
+    elapsed = time.perf_counter() - start_time
+    length = make_path(result[1])[1] if result[0] else None
+    return result[0], length, result[2], result[3], elapsed
+
+
+def run_chunk(chunk):
+    '''
+    Worker function: runs all the algorithms on a slice of tasks of one map.
+    '''
+    map_path, runs, tasks, with_stats = chunk
+    task_map = _get_map(map_path)
+    if any(algorithm == "visibility_graph" for algorithm, _ in runs):
+        # The graph is read (or built) before the tasks, so its building time isn't counted in the first task
+        VisibilityGraph.for_map(task_map, visibility_graph_path(map_path))
+    if any(algorithm == "anya" for algorithm, _ in runs):
+        task_map.precompute_corner_successors(corner_successors_path(map_path))
+    rows = []
+    for task_index, task in tasks:
+        for algorithm, k in runs:
+            stats = SearchStats() if with_stats else None
+            found, length, expansions, nodes_created, elapsed = run_task(task_map, algorithm, k, task, stats)
+            rows.append({
+                "map": os.path.basename(map_path),
+                "task": task_index,
+                "algorithm": algorithm,
+                "k": k,
+                "start_i": task[0],
+                "start_j": task[1],
+                "goal_i": task[2],
+                "goal_j": task[3],
+                "found": found,
+                "length": length,
+                "optimal_length": task[4],
+                "expansions": expansions,
+                "nodes_created": nodes_created,
+                "time": elapsed,
+            })
+            if stats is not None:
+                stats_dict = stats.as_dict()
+                rows[-1].update((field, stats_dict[field]) for field in STATS_FIELDS)
+    return rows
+
+
+def make_chunks(paths, runs, chunk_size=16, step=1, limit=None, with_stats=False):
+    '''
+    Splits tasks of the scenarios into chunks of at most chunk_size tasks. Every step-th task
+    is taken (at most limit tasks per scenario), task index is the number of the task in the .scen file.
+    '''
+    chunks = []
+    for path in paths:
+        map_path, scen_path = scenario_pair(path)
+        tasks = list(enumerate(read_tasks_from_movingai_file(scen_path)))[::step][:limit]
+        for begin in range(0, len(tasks), chunk_size):
+            chunks.append((map_path, runs, tasks[begin:begin + chunk_size], with_stats))
+    return chunks
+
+
+def run_scenarios(paths, runs, jobs=None, chunk_size=16, step=1, limit=None, with_stats=False):
+    '''
+    Runs every (algorithm, k) from runs on the tasks of the scenarios with a pool of jobs processes
+    (all the cores by default, 1 runs in this process) and yields result rows as soon as they are ready,
+    so rows of different chunks come in arbitrary order. With with_stats rows also contain SearchStats counters.
+    '''
+    chunks = make_chunks(paths, runs, chunk_size, step, limit, with_stats)
+    # Builds missing binary map files (and visibility graph and ANYA corner files) before the start, so workers don't parse the same map simultaneously
+    for map_path in {chunk[0] for chunk in chunks}:
+        task_map = read_map_from_movingai_file(map_path, AnyaMap)
+        if any(algorithm == "visibility_graph" for algorithm, _ in runs):
+            VisibilityGraph.for_map(task_map, visibility_graph_path(map_path))
+        if any(algorithm == "anya" for algorithm, _ in runs):
+            task_map.precompute_corner_successors(corner_successors_path(map_path))
+    if jobs == 1:
+        for chunk in chunks:
+            yield from run_chunk(chunk)
+        return
+    with Pool(jobs) as pool:
+        for rows in pool.imap_unordered(run_chunk, chunks):
+            yield from rows
+
+
+def write_results(rows, output, output_format, with_stats=False):
+    if output_format == "csv":
+        writer = csv.DictWriter(output, fieldnames=RESULT_FIELDS + (STATS_FIELDS if with_stats else []))
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(row)
+            output.flush()
+    else:
+        for row in rows:
+            output.write(json.dumps(row) + "\n")
+            output.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Runs path finding algorithms on movingai scenarios in parallel")
+    parser.add_argument("scenarios", nargs="+", metavar="file", help="movingai maps or .scen files, the scenario of X.map is X.map.scen")
+    parser.add_argument("-a", "--algorithm", action="append", dest="algorithms", choices=ALGORITHMS.keys(), help="algorithm to run, can be repeated, by default all of them except visibility_graph (its graph is built in quadratic time of the number of corners)")
+    parser.add_argument("-k", action="append", dest="k", type=int, metavar="k", help="sets 2^k as the limit of possible directions of moves for 2^k A* and Theta* variants (AP Theta* takes only k <= 3), can be repeated, by default 2")
+    parser.add_argument("-j", "--jobs", action="store", dest="jobs", type=int, default=None, help="number of worker processes, by default the number of cores")
+    parser.add_argument("-o", "--output", action="store", dest="output", default=None, help="output file, .csv or .jsonl, by default JSON Lines to stdout")
+    parser.add_argument("--format", action="store", dest="format", choices=["csv", "jsonl"], default=None, help="output format, by default it's chosen by the output file extension")
+    parser.add_argument("--step", action="store", dest="step", type=int, default=1, help="run every step-th task of a scenario")
+    parser.add_argument("--limit", action="store", dest="limit", type=int, default=None, help="maximum number of tasks per scenario")
+    parser.add_argument("--chunk-size", action="store", dest="chunk_size", type=int, default=16, help="number of tasks sent to a worker at once")
+    parser.add_argument("--stats", action="store_true", dest="stats", default=False, help="adds search counters and timings (see util.stats) to the results")
+
+    args = parser.parse_args()
+    # Graphs of maps with tens of thousands of corners take hours to build, so the visibility graph runs only on request
+    algorithms = args.algorithms or [algorithm for algorithm in ALGORITHMS if algorithm != "visibility_graph"]
+    ks = args.k or [2]
+    runs = []
+    for algorithm in algorithms:
+        if algorithm in ("anya", "visibility_graph"):
+            # ANYA and the visibility graph ignore k
+            runs.append((algorithm, None))
+        elif algorithm == "jps":
+            runs.append((algorithm, 3))
+        elif algorithm == "apthetastar":
+            runs.extend((algorithm, k) for k in ks if k <= 3)
+        else:
+            runs.extend((algorithm, k) for k in ks)
+
+    output_format = args.format
+    if output_format is None:
+        output_format = "csv" if args.output is not None and args.output.endswith(".csv") else "jsonl"
+
+    rows = run_scenarios(args.scenarios, runs, args.jobs, args.chunk_size, args.step, args.limit, args.stats)
+    if args.output is None:
+        write_results(rows, sys.stdout, output_format, args.stats)
+    else:
+        with open(args.output, "w", newline="") as output:
+            write_results(rows, output, output_format, args.stats)
+
+
+if __name__ == "__main__":
+    main()
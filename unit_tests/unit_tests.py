@@ -1,12 +1,32 @@
+import os
 import random
+import tempfile
 from fractions import Fraction
 
 import numpy as np
-from PIL import Image, ImageDraw
-from matplotlib import pyplot as plt
 
 from util.functions import compute_cost
-from algorithms.structures import Map, AnyaNode, AnyaMap
+from algorithms.structures import Map, Node, AnyaNode, AnyaMap, get_moves
+from draw.draw import draw_neighbors_anya
+from util.containers import Closed, OpenHeap, OpenLazyHeap, ArrayClosed, ArrayClosedAnya
+from util.stats import SearchStats
+from util.functions import euclidian_distance, make_path
+from algorithms.astar2k import astar2k
+from algorithms.thetastar import thetastar
+from algorithms.lazythetastar import lazythetastar
+from algorithms.apthetastar import apthetastar
+from algorithms.jps import jps
+from algorithms.bidirectional import bidirectional_astar2k, bidirectional_thetastar
+from algorithms.anytime import weighted_astar2k, anytime_astar2k, anytime_thetastar, anytime_anya
+from algorithms.anya import anya
+from algorithms.dstarlite import DStarLite
+from algorithms.landmarks import Landmarks, distance_table
+from algorithms.visibility_graph import VisibilityGraph, visibility_graph_search
+from test.movingai_util import read_map_from_movingai_file, binary_map_path
+from test.scenario_runner import run_scenarios
+from test.path_server import PathServer
+from util.path_cache import PathCache
+from test.benchmark import compare, benchmark_startup
 
 
 def test_get_neighbors():
@@ -48,6 +68,31 @@ def test_get_neighbors():
     print("test_get_neighbors: OK")
 
 
+def test_move_masks():
+    # One obstacle (1, 1): points far from it get all the moves, (1, 1) can't cross it, (0, 0) is in the corner
+    test_map = Map()
+    test_map.set_grid_cells(7, 7, [[int((i, j) == (1, 1)) for j in range(7)] for i in range(7)])
+    test_map.precompute_move_masks(3)
+    masks = test_map.get_move_masks(3)
+    assert masks[5 * 8 + 5] == 0b11111111 and masks[1 * 8 + 1] == 0b11111101 and masks[0] == 0b111
+    assert test_map.get_neighbors(Node(1, 1), 3) == [(1, 2), (2, 1), (2, 0), (1, 0), (0, 0), (0, 1), (0, 2)]
+    # A new obstacle resets the masks around it
+    test_map.set_obstacle(4, 4)
+    assert masks[5 * 8 + 5] is None and (4, 4) not in test_map.get_neighbors(Node(5, 5), 3)
+    for rnd, test_map, _ in _random_maps(31, 100, max_size=16, densities=(0.05, 0.3), map_type=Map):
+        k = rnd.choice([2, 3, 4, 5])
+        if rnd.random() < 0.5:
+            test_map.precompute_move_masks(k)
+        for _ in range(20):
+            i, j = _random_point(rnd, test_map)
+            # The same moves as checking every one of them
+            expected = [(i + di, j + dj) for (di, dj) in get_moves(k)
+                        if test_map.in_bounds(i + di, j + dj) and test_map.traversable_step(i, j, i + di, j + dj)]
+            assert test_map.get_neighbors(Node(i, j), k) == expected
+            test_map.set_obstacle(*_random_cell(rnd, test_map), rnd.random() < 0.3)
+    print("test_move_masks: OK")
+
+
 def test_compute_cost(eps=1e-6):
     tests = [(0, 0, 1, 1, np.sqrt(2)),
              (1, 1, 0, 0, np.sqrt(2)),
@@ -60,40 +105,806 @@ def test_compute_cost(eps=1e-6):
     print("test_compute_cost: OK")
 
 
-def draw_neighbors_anya(grid_map: AnyaMap, node: AnyaNode):
-    assert node is not None
-    height, width = grid_map.get_size()
-    k = 2048 // max(height, width)
-    h_im = height * k
-    w_im = width * k
-    im = Image.new('RGB', (w_im, h_im), color='white')
-    draw = ImageDraw.Draw(im)
+def test_padded_grid():
+    map_str = '''
+. # .
+. . #
+'''
+    test_map = Map()
+    test_map.read_from_string(map_str, 3, 2)
+    other_map = Map()
+    other_map.set_grid_cells(3, 2, [[0, 1, 0], [0, 0, 1]])
+    for i in range(-3, 5):
+        for j in range(-3, 6):
+            assert test_map.is_obstacle(i, j) == other_map.is_obstacle(i, j)
+            if not (0 <= i < 2 and 0 <= j < 3):
+                assert test_map.is_obstacle(i, j)
+    assert test_map.is_obstacle(0, 1) and test_map.is_obstacle(1, 2) and not test_map.is_obstacle(1, 1)
+    assert test_map.is_obstacle(Fraction(1, 2), Fraction(3, 2))
+    assert test_map.get_size() == (2, 3)
+    assert test_map.as_array().shape == (4, 5)
+    print("test_padded_grid: OK")
 
-    for i in range(height):
-        for j in range(width):
-            if (not grid_map.traversable(i, j)):
-                draw.rectangle((j * k, i * k, (j + 1) * k - 1, (i + 1) * k - 1), fill=(70, 80, 80))
 
-    if node.aj is None:
-        neighbors = grid_map.get_start_neighbors(node.i, node.j)
-    else:
-        neighbors = grid_map.get_neighbors_by_node(node)
-        draw.line((node.aj * k, node.ai * k, node.bj * k, node.bi * k), fill=(0, 255, 0), width=5)
+def test_binary_map_cache():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "test.map")
+        with open(path, 'wt') as map_file:
+            map_file.write("type octile\nheight 2\nwidth 3\nmap\n.@.\n..T\n")
+        text_map = read_map_from_movingai_file(path, use_binary_cache=False)
+        first_map = read_map_from_movingai_file(path, AnyaMap)
+        assert os.path.exists(binary_map_path(path))
+        cached_map = read_map_from_movingai_file(path, AnyaMap)
+        assert type(cached_map) is AnyaMap and cached_map.get_size() == (2, 3)
+        for i in range(-1, 3):
+            for j in range(-1, 4):
+                assert text_map.is_obstacle(i, j) == first_map.is_obstacle(i, j) == cached_map.is_obstacle(i, j)
+
+        # Changed source file must invalidate the binary file
+        with open(path, 'wt') as map_file:
+            map_file.write("type octile\nheight 2\nwidth 3\nmap\n...\n...\n")
+        os.utime(path, ns=(0, 0))
+        changed_map = read_map_from_movingai_file(path)
+        assert not changed_map.is_obstacle(0, 1) and not changed_map.is_obstacle(1, 2)
+    print("test_binary_map_cache: OK")
+
+
+def test_scenario_runner():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "test.map")
+        with open(path, 'wt') as map_file:
+            map_file.write("type octile\nheight 3\nwidth 3\nmap\n...\n.@.\n...\n")
+        with open(path + ".scen", 'wt') as scen_file:
+            scen_file.write("version 1\n0\ttest.map\t3\t3\t0\t0\t0\t3\t3\n0\ttest.map\t3\t3\t0\t0\t2\t0\t2\n")
+        runs = [("astar2k", 2), ("thetastar", 2), ("anya", None)]
+        rows = list(run_scenarios([path], runs, jobs=1))
+        assert len(rows) == 6
+        for row in rows:
+            assert row["found"] and row["map"] == "test.map"
+            assert abs(row["length"] - row["optimal_length"]) < 1e-6 or row["algorithm"] != "anya"
+        assert {(row["task"], row["algorithm"]) for row in rows} == {(t, a) for t in range(2) for a, _ in runs}
+    print("test_scenario_runner: OK")
+
+
+def test_path_server():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "test.map")
+        with open(path, 'wt') as map_file:
+            map_file.write("type octile\nheight 3\nwidth 3\nmap\n...\n.@.\n...\n")
+        server = PathServer({"test": path}, jobs=1)
+        lines = ['{"id": 1, "map": "test", "start": [0, 0], "goal": [3, 0]}',
+                 '{"id": 2, "map": "test", "algorithm": "thetastar", "k": 3, "start": [0, 0], "goal": [0, 2]}',
+                 '{"id": 3, "map": "other", "start": [0, 0], "goal": [0, 2]}',
+                 'not a json']
+        responses = list(server.answer_stream(lines))
+        # Unsupported k and not integer coordinates are errors, the next query is answered
+        bad_lines = ['{"map": "test", "algorithm": "astar2k", "k": %s, "start": [0, 0], "goal": [3, 0]}' % k
+                     for k in ("1", "0", "1000", "2.5", "true")]
+        bad_lines += ['{"map": "test", "algorithm": "apthetastar", "k": 4, "start": [0, 0], "goal": [3, 0]}',
+                      '{"map": "test", "start": [true, 1], "goal": [3, 0]}',
+                      '{"map": "test", "start": [0.5, 1], "goal": [3, 0]}', lines[0]]
+        bad_responses = list(server.answer_stream(bad_lines))
+        server.close()
+        cached_server = PathServer({"test": path}, jobs=1, cache_size=16)
+        cached_responses = list(cached_server.answer_stream(lines[:1] + ['{"map": "test", "start": [3, 0], "goal": [0, 0]}']))
+        cached_server.close()
+    assert [response.get("id") for response in responses] == [1, 2, 3, None]
+    assert responses[0]["found"] and responses[0]["path"] == [[0, 0], [3, 0]] and responses[0]["length"] == 3
+    assert responses[1]["found"] and responses[1]["length"] == 2
+    assert "error" in responses[2] and "error" in responses[3]
+    assert all(response["latency"] >= 0 for response in responses)
+    assert all("error" in response for response in bad_responses[:-1]) and bad_responses[-1]["found"]
+    assert server.count == 4 + len(bad_lines)
+    assert [response["cached"] for response in cached_responses] == [False, True] and cached_server.cache_hits == 1
+    assert cached_responses[1]["path"] == [[3, 0], [0, 0]] and cached_responses[1]["expansions"] == 0
+    print("test_path_server: OK")
+
+
+def test_path_cache():
+    map_str = '''
+. . . . . .
+. # # # . .
+. . . # . .
+. . . . . .
+'''
+    test_map = AnyaMap()
+    test_map.read_from_string(map_str, 6, 4)
+    cache = PathCache(max_entries=2)
+    cached_anya = cache.wrap(anya, reversible=True)
+    expected = anya(test_map, 0, 0, 4, 6, euclidian_distance)
+    first = cached_anya(test_map, 0, 0, 4, 6, euclidian_distance)
+    again = cached_anya(test_map, 0, 0, 4, 6, euclidian_distance)
+    reversed_query = cached_anya(test_map, 4, 6, 0, 0, euclidian_distance)
+    assert first[2] > 0 and again[2] == 0 and reversed_query[2] == 0
+    assert first[1].g == again[1].g == reversed_query[1].g == expected[1].g
+    assert [(node.i, node.j) for node in make_path(reversed_query[1])[0]] == [(node.i, node.j) for node in make_path(first[1])[0]][::-1]
+    assert cache.as_dict()["hits"] == 2 and cache.reversed_hits == 1 and cache.misses == 1
+
+    # Theta* isn't reversible, k is a part of the key
+    cached_theta = cache.wrap(thetastar)
+    cached_theta(test_map, 0, 0, 4, 6, euclidian_distance, k=2)
+    cached_theta(test_map, 4, 6, 0, 0, euclidian_distance, k=2)
+    cached_theta(test_map, 0, 0, 4, 6, euclidian_distance, k=3)
+    assert cache.misses == 4 and len(cache) == 2 and cache.evictions == 2
+
+    # A new grid drops the entries of the old one
+    cached_theta(test_map, 0, 0, 4, 6, euclidian_distance, k=3)
+    assert cache.hits == 3
+    test_map.read_from_string(map_str.replace("# # #", ". . ."), 6, 4)
+    result = cached_theta(test_map, 0, 0, 4, 6, euclidian_distance, k=3)
+    assert result[2] > 0 and cache.invalidations == 2 and len(cache) == 1
+
+    size_cache = PathCache(max_points=4)
+    size_cache.put(test_map, "anya", None, 0, 0, 0, 3, True, [(0, 0), (0, 3)], 3)
+    size_cache.put(test_map, "anya", None, 0, 0, 3, 0, True, [(0, 0), (3, 0)], 3)
+    size_cache.put(test_map, "anya", None, 0, 0, 3, 3, True, [(0, 0), (3, 3)], 3 * 2 ** 0.5)
+    assert len(size_cache) == 2 and size_cache.get(test_map, "anya", None, 0, 0, 0, 3) is None
+
+    # Positional arguments and the heuristic are a part of the key, defaults are the same as omitted arguments
+    key_cache = PathCache()
+    cached_astar = key_cache.wrap(astar2k)
+    test_map = Map()
+    test_map.set_grid_cells(7, 3, [[0] * 7 for _ in range(3)])
+    assert cached_astar(test_map, 0, 0, 3, 7, euclidian_distance, OpenHeap, Closed, 2)[1].g == 10
+    result = cached_astar(test_map, 0, 0, 3, 7, euclidian_distance, OpenHeap, Closed, 4)
+    assert result[2] > 0 and abs(result[1].g - astar2k(test_map, 0, 0, 3, 7, euclidian_distance, k=4)[1].g) < 1e-9
+    assert cached_astar(test_map, 0, 0, 3, 7, lambda i1, j1, i2, j2: 0, OpenHeap, Closed, 2)[2] > 0
+    assert cached_astar(test_map, 0, 0, 3, 7, euclidian_distance, open_type=OpenHeap, k=2)[2] == 0
+    print("test_path_cache: OK")
+
+
+def test_search_stats():
+    map_str = '''
+. . . . . .
+. # # # . .
+. . . # . .
+. . . . . .
+'''
+    test_map = AnyaMap()
+    test_map.read_from_string(map_str, 6, 4)
+    for search in (astar2k, thetastar, anya):
+        expanded = []
+        stats = SearchStats(on_expand=expanded.append)
+        result = search(test_map, 0, 0, 4, 6, euclidian_distance, stats=stats)
+        plain = search(test_map, 0, 0, 4, 6, euclidian_distance)
+        # Stats don't change the search
+        assert result[0] and plain[0] and result[1].g == plain[1].g and result[2:4] == plain[2:4]
+        assert stats.expansions == len(expanded) > 0
+        assert stats.pushes == stats.generated - stats.pruned and stats.duplicates == stats.pruned + stats.merged
+        assert stats.pops <= stats.pushes and 0 < stats.peak_open <= stats.pushes
+        # ANYA checks only the segment from the start to the goal
+        assert stats.los_calls > 1 if search is thetastar else stats.los_calls == (search is anya)
+    # Only the cells looked up are counted: the check of the diagonal stops at the blocked first cell
+    for blocked, cells in ((False, 16), (True, 1)):
+        test_map = Map()
+        test_map.set_grid_cells(6, 6, [[int(blocked and (i, j) == (0, 0)) for j in range(6)] for i in range(6)])
+        stats = SearchStats()
+        instrumented_map = stats.instrument(test_map, OpenHeap)[0]
+        assert instrumented_map.traversable_step_long(0, 0, 6, 6) != blocked
+        assert stats.los_calls == 1 and stats.los_cells == cells
+    print("test_search_stats: OK")
+
+
+def test_lazy_thetastar():
+    map_str = '''
+. . . . . . . .
+. # # # . . # .
+. . . # . . # .
+. . . # . . . .
+. # . . . # # .
+'''
+    test_map = AnyaMap()
+    test_map.read_from_string(map_str, 8, 5)
+    for (si, sj, gi, gj) in [(0, 0, 5, 8), (5, 0, 0, 8), (3, 0, 2, 5), (0, 4, 5, 4)]:
+        theta_stats = SearchStats()
+        lazy_stats = SearchStats()
+        theta = thetastar(test_map, si, sj, gi, gj, euclidian_distance, stats=theta_stats)
+        lazy = lazythetastar(test_map, si, sj, gi, gj, euclidian_distance, stats=lazy_stats)
+        assert theta[0] and lazy[0]
+        # Lazy edges are checked on expansion, so the path is valid
+        current = lazy[1]
+        while current.parent is not None:
+            assert test_map.traversable_step_long(current.parent.i, current.parent.j, current.i, current.j)
+            assert abs(current.g - current.parent.g - compute_cost(current.parent.i, current.parent.j, current.i, current.j)) < 1e-9
+            current = current.parent
+        assert (current.i, current.j) == (si, sj)
+        assert lazy_stats.los_calls <= theta_stats.los_calls
+        assert euclidian_distance(si, sj, gi, gj) <= lazy[1].g <= theta[1].g * 1.1
+    print("test_lazy_thetastar: OK")
+
+
+def test_apthetastar():
+    random.seed(13)
+    for _ in range(200):
+        height, width = random.randint(2, 12), random.randint(2, 12)
+        test_map = Map()
+        test_map.set_grid_cells(width, height, [[int(random.random() < 0.25) for _ in range(width)] for _ in range(height)])
+        si, sj, gi, gj = random.randint(0, height), random.randint(0, width), random.randint(0, height), random.randint(0, width)
+        k = random.choice([2, 3])
+        stats = SearchStats()
+        result = apthetastar(test_map, si, sj, gi, gj, euclidian_distance, k=k, stats=stats)
+        assert result[0] == astar2k(test_map, si, sj, gi, gj, euclidian_distance, k=k)[0]
+        # No line of sight checks, but every edge of the path is traversable
+        assert stats.los_calls == 0
+        current = result[1]
+        while result[0] and current.parent is not None:
+            assert test_map.traversable_step_long(current.parent.i, current.parent.j, current.i, current.j)
+            current = current.parent
+    # Open map: the path is a straight line
+    test_map = Map()
+    test_map.set_grid_cells(8, 5, [[0] * 8 for _ in range(5)])
+    result = apthetastar(test_map, 0, 0, 5, 8, euclidian_distance)
+    assert result[1].parent.i == 0 and result[1].parent.j == 0
+    print("test_apthetastar: OK")
+
+
+def test_jps():
+    random.seed(239)
+    for _ in range(300):
+        height, width = random.randint(1, 15), random.randint(1, 15)
+        density = random.choice([0.1, 0.3, 0.45])
+        test_map = Map()
+        test_map.set_grid_cells(width, height, [[int(random.random() < density) for _ in range(width)] for _ in range(height)])
+        masks = test_map.get_window_masks()
+        i, j = random.randint(0, height), random.randint(0, width)
+        assert all(((masks[i][j] >> (4 * (oi + 2) + oj + 2)) & 1) == test_map.is_obstacle(i + oi, j + oj)
+                   for oi in range(-2, 2) for oj in range(-2, 2))
+
+        si, sj, gi, gj = random.randint(0, height), random.randint(0, width), random.randint(0, height), random.randint(0, width)
+        expected = astar2k(test_map, si, sj, gi, gj, euclidian_distance, k=3)
+        expanded = []
+        stats = SearchStats(on_expand=expanded.append)
+        result = jps(test_map, si, sj, gi, gj, euclidian_distance, stats=stats)
+        # Same optimal length as 8-connected A*
+        assert result[0] == expected[0] and (not result[0] or abs(result[1].g - expected[1].g) < 1e-9)
+        assert stats.expansions == len(expanded)
+    print("test_jps: OK")
+
+
+def test_bidirectional():
+    random.seed(42)
+    for _ in range(300):
+        height, width = random.randint(1, 15), random.randint(1, 15)
+        test_map = AnyaMap()
+        test_map.set_grid_cells(width, height, [[int(random.random() < 0.3) for _ in range(width)] for _ in range(height)])
+        si, sj, gi, gj = random.randint(0, height), random.randint(0, width), random.randint(0, height), random.randint(0, width)
+        k = random.choice([2, 3, 4])
+        expected = astar2k(test_map, si, sj, gi, gj, euclidian_distance, open_type=OpenHeap, k=k)
+        result = bidirectional_astar2k(test_map, si, sj, gi, gj, euclidian_distance, open_type=OpenHeap, k=k)
+        theta = bidirectional_thetastar(test_map, si, sj, gi, gj, euclidian_distance, open_type=OpenHeap, k=k)
+        assert result[0] == theta[0] == expected[0]
+        if not result[0]:
+            continue
+        # Optimal as one-directional search, joined paths go from the start to the goal
+        assert abs(result[1].g - expected[1].g) < 1e-9
+        for goal in (result[1], theta[1]):
+            current = goal
+            while current.parent is not None:
+                assert test_map.traversable_step_long(current.parent.i, current.parent.j, current.i, current.j)
+                current = current.parent
+            assert (current.i, current.j, goal.i, goal.j) == (si, sj, gi, gj)
+    print("test_bidirectional: OK")
+
+
+def test_visibility_graph():
+    random.seed(7)
+    for _ in range(200):
+        height, width = random.randint(1, 12), random.randint(1, 12)
+        test_map = AnyaMap()
+        test_map.set_grid_cells(width, height, [[int(random.random() < 0.3) for _ in range(width)] for _ in range(height)])
+        si, sj, gi, gj = random.randint(0, height), random.randint(0, width), random.randint(0, height), random.randint(0, width)
+        if (si, sj) == (gi, gj):
+            continue
+        expected = anya(test_map, si, sj, gi, gj, euclidian_distance)
+        result = visibility_graph_search(test_map, si, sj, gi, gj, euclidian_distance)
+        assert result[0] == expected[0]
+        if result[0]:
+            # Optimal as ANYA
+            assert abs(result[1].g - expected[1].g) < 1e-9
+
+    test_map = AnyaMap()
+    test_map.set_grid_cells(6, 5, [[0, 0, 0, 0, 0, 0], [0, 1, 1, 0, 0, 0], [0, 0, 0, 0, 1, 0], [0, 1, 0, 0, 0, 0], [0, 0, 0, 0, 0, 0]])
+    graph = VisibilityGraph.build(test_map)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "test.map.vg")
+        graph.save(path)
+        loaded = VisibilityGraph.load(path, test_map)
+        assert (loaded.vertices, loaded.offsets, loaded.targets) == (graph.vertices, graph.offsets, graph.targets)
+        # A graph of another map isn't loaded
+        other_map = AnyaMap()
+        other_map.set_grid_cells(6, 5, [[0] * 6 for _ in range(5)])
+        assert VisibilityGraph.load(path, other_map) is None
+        with open(path, "r+b") as graph_file:
+            graph_file.truncate(os.path.getsize(path) - 1)
+        assert VisibilityGraph.load(path) is None
+    print("test_visibility_graph: OK")
+
+
+def test_landmarks():
+    random.seed(11)
+    for _ in range(100):
+        height, width = random.randint(1, 15), random.randint(1, 15)
+        test_map = AnyaMap()
+        test_map.set_grid_cells(width, height, [[int(random.random() < 0.3) for _ in range(width)] for _ in range(height)])
+        landmarks = Landmarks.build(test_map, count=4, k=3)
+        heuristic = landmarks.heuristic()
+        for _ in range(5):
+            si, sj, gi, gj = random.randint(0, height), random.randint(0, width), random.randint(0, height), random.randint(0, width)
+            k = random.choice([2, 3])
+            expected = astar2k(test_map, si, sj, gi, gj, euclidian_distance, open_type=OpenHeap, k=k)
+            result = astar2k(test_map, si, sj, gi, gj, heuristic, open_type=OpenHeap, k=k)
+            assert result[0] == expected[0]
+            if result[0]:
+                # Admissible and consistent for k <= 3: the same lengths
+                assert abs(result[1].g - expected[1].g) < 1e-9
+                assert heuristic(si, sj, gi, gj) <= expected[1].g + 1e-9
+        # Distances of the tables are the lengths of astar2k paths from the landmark
+        for (i, j), table in zip(landmarks.points, landmarks.tables):
+            gi, gj = random.randint(0, height), random.randint(0, width)
+            expected = astar2k(test_map, i, j, gi, gj, euclidian_distance, open_type=OpenHeap, k=3)
+            assert table[gi * (width + 1) + gj] <= (expected[1].g + 1e-9 if expected[0] else float("inf"))
+    # Searches with more directions need tables of the same k (see path-finder -L)
+    for rnd, test_map, _ in _random_maps(19, 30, max_size=16, densities=(0.1,)):
+        heuristic = Landmarks.build(test_map, count=4, k=4).heuristic()
+        for _ in range(5):
+            (si, sj), (gi, gj) = _random_point(rnd, test_map), _random_point(rnd, test_map)
+            expected = astar2k(test_map, si, sj, gi, gj, euclidian_distance, open_type=OpenHeap, k=4)
+            result = astar2k(test_map, si, sj, gi, gj, heuristic, open_type=OpenHeap, k=4)
+            assert result[0] == expected[0] and (not result[0] or abs(result[1].g - expected[1].g) < 1e-9)
+
+    test_map = AnyaMap()
+    test_map.set_grid_cells(6, 5, [[0, 0, 0, 0, 0, 0], [0, 1, 1, 0, 0, 0], [0, 0, 0, 0, 1, 0], [0, 1, 0, 0, 0, 0], [0, 0, 0, 0, 0, 0]])
+    assert distance_table(test_map, 0, 0)[0] == 0
+    landmarks = Landmarks.build(test_map, count=3)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "test.map.alt")
+        landmarks.save(path)
+        loaded = Landmarks.load(path, test_map)
+        assert loaded.points == landmarks.points and loaded.tables == landmarks.tables
+        assert Landmarks.load(path, test_map, k=4) is None
+        assert landmarks.as_array().shape == (3, 6, 7)
+    print("test_landmarks: OK")
+
+
+def _random_maps(seed, count, max_size=10, densities=(0.3,), map_type=AnyaMap):
+    '''
+    Yields count maps of random sizes up to max_size with random obstacles (the density is chosen from densities
+    for every map) as (generator, map, cells), the test takes next random values from the same generator.
+    '''
+    rnd = random.Random(seed)
+    for _ in range(count):
+        height, width = rnd.randint(1, max_size), rnd.randint(1, max_size)
+        density = rnd.choice(densities)
+        cells = [[int(rnd.random() < density) for _ in range(width)] for _ in range(height)]
+        test_map = map_type()
+        test_map.set_grid_cells(width, height, [row[:] for row in cells])
+        yield rnd, test_map, cells
+
+
+def _random_point(rnd, test_map):
+    height, width = test_map.get_size()
+    return rnd.randint(0, height), rnd.randint(0, width)
+
 
-    draw.ellipse((node.j * k - k / 4, node.i * k - k / 4, node.j * k + k / 4, node.i * k + k / 4), fill=(0, 255, 0), width=0)
+def _random_cell(rnd, test_map):
+    height, width = test_map.get_size()
+    return rnd.randrange(height), rnd.randrange(width)
 
 
-    for neighbor in neighbors:
-        color = (random.randint(0, 255), 0, random.randint(0, 255))
-        print(neighbor.i, neighbor.j, neighbor.ai, neighbor.aj, neighbor.bi, neighbor.bj)
-        draw.line((neighbor.aj * k, neighbor.ai * k, neighbor.bj * k, neighbor.bi * k), fill=color, width=5)
-        draw.ellipse((neighbor.j * k - 10, neighbor.i * k - 10, neighbor.j * k + 10, neighbor.i * k + 10), fill=color, width=0)
+def _check_path(test_map, goal, si, sj):
+    # Every segment of the path is visible and the path starts in (si, sj)
+    current = goal
+    while current.parent is not None:
+        assert test_map.line_of_sight(current.parent.i, current.parent.j, current.i, current.j)
+        current = current.parent
+    assert (current.i, current.j) == (si, sj)
 
-    _, ax = plt.subplots(dpi=150)
-    ax.axes.xaxis.set_visible(False)
-    ax.axes.yaxis.set_visible(False)
-    plt.imshow(np.asarray(im))
-    plt.show()
+
+def test_set_obstacle():
+    for rnd, test_map, cells in _random_maps(5, 100, max_size=9):
+        height, width = test_map.get_size()
+        # Indexes are built before the changes
+        test_map.get_window_masks()
+        test_map._build_changes_index()
+        anya(test_map, 0, 0, height, width, euclidian_distance)
+        graph = VisibilityGraph.for_map(test_map)
+        version = test_map.version
+        for _ in range(5):
+            (i, j), blocked = _random_cell(rnd, test_map), rnd.random() < 0.5
+            test_map.set_obstacle(i, j, blocked)
+            cells[i][j] = int(blocked)
+        expected = AnyaMap()
+        expected.set_grid_cells(width, height, cells)
+        expected._build_changes_index()
+        # Indexes are updated as if they were built for the new grid
+        assert bytes(test_map.get_padded_grid()) == bytes(expected.get_padded_grid())
+        assert test_map.get_window_masks() == expected.get_window_masks()
+        assert (test_map._changes, test_map._pair_changes) == (expected._changes, expected._pair_changes)
+        if test_map.version != version:
+            assert VisibilityGraph.for_map(test_map) is not graph
+    # Closing the door of the wall: the index of the row and the components are updated
+    test_map = AnyaMap()
+    test_map.read_from_string(DOOR_MAP, 7, 4)
+    test_map._build_changes_index()
+    assert test_map._changes[3] == [0, 7] and test_map.connected(0, 0, 0, 7)
+    version = test_map.version
+    test_map.set_obstacle(2, 3)
+    assert test_map.version != version and test_map._changes[3] == [0, 3, 4, 7]
+    assert not test_map.connected(0, 0, 0, 7) and not anya(test_map, 0, 0, 0, 7, euclidian_distance)[0]
+    # Setting the same value changes nothing
+    version = test_map.version
+    test_map.set_obstacle(2, 3)
+    assert test_map.version == version
+    print("test_set_obstacle: OK")
+
+
+# A wall with a door in row 2
+DOOR_MAP = '''
+. . . # . . .
+. . . # . . .
+. . . . . . .
+. . . # . . .
+'''
+
+
+def test_dstarlite():
+    for rnd, test_map, _ in _random_maps(13, 100, max_size=12):
+        (si, sj), (gi, gj) = _random_point(rnd, test_map), _random_point(rnd, test_map)
+        k = rnd.choice([2, 3, 4])
+        any_angle = rnd.random() < 0.3
+        planner = DStarLite(test_map, si, sj, gi, gj, euclidian_distance, k, any_angle)
+        for _ in range(5):
+            result = planner.plan()
+            expected = astar2k(test_map, si, sj, gi, gj, euclidian_distance, open_type=OpenHeap, k=k)
+            assert result[0] == expected[0]
+            if result[0]:
+                # The same lengths as of a new search, smoothed paths are not longer
+                assert result[1].g <= expected[1].g + 1e-9 and (any_angle or abs(result[1].g - expected[1].g) < 1e-9)
+                _check_path(test_map, result[1], si, sj)
+                # The agent makes a step along the path
+                path = make_path(result[1])[0]
+                if len(path) > 1:
+                    si, sj = path[1].i, path[1].j
+                    planner.move_start(si, sj)
+            planner.update_cells([_random_cell(rnd, test_map) + (rnd.random() < 0.4,) for _ in range(rnd.randint(1, 3))])
+    # The door is closed and opened again: the replanning repairs only a part of the search
+    test_map = AnyaMap()
+    test_map.read_from_string(DOOR_MAP, 7, 4)
+    planner = DStarLite(test_map, 0, 0, 0, 7, euclidian_distance, 2, False)
+    first = planner.plan()
+    assert first[0] and first[1].g == 11
+    planner.update_cells([(2, 3, True)])
+    assert not planner.plan()[0]
+    planner.update_cells([(2, 3, False)])
+    result = planner.plan()
+    assert result[0] and result[1].g == 11 and result[2] < first[2]
+    print("test_dstarlite: OK")
+
+
+def test_components():
+    for rnd, test_map, _ in _random_maps(17, 200, densities=(0.4,)):
+        (si, sj), (gi, gj) = _random_point(rnd, test_map), _random_point(rnd, test_map)
+        if (si, sj) == (gi, gj):
+            continue
+        connected = test_map.connected(si, sj, gi, gj)
+        assert connected == anya(test_map, si, sj, gi, gj, euclidian_distance)[0]
+        result = astar2k(test_map, si, sj, gi, gj, euclidian_distance, open_type=OpenHeap, k=3)
+        assert connected == result[0]
+        if not connected:
+            # Rejected without expansions
+            assert result[2] == 0
+    # ANYA rejects the goal before scanning rows for the start successors
+    test_map = AnyaMap()
+    test_map.set_grid_cells(5, 3, [[0, 0, 1, 0, 0]] * 3)
+    for search in (anya, anytime_anya):
+        assert not search(test_map, 0, 0, 3, 5, euclidian_distance)[0] and test_map._changes is None
+    # The goal is visible: the segment without a search
+    test_map = AnyaMap()
+    test_map.set_grid_cells(8, 5, [[0] * 8 for _ in range(5)])
+    for search in (thetastar, lazythetastar, anya, anytime_anya):
+        stats = SearchStats()
+        result = search(test_map, 0, 0, 5, 7, euclidian_distance, stats=stats)
+        assert result[0] and result[2] == 0 and abs(result[1].g - compute_cost(0, 0, 5, 7)) < 1e-9
+        assert (result[1].parent.i, result[1].parent.j) == (0, 0)
+        # The check of the segment is counted
+        assert stats.los_calls == 1 and stats.los_cells > 0 and stats.los_time > 0
+    # The segment from (3, 11) to (3, 6) goes through the diagonal intersection (3, 8), it isn't a shortcut
+    map_str = '''
+. . # . . . . . . . # .
+. # # . . . # . . . . .
+. . . . # # . . # . . .
+. . . . . . . # . . . .
+'''
+    test_map = AnyaMap()
+    test_map.read_from_string(map_str, 12, 4)
+    optimal = anya(test_map, 3, 11, 3, 6, euclidian_distance)[1].g
+    assert optimal > 5 + 1e-9
+    for search in (thetastar, lazythetastar, bidirectional_thetastar):
+        for closed_type in (Closed, ArrayClosed):
+            result = search(test_map, 3, 11, 3, 6, euclidian_distance, closed_type=closed_type)
+            assert result[0] and result[2] > 0 and result[1].g >= optimal - 1e-9
+            _check_path(test_map, result[1], 3, 11)
+    test_map = Map()
+    test_map.set_grid_cells(8, 5, [[0] * 8 for _ in range(5)])
+    # A wall splits the map, the index is rebuilt after set_obstacle
+    assert test_map.connected(0, 0, 0, 8)
+    for i in range(5):
+        test_map.set_obstacle(i, 4)
+    assert not test_map.connected(0, 0, 0, 8) and test_map.connected(0, 0, 5, 4)
+    assert not thetastar(test_map, 0, 0, 0, 8, euclidian_distance, open_type=OpenHeap)[0]
+    print("test_components: OK")
+
+
+def test_anytime():
+    # The greedy search goes into the dead end at the top right, the optimal path of 2^2 A* (length 13) goes below it
+    map_str = '''
+. . . . . . # .
+. # # . # . # .
+. # . . . . # .
+. . . # # . # .
+. . . # . . . .
+# . # . # . . .
+'''
+    test_map = AnyaMap()
+    test_map.read_from_string(map_str, 8, 6)
+    result = weighted_astar2k(test_map, 2, 0, 1, 8, euclidian_distance, weight=3)
+    assert result[1].g == 15 and 15 / 13 <= result[6] <= 3
+    # Bounds of bigger budgets are smaller, the first path is improved when the last iteration finishes
+    bounds = []
+    for max_expansions in range(25, 60, 5):
+        result = anytime_astar2k(test_map, 2, 0, 1, 8, euclidian_distance, max_expansions=max_expansions)
+        assert result[0] and result[1].g <= result[6] * 13 + 1e-9
+        _check_path(test_map, result[1], 2, 0)
+        bounds.append(result[6])
+    assert bounds == sorted(bounds, reverse=True) and bounds[0] < 3 and bounds[-1] == 1.0 and result[1].g == 13
+    assert not anytime_astar2k(test_map, 2, 0, 1, 8, euclidian_distance, max_expansions=20)[0]
+    for rnd, test_map, _ in _random_maps(37, 150, max_size=12):
+        (si, sj), (gi, gj) = _random_point(rnd, test_map), _random_point(rnd, test_map)
+        if (si, sj) == (gi, gj):
+            continue
+        k = rnd.choice([2, 3, 4])
+        expected = astar2k(test_map, si, sj, gi, gj, euclidian_distance, open_type=OpenHeap, k=k)
+        # Without a budget the last iteration gives the optimal path
+        result = anytime_astar2k(test_map, si, sj, gi, gj, euclidian_distance, k=k)
+        assert result[0] == expected[0]
+        if not result[0]:
+            assert result[6] == float('inf')
+            continue
+        optimal = expected[1].g
+        assert abs(result[1].g - optimal) < 1e-9 and result[6] == 1.0
+        weight = rnd.choice([1.5, 2, 3])
+        result = weighted_astar2k(test_map, si, sj, gi, gj, euclidian_distance, k=k, weight=weight)
+        assert result[0] and result[1].g <= weight * optimal + 1e-9 and result[6] <= weight
+        _check_path(test_map, result[1], si, sj)
+        # The bound holds for the path found within the budget
+        result = anytime_astar2k(test_map, si, sj, gi, gj, euclidian_distance, k=k, max_expansions=rnd.randint(1, 30))
+        if result[0]:
+            assert result[1].g <= result[6] * optimal + 1e-9
+            _check_path(test_map, result[1], si, sj)
+        result = anytime_thetastar(test_map, si, sj, gi, gj, euclidian_distance, k=k, max_expansions=rnd.randint(1, 30))
+        if result[0]:
+            assert result[6] >= 1 and abs(result[1].g - result[6] * compute_cost(si, sj, gi, gj)) < 1e-9
+            _check_path(test_map, result[1], si, sj)
+        expected = anya(test_map, si, sj, gi, gj, euclidian_distance)
+        result = anytime_anya(test_map, si, sj, gi, gj, euclidian_distance)
+        assert result[0] and abs(result[1].g - expected[1].g) < 1e-9 and result[6] == 1.0
+        result = anytime_anya(test_map, si, sj, gi, gj, euclidian_distance, max_expansions=rnd.randint(1, 5))
+        if result[0]:
+            assert result[1].g <= result[6] * expected[1].g + 1e-9
+    print("test_anytime: OK")
+
+
+def test_benchmark_compare():
+    baseline = {"benchmarks": {
+        "micro/room/is_obstacle": {"time": 1.0, "calls": 10},
+        "search/room/anya": {"time": 2.0, "expansions": 100, "length": 10.0, "tasks": 3},
+        "search/room/thetastar-k2": {"time": 2.0, "expansions": 100, "length": 10.0, "tasks": 3},
+        "search/city/anya": {"time": 1.0, "expansions": 100, "length": 10.0, "tasks": 3},
+    }}
+    current = {"benchmarks": {
+        "micro/room/is_obstacle": {"time": 1.05, "calls": 10},
+        "search/room/anya": {"time": 3.0, "expansions": 100, "length": 10.0, "tasks": 3},
+        "search/room/thetastar-k2": {"time": 1.0, "expansions": 90, "length": 10.0, "tasks": 3},
+    }}
+    statuses = {name: status for (name, _, _, _, status) in compare(baseline, current, threshold=0.1)}
+    assert statuses == {"micro/room/is_obstacle": "", "search/room/anya": "slower", "search/room/thetastar-k2": "changed"}
+    print("test_benchmark_compare: OK")
+
+
+def test_headless_core():
+    # The search core must not import plotting libraries
+    assert benchmark_startup(1)["startup/import-core"]["plotting_modules"] == []
+    print("test_headless_core: OK")
+
+
+def test_line_of_sight():
+    map_str = '''
+. . . .
+. # . .
+. . # .
+. . . .
+'''
+    test_map = Map()
+    test_map.read_from_string(map_str, 4, 4)
+    # Squeezing between diagonally adjacent obstacles
+    assert not test_map.traversable_step_long(1, 3, 3, 1)
+    assert not test_map.traversable_step_long(0, 4, 4, 0)
+    # Along the obstacle side and the map border
+    assert test_map.traversable_step_long(1, 1, 1, 2)
+    assert test_map.traversable_step_long(0, 0, 0, 4)
+    assert test_map.traversable_step_long(0, 0, 4, 0)
+    assert test_map.traversable_step_long(0, 0, 1, 4)
+    assert not test_map.traversable_step_long(0, 0, 4, 4)
+    assert test_map.traversable_step_long(3, 0, 4, 4)
+    assert not test_map.traversable_step_long(0, 1, 4, 3)
+    print("test_line_of_sight: OK")
+
+
+def test_open_heaps():
+    for open_type in (OpenHeap, OpenLazyHeap):
+        rnd = random.Random(17)
+        OPEN = open_type()
+        best = dict()
+        for k in range(2000):
+            node = Node(rnd.randint(0, 20), rnd.randint(0, 20), g=rnd.randint(0, 50), h=rnd.randint(0, 50), k=k,
+                        is_left=rnd.randint(-1, 1))
+            key = (node.i, node.j, node.is_left)
+            OPEN.add_node(node)
+            if key not in best or best[key].F > node.F:
+                best[key] = node
+        assert len(OPEN) == len(best)
+        popped = []
+        while not OPEN.is_empty():
+            popped.append(OPEN.get_best_node())
+        assert [(node.F, node.h, -node.k) for node in popped] == sorted((node.F, node.h, -node.k) for node in best.values())
+        assert all(best[(node.i, node.j, node.is_left)] is node for node in popped)
+    print("test_open_heaps: OK")
+
+
+def test_array_closed():
+    test_map = Map()
+    test_map.set_grid_cells(4, 3, [[0] * 4 for _ in range(3)])
+    CLOSED = ArrayClosed(test_map)
+    CLOSED.add_node(Node(1, 2, is_left=2))
+    CLOSED.add_node(Node(3, 4))
+    assert CLOSED.was_expanded(1, 2, 1) and not CLOSED.was_expanded(1, 2, 0) and not CLOSED.was_expanded(1, 2, -1)
+    assert CLOSED.was_expanded(3, 4, 0) and len(CLOSED) == 2
+    # The buffer of a freed table is reused without clearing
+    stamps = CLOSED.stamps
+    del CLOSED
+    CLOSED = ArrayClosed(test_map)
+    assert CLOSED.stamps is stamps and not CLOSED.was_expanded(3, 4, 0) and len(CLOSED) == 0
+    roots = ArrayClosedAnya(test_map)
+    roots.set_g(2, 3, 1.5)
+    assert roots.get_g(2, 3) == 1.5 and roots.get_g(0, 0) == float('inf') and list(roots) == [(2, 3)]
+    # Both sides of the diagonal intersection (2, 2) are expanded and kept in separate slots
+    map_str = '''
+. . . .
+. # . .
+. . # .
+. . . .
+'''
+    test_map = AnyaMap()
+    test_map.read_from_string(map_str, 4, 4)
+    result = astar2k(test_map, 0, 0, 4, 4, euclidian_distance, open_type=OpenHeap, closed_type=ArrayClosed)
+    expected = astar2k(test_map, 0, 0, 4, 4, euclidian_distance, open_type=OpenHeap)
+    assert result[1].g == expected[1].g == 8 and result[2] == expected[2]
+    assert result[5].was_expanded(2, 2, 1) and result[5].was_expanded(2, 2, -1) and not result[5].was_expanded(2, 2, 0)
+    assert all(result[5].was_expanded(i, j, side) == expected[5].was_expanded(i, j, side)
+               for i in range(5) for j in range(5) for side in (-1, 0, 1))
+    # The same searches as with sets and dicts
+    for rnd, test_map, _ in _random_maps(29, 100):
+        (si, sj), (gi, gj) = _random_point(rnd, test_map), _random_point(rnd, test_map)
+        k = rnd.choice([2, 3, 4])
+        for search in (astar2k, thetastar):
+            result = search(test_map, si, sj, gi, gj, euclidian_distance, open_type=OpenHeap, closed_type=ArrayClosed, k=k)
+            expected = search(test_map, si, sj, gi, gj, euclidian_distance, open_type=OpenHeap, k=k)
+            # Nodes of one side of a diagonal intersection are one state, so there can be fewer expansions
+            assert result[0] == expected[0] and result[2] <= expected[2]
+            assert not result[0] or abs(result[1].g - expected[1].g) < 1e-9
+        result = anya(test_map, si, sj, gi, gj, euclidian_distance, closed_type=ArrayClosedAnya)
+        expected = anya(test_map, si, sj, gi, gj, euclidian_distance)
+        assert result[0] == expected[0] and result[2] == expected[2]
+    print("test_array_closed: OK")
+
+
+def test_anya_node_endpoints():
+    node = AnyaNode(5, 2, 4, Fraction(7, 3), 4, Fraction(7, 2))
+    assert (node.an, node.bn, node.den) == (14, 21, 6)
+    assert node.aj == Fraction(7, 3) and node.bj == Fraction(7, 2)
+    # Numerators are reduced, so equal intervals are equal nodes
+    other = AnyaNode(5, 2, 4, 28, 4, 42, den=12)
+    assert (other.an, other.bn, other.den) == (14, 21, 6)
+    assert node == other and hash(node) == hash(other)
+    assert AnyaNode(5, 2, 4, 3, 4, 6).den == 1
+    print("test_anya_node_endpoints: OK")
+
+
+def test_anya_changes_index():
+    map_str = '''
+. . # . .
+. . . . #
+# . . . .
+'''
+    test_map = AnyaMap()
+    test_map.read_from_string(map_str, 5, 3)
+    test_map._build_changes_index()
+    # Rows of cells with the border: -1 ... 3
+    assert test_map._changes[0] == []
+    assert test_map._changes[1] == [0, 2, 3, 5]
+    assert test_map._changes[2] == [0, 4]
+    assert test_map._changes[3] == [1, 5]
+    assert test_map._pair_changes[2] == [0, 2, 3, 4, 5]
+    assert test_map._next_obstacle(0, 0) == 2 and test_map._next_obstacle(0, 3) == 5
+    assert test_map._prev_obstacle(2, 4) == 0 and test_map._prev_obstacle(2, 0) == 0
+    assert test_map._flat_end_right(1, 0) == 2 and test_map._flat_end_left(1, 2) == 0
+    # Walking on the row of points 2 to the right: row 1 blocks at column 4, row 2 changes at column 1
+    assert test_map._corner_points_right(2, 1, 2, 0) == [1, 4]
+    assert test_map._corner_points_left(2, 1, 2, 4) == [1, 0]
+    # Every cell by the brute force
+    for i in range(-1, 4):
+        for j in range(-1, 6):
+            assert test_map._next_obstacle(i, j) == next(c for c in range(j, 7) if test_map.is_obstacle(i, c))
+            assert test_map._prev_obstacle(i, j) == next(c for c in range(j, -2, -1) if test_map.is_obstacle(i, c))
+    print("test_anya_changes_index: OK")
+
+
+def test_anya_corner_successors():
+    map_str = '''
+. . # . .
+. . . . #
+# . . . .
+'''
+    test_map = AnyaMap()
+    test_map.read_from_string(map_str, 5, 3)
+    test_map._build_changes_index()
+    # Corner (1, 2): the obstacle (0, 2) is behind, going up-left; (2, 1): the obstacle (2, 0) is behind, going down-right
+    assert test_map._corner_intervals(1, 2, -1, -1) == ((0, 2),)
+    assert test_map._corner_intervals(2, 1, 1, 1) == ((1, 5),)
+    # The cell in front is an obstacle
+    assert test_map._corner_intervals(1, 3, -1, -1) == ()
+    assert set(test_map._corner_successors) == {(1, 2, -1, -1), (2, 1, 1, 1)}
+    # Entries of the changed rows are dropped
+    test_map.set_obstacle(0, 0)
+    assert (1, 2, -1, -1) not in test_map._corner_successors
+    assert test_map._corner_intervals(1, 2, -1, -1) == ((1, 2),)
+    # The precomputed successors are saved and read back, a file of another map is ignored
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "test.map.anya")
+        test_map.precompute_corner_successors(path)
+        loaded_map = AnyaMap()
+        loaded_map.read_from_string(map_str, 5, 3)
+        assert not loaded_map.load_corner_successors(path)
+        loaded_map.set_obstacle(0, 0)
+        assert loaded_map.load_corner_successors(path)
+        assert loaded_map._corner_successors == test_map._corner_successors
+    # The diagonal intersection (2, 2) is a corner for two sides, they are kept separately
+    map_str = '''
+. . . .
+. # . .
+. . # .
+. . . .
+'''
+    test_map = AnyaMap()
+    test_map.read_from_string(map_str, 4, 4)
+    test_map._build_changes_index()
+    assert test_map._corner_intervals(2, 2, -1, 1) == ((2, 4),) and test_map._corner_intervals(2, 2, 1, -1) == ((0, 2),)
+    assert test_map._corner_intervals(2, 2, -1, -1) == () and test_map._corner_intervals(2, 2, 1, 1) == ()
+    assert set(test_map._corner_successors) == {(2, 2, -1, 1), (2, 2, 1, -1)}
+    # The bounded cache gives the same searches
+    for rnd, small_map, cells in _random_maps(23, 100):
+        height, width = small_map.get_size()
+        small_map.corner_cache_size = 2
+        for _ in range(3):
+            (si, sj), (gi, gj) = _random_point(rnd, small_map), _random_point(rnd, small_map)
+            fresh_map = AnyaMap()
+            fresh_map.set_grid_cells(width, height, cells)
+            fresh_map.precompute_corner_successors()
+            result = anya(small_map, si, sj, gi, gj, euclidian_distance)
+            expected = anya(fresh_map, si, sj, gi, gj, euclidian_distance)
+            assert result[0] == expected[0] and result[2] == expected[2]
+            assert len(small_map._corner_successors) <= 2
+    print("test_anya_corner_successors: OK")
 
 
 def test_neighbors_anya():
@@ -1,3 +1,7 @@
+from array import array
+from heapq import heappush, heappop
+from math import inf
+
 from sortedcontainers import SortedList as sorted_list
 from algorithms.structures import Node, AnyaNode
 
@@ -37,9 +41,129 @@ class Open:
         return self.elements.pop(0)
 
 
-class Closed:
+class OpenHeap:
+    '''
+    OPEN as an indexed binary heap: nodes are keyed by (i, j, is_left) and every key has at most one entry,
+    so improving a node is a real decrease-key (the entry is replaced and sifted up) instead of a removal.
+    Nodes are ordered as Node.__lt__ does: by F, then by h, then newer (greater k) first.
+    '''
+
+    def __init__(self):
+        # Heap of (F, h, -k, counter, node) entries, counter makes entries with equal F, h and k comparable
+        self.heap = []
+        self.positions = dict()
+        self.counter = 0
+
+    def __iter__(self):
+        return iter([entry[4] for entry in self.heap])
+
+    def __len__(self):
+        return len(self.heap)
+
+    def is_empty(self):
+        return len(self.heap) == 0
+
+    def add_node(self, item, *args):
+        key = (item.i, item.j, item.is_left)
+        self.counter += 1
+        entry = (item.F, item.h, -item.k, self.counter, item)
+        position = self.positions.get(key)
+        if position is None:
+            self.heap.append(entry)
+            self._sift_up(len(self.heap) - 1, entry)
+        elif self.heap[position][0] > item.F:
+            self._sift_up(position, entry)
+
+    def get_best_node(self, *args):
+        heap = self.heap
+        best = heap[0][4]
+        del self.positions[(best.i, best.j, best.is_left)]
+        last = heap.pop()
+        if heap:
+            self._sift_down(0, last)
+        return best
+
+    def _sift_up(self, position, entry):
+        heap = self.heap
+        positions = self.positions
+        while position > 0:
+            parent_position = (position - 1) >> 1
+            parent = heap[parent_position]
+            if entry > parent:
+                break
+            heap[position] = parent
+            node = parent[4]
+            positions[(node.i, node.j, node.is_left)] = position
+            position = parent_position
+        heap[position] = entry
+        node = entry[4]
+        positions[(node.i, node.j, node.is_left)] = position
+
+    def _sift_down(self, position, entry):
+        heap = self.heap
+        positions = self.positions
+        size = len(heap)
+        child_position = 2 * position + 1
+        while child_position < size:
+            right_position = child_position + 1
+            if right_position < size and heap[right_position] < heap[child_position]:
+                child_position = right_position
+            child = heap[child_position]
+            if entry < child:
+                break
+            heap[position] = child
+            node = child[4]
+            positions[(node.i, node.j, node.is_left)] = position
+            position = child_position
+            child_position = 2 * position + 1
+        heap[position] = entry
+        node = entry[4]
+        positions[(node.i, node.j, node.is_left)] = position
+
+
+class OpenLazyHeap:
+    '''
+    OPEN as a binary heap (heapq) with lazy deletion: improving a node pushes a new entry and the old one
+    is skipped when it reaches the top. Keys, order and interface are the same as in OpenHeap.
+    '''
 
     def __init__(self):
+        # Heap of (F, h, -k, counter, node) entries, counter makes entries with equal F, h and k comparable
+        self.heap = []
+        self.nodes = dict()
+        self.counter = 0
+
+    def __iter__(self):
+        return iter(list(self.nodes.values()))
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def is_empty(self):
+        return len(self.nodes) == 0
+
+    def add_node(self, item, *args):
+        key = (item.i, item.j, item.is_left)
+        in_open = self.nodes.get(key)
+        if in_open is not None and in_open.F <= item.F:
+            return
+        self.nodes[key] = item
+        self.counter += 1
+        heappush(self.heap, (item.F, item.h, -item.k, self.counter, item))
+
+    def get_best_node(self, *args):
+        nodes = self.nodes
+        while True:
+            item = heappop(self.heap)[4]
+            key = (item.i, item.j, item.is_left)
+            if nodes.get(key) is item:
+                del nodes[key]
+                return item
+
+
+class Closed:
+
+    def __init__(self, grid_map=None):
         self.elements = set()
         self.indexes = set()
 
@@ -57,6 +181,131 @@ class Closed:
         return (i, j, is_left) in self.indexes
 
 
+# Free stamp buffers of array-backed CLOSED sets by their size as [stamps, last generation] pairs, see _StampedTable
+_stamp_buffers = dict()
+# Free g value tables of ArrayClosedAnya by their size
+_g_tables = dict()
+
+
+class _StampedTable:
+    '''
+    Table of slots over a preallocated uint32 array of generation stamps: a slot is set in this table
+    if its stamp equals the generation of the table. A new table takes a free buffer of the same size
+    with the next generation, so the buffer is reused without clearing. The buffer is freed with the table.
+    '''
+
+    def __init__(self, size):
+        self.size = size
+        free = _stamp_buffers.get(size)
+        if free:
+            self.stamps, generation = free.pop()
+        else:
+            self.stamps, generation = array('I', [0]) * size, 0
+        if generation == 0xFFFFFFFF:
+            # Stamps wrap around, old ones must not match new generations
+            self.stamps = array('I', [0]) * size
+            generation = 0
+        self.generation = generation + 1
+
+    def __del__(self):
+        _stamp_buffers.setdefault(self.size, []).append([self.stamps, self.generation])
+
+
+class ArrayClosed(_StampedTable):
+    '''
+    CLOSED for searches on a grid map, the same as Closed: slot (i * (width + 1) + j) * 3 + 1 + side is set for
+    an expanded node, side is the sign of is_left (sides of a diagonal intersection, see Map.is_left_node).
+    was_expanded is an array lookup instead of hashing a tuple, use it as closed_type.
+    '''
+
+    def __init__(self, grid_map):
+        height, width = grid_map.get_size()
+        super().__init__((height + 1) * (width + 1) * 3)
+        self.row = (width + 1) * 3
+        self.elements = []
+
+    def __iter__(self):
+        return iter(self.elements)
+
+    def __len__(self):
+        return len(self.elements)
+
+    def add_node(self, item: Node):
+        side = item.is_left
+        if side:
+            side = 1 if side > 0 else -1
+        slot = item.i * self.row + item.j * 3 + 1 + side
+        if self.stamps[slot] != self.generation:
+            self.stamps[slot] = self.generation
+            self.elements.append(item)
+
+    def was_expanded(self, i, j, is_left):
+        if is_left:
+            is_left = 1 if is_left > 0 else -1
+        return self.stamps[i * self.row + j * 3 + 1 + is_left] == self.generation
+
+
+class ClosedAnya:
+    '''
+    Best g values of roots of ANYA nodes by the root point.
+    '''
+
+    def __init__(self, grid_map=None):
+        self.g_values = dict()
+
+    def __iter__(self):
+        return iter(self.g_values)
+
+    def __len__(self):
+        return len(self.g_values)
+
+    def get_g(self, i, j):
+        return self.g_values.get((i, j), inf)
+
+    def set_g(self, i, j, g):
+        self.g_values[(i, j)] = g
+
+
+class ArrayClosedAnya(_StampedTable):
+    '''
+    ClosedAnya over preallocated arrays: the g value of root (i, j) is in slot i * (width + 1) + j of a float64 table,
+    it is valid if the slot is stamped with the generation of the table.
+    '''
+
+    def __init__(self, grid_map):
+        height, width = grid_map.get_size()
+        super().__init__((height + 1) * (width + 1))
+        self.row = width + 1
+        # g values are kept with the stamps, the table of a reused buffer isn't cleared either
+        g_tables = _g_tables.get(self.size)
+        self.g_values = g_tables.pop() if g_tables else array('d', [inf]) * self.size
+        self.count = 0
+
+    def __del__(self):
+        _g_tables.setdefault(self.size, []).append(self.g_values)
+        super().__del__()
+
+    def __iter__(self):
+        row = self.row
+        return iter([divmod(slot, row) for slot in range(self.size) if self.stamps[slot] == self.generation])
+
+    def __len__(self):
+        return self.count
+
+    def get_g(self, i, j):
+        slot = i * self.row + j
+        if self.stamps[slot] == self.generation:
+            return self.g_values[slot]
+        return inf
+
+    def set_g(self, i, j, g):
+        slot = i * self.row + j
+        if self.stamps[slot] != self.generation:
+            self.stamps[slot] = self.generation
+            self.count += 1
+        self.g_values[slot] = g
+
+
 class OpenAnya:
 
     def __init__(self):
@@ -1,6 +1,3 @@
-from fractions import Fraction
-
-
 def compute_cost(i1, j1, i2, j2):
     return (abs(i1 - i2) ** 2 + abs(j1 - j2) ** 2) ** 0.5
 
@@ -19,7 +16,8 @@ def make_path(goal):
 def compare_step(prev2i, prev2j, previ, prevj, ci, cj):
     if cj == prevj or prev2j == prevj:
         return prevj == prev2j and cj == prevj
-    return Fraction(ci - previ, cj - prevj) == Fraction(previ - prev2i, prevj - prev2j)
+    # Equal slopes, compared by cross-multiplication
+    return (ci - previ) * (prevj - prev2j) == (previ - prev2i) * (cj - prevj)
 
 
 def check_correcting_and_optimality(goal, task_map):
@@ -0,0 +1,178 @@
+import inspect
+import zlib
+from collections import OrderedDict
+from threading import Lock
+from weakref import WeakKeyDictionary
+
+from algorithms.structures import Node
+from util import functions as uf
+
+
+class PathCache:
+    '''
+    LRU cache of search results: (found, path as (i, j) tuples, length) by the map content (size and CRC32 of the grid),
+    algorithm, k (or other hashable options of the search, see wrap), start and goal. A reversed query of a reversible algorithm (the path from the goal to the start
+    has the same length, e.g. for optimal searches) is answered with the reversed path.
+
+    At most max_entries results and max_points path points in total are kept, the least recently used ones are evicted.
+    A change of the grid (Map.version) changes the key of the map, entries of the old content are dropped
+    when the map is used next time.
+    '''
+
+    def __init__(self, max_entries=1024, max_points=None):
+        self.max_entries = max_entries
+        self.max_points = max_points
+        self._entries = OrderedDict()
+        self._points = 0
+        # Map -> (version, content key)
+        self._map_keys = WeakKeyDictionary()
+        # Searches of different threads (see test.path_server) share the cache
+        self._lock = Lock()
+        self.hits = 0
+        self.reversed_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def map_key(self, grid_map):
+        known = self._map_keys.get(grid_map)
+        if known is not None and known[0] == grid_map.version:
+            return known[1]
+        key = grid_map.get_size() + (zlib.crc32(grid_map.get_padded_grid()),)
+        with self._lock:
+            if known is not None:
+                self._invalidate(known[1])
+            self._map_keys[grid_map] = (grid_map.version, key)
+        return key
+
+    def _invalidate(self, map_key):
+        for key in [key for key in self._entries if key[0] == map_key]:
+            self._remove(key)
+            self.invalidations += 1
+
+    def _remove(self, key):
+        found, path, length = self._entries.pop(key)
+        self._points -= len(path)
+
+    def invalidate(self, grid_map=None):
+        '''
+        Drops the entries of the map (of the current content), all the entries if grid_map is None.
+        '''
+        map_key = self.map_key(grid_map) if grid_map is not None else None
+        with self._lock:
+            if map_key is None:
+                self.invalidations += len(self._entries)
+                self._entries.clear()
+                self._points = 0
+            else:
+                self._invalidate(map_key)
+
+    def get(self, grid_map, algorithm, k, si, sj, gi, gj, reversible=False):
+        '''
+        Returns (found, path, length) or None.
+        '''
+        map_key = self.map_key(grid_map)
+        with self._lock:
+            key = (map_key, algorithm, k, si, sj, gi, gj)
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            if reversible:
+                key = (map_key, algorithm, k, gi, gj, si, sj)
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    self.reversed_hits += 1
+                    found, path, length = entry
+                    return found, path[::-1], length
+            self.misses += 1
+            return None
+
+    def put(self, grid_map, algorithm, k, si, sj, gi, gj, found, path, length):
+        map_key = self.map_key(grid_map)
+        path = tuple(path)
+        if self.max_points is not None and len(path) > self.max_points:
+            return
+        with self._lock:
+            key = (map_key, algorithm, k, si, sj, gi, gj)
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (found, path, length)
+            self._points += len(path)
+            while len(self._entries) > self.max_entries or (self.max_points is not None and self._points > self.max_points):
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def search(self, search, grid_map, algorithm, k, si, sj, gi, gj, reversible=False):
+        '''
+        Cached call of search(), which returns a search result tuple (see astar2k).
+        Returns (found, path, length, cached), path is a tuple of (i, j) points.
+        '''
+        entry = self.get(grid_map, algorithm, k, si, sj, gi, gj, reversible)
+        if entry is not None:
+            return entry + (True,)
+        result = search()
+        found, path, length = result[0], (), None
+        if found:
+            nodes, length = uf.make_path(result[1])
+            path = tuple((node.i, node.j) for node in nodes)
+        self.put(grid_map, algorithm, k, si, sj, gi, gj, found, path, length)
+        return found, path, length, False
+
+    def wrap(self, search, algorithm=None, reversible=False):
+        '''
+        Search function with the same signature as search (e.g. astar2k) which uses the cache.
+        All the arguments except the map and the endpoints (heuristic_func, open_type, k etc., with the defaults)
+        are a part of the key, calls with unhashable arguments and searches with stats are not cached.
+        Results from the cache have no expansions and no OPEN and CLOSED, the goal node has the path
+        as its chain of parents.
+        '''
+        algorithm = algorithm or search.__name__
+        signature = inspect.signature(search)
+
+        def cached_search(grid_map, start_i, start_j, goal_i, goal_j, *args, **kwargs):
+            bound = signature.bind(grid_map, start_i, start_j, goal_i, goal_j, *args, **kwargs)
+            bound.apply_defaults()
+            options = tuple(bound.arguments.items())[5:]
+            try:
+                hash(options)
+            except TypeError:
+                options = None
+            if options is None or bound.arguments.get("stats") is not None:
+                return search(grid_map, start_i, start_j, goal_i, goal_j, *args, **kwargs)
+            results = []
+
+            def run():
+                results.append(search(grid_map, start_i, start_j, goal_i, goal_j, *args, **kwargs))
+                return results[0]
+
+            found, path, length, cached = self.search(run, grid_map, algorithm, options,
+                                                      start_i, start_j, goal_i, goal_j, reversible)
+            if not cached:
+                return results[0]
+            goal = None
+            for (i, j) in path:
+                g = 0 if goal is None else goal.g + uf.compute_cost(goal.i, goal.j, i, j)
+                goal = Node(i=i, j=j, g=g, parent=goal)
+            if goal is not None:
+                goal.g = length
+            return found, goal, 0, 0, [], []
+
+        return cached_search
+
+    def as_dict(self):
+        return {
+            "entries": len(self._entries),
+            "points": self._points,
+            "hits": self.hits,
+            "reversed_hits": self.reversed_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
@@ -0,0 +1,198 @@
+from time import perf_counter
+
+
+class SearchStats:
+    '''
+    Counters of one search run. Pass an instance as stats to any of the searches, it's filled during the search.
+    Without stats the searches run exactly as before: the map and OPEN are wrapped only when stats are given.
+
+    expansions     - nodes whose successors were generated
+    generated      - generated nodes (successors and start nodes)
+    pruned         - generated nodes which were not added to OPEN (already expanded or dominated)
+    merged         - nodes added to OPEN for a state which was already there (the entry was improved or kept)
+    los_calls      - line of sight checks made by the search (traversable_step_long and line_of_sight)
+    los_cells      - cells looked up by these checks, a check stops at the first blocked cell
+    pushes, pops   - OPEN operations, peak_open is the maximal size of OPEN
+    successor_time - seconds in successor generation of the map, los_time - in line of sight checks,
+    queue_time     - in OPEN operations
+
+    Callbacks on_expand(node), on_push(node) and on_pop(node) are called on the corresponding events.
+    '''
+
+    def __init__(self, on_expand=None, on_push=None, on_pop=None):
+        self.expansions = 0
+        self.generated = 0
+        self.merged = 0
+        self.los_calls = 0
+        self.los_cells = 0
+        self.pushes = 0
+        self.pops = 0
+        self.peak_open = 0
+        self.successor_time = 0.0
+        self.los_time = 0.0
+        self.queue_time = 0.0
+        self.on_expand = on_expand
+        self.on_push = on_push
+        self.on_pop = on_pop
+
+    @property
+    def pruned(self):
+        return self.generated - self.pushes
+
+    @property
+    def duplicates(self):
+        # Generated nodes for already reached states
+        return self.pruned + self.merged
+
+    def add_expansion(self, node, generated, seconds):
+        '''
+        Records an expansion made without the instrumented map (e.g. jump points of JPS).
+        '''
+        self.successor_time += seconds
+        self.expansions += 1
+        self.generated += generated
+        if self.on_expand is not None:
+            self.on_expand(node)
+
+    def as_dict(self):
+        return {
+            "expansions": self.expansions,
+            "generated": self.generated,
+            "duplicates": self.duplicates,
+            "pruned": self.pruned,
+            "merged": self.merged,
+            "los_calls": self.los_calls,
+            "los_cells": self.los_cells,
+            "pushes": self.pushes,
+            "pops": self.pops,
+            "peak_open": self.peak_open,
+            "successor_time": self.successor_time,
+            "los_time": self.los_time,
+            "queue_time": self.queue_time,
+        }
+
+    def instrument(self, grid_map, open_type):
+        '''
+        Returns the map and the OPEN type to use in a search: they work as the given ones and fill these stats.
+        '''
+        return InstrumentedMap(grid_map, self), lambda: InstrumentedOpen(open_type(), self)
+
+
+class _CellCounter:
+    '''
+    Runs the line of sight checks of the map with this object as self, so every cell they look up is counted.
+    '''
+
+    def __init__(self, grid_map):
+        self._map = grid_map
+        self._methods = type(grid_map)
+        self.cells = 0
+
+    def __getattr__(self, name):
+        return getattr(self._map, name)
+
+    def is_obstacle(self, i, j):
+        self.cells += 1
+        return self._map.is_obstacle(i, j)
+
+    def traversable_step(self, i1, j1, i2, j2):
+        return self._methods.traversable_step(self, i1, j1, i2, j2)
+
+    def traversable_step_long(self, i1, j1, i2, j2):
+        return self._methods.traversable_step_long(self, i1, j1, i2, j2)
+
+    def is_diagonal_intersection(self, i, j):
+        return self._methods.is_diagonal_intersection(self, i, j)
+
+
+class InstrumentedMap:
+    '''
+    Proxy of Map (or AnyaMap) counting successor generation and line of sight checks, other attributes are the map's ones.
+    '''
+
+    def __init__(self, grid_map, stats: SearchStats):
+        self._map = grid_map
+        self._stats = stats
+
+    def __getattr__(self, name):
+        return getattr(self._map, name)
+
+    def _expand(self, node, successors, start_time):
+        self._stats.add_expansion(node, len(successors), perf_counter() - start_time)
+        return successors
+
+    def get_neighbors(self, node, k=None):
+        start_time = perf_counter()
+        return self._expand(node, self._map.get_neighbors(node, k), start_time)
+
+    def get_neighbors_by_node(self, node):
+        start_time = perf_counter()
+        return self._expand(node, self._map.get_neighbors_by_node(node), start_time)
+
+    def get_start_neighbors(self, i, j):
+        stats = self._stats
+        start_time = perf_counter()
+        successors = self._map.get_start_neighbors(i, j)
+        stats.successor_time += perf_counter() - start_time
+        stats.generated += len(successors)
+        return successors
+
+    def _check_sight(self, check, i1, j1, i2, j2):
+        stats = self._stats
+        counter = _CellCounter(self._map)
+        start_time = perf_counter()
+        result = check(counter, i1, j1, i2, j2)
+        stats.los_time += perf_counter() - start_time
+        stats.los_calls += 1
+        stats.los_cells += counter.cells
+        return result
+
+    def traversable_step_long(self, i1, j1, i2, j2):
+        return self._check_sight(type(self._map).traversable_step_long, i1, j1, i2, j2)
+
+    def line_of_sight(self, i1, j1, i2, j2):
+        return self._check_sight(type(self._map).line_of_sight, i1, j1, i2, j2)
+
+
+class InstrumentedOpen:
+    '''
+    Proxy of an OPEN container counting pushes, pops and merges of nodes and the peak size.
+    '''
+
+    def __init__(self, open_container, stats: SearchStats):
+        self._open = open_container
+        self._stats = stats
+
+    def __iter__(self):
+        return iter(self._open)
+
+    def __len__(self):
+        return len(self._open)
+
+    def is_empty(self):
+        return self._open.is_empty()
+
+    def add_node(self, item, *args):
+        stats = self._stats
+        start_time = perf_counter()
+        size = len(self._open)
+        self._open.add_node(item, *args)
+        new_size = len(self._open)
+        stats.queue_time += perf_counter() - start_time
+        stats.pushes += 1
+        if new_size == size:
+            stats.merged += 1
+        if new_size > stats.peak_open:
+            stats.peak_open = new_size
+        if stats.on_push is not None:
+            stats.on_push(item)
+
+    def get_best_node(self, *args):
+        stats = self._stats
+        start_time = perf_counter()
+        item = self._open.get_best_node(*args)
+        stats.queue_time += perf_counter() - start_time
+        stats.pops += 1
+        if stats.on_pop is not None:
+            stats.on_pop(item)
+        return item